@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import sys
+from datetime import datetime
+
+from .crud import SNAPSHOT_FIELDS
+from .db import SessionLocal, engine, init_db
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, FILE_FORMATS, iter_snapshot_chunks, text_export, write_columnar
+from .models import BatchItem
+from .services.batch import BATCH_COMMIT_EVERY, BATCH_MAX_WORKERS, analyze_batch
+from .services.jobs import JOB_POLL_SECONDS, JOB_WORKER_CONCURRENCY, run_worker
+from .services.pipeline import ANALYSIS_MODES
+from .snapshot_storage import SNAPSHOT_KEYFRAME_EVERY, STORAGE_MODES, migrate_storage
+
+def _read_items(path: str):
+    stream = sys.stdin if path == "-" else open(path)
+    try:
+        return [BatchItem(**json.loads(line)) for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+async def _analyze_batch(args) -> int:
+    items = _read_items(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    failed = 0
+    try:
+        async for result in analyze_batch(items, SessionLocal, args.workers, args.commit_every, mode=args.mode):
+            failed += result.status == "error"
+            out.write(result.json() + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(items) - failed}/{len(items)} items analyzed", file=sys.stderr)
+    return 1 if failed else 0
+
+async def _work(concurrency: int, poll_interval: float, exit_when_idle: bool) -> None:
+    stop = asyncio.Event()
+    try:
+        # SIGTERM (e.g. a rolling deploy) finishes in-flight jobs, then exits
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, RuntimeError):
+        pass
+    await run_worker(SessionLocal, concurrency, poll_interval, stop=stop, exit_when_idle=exit_when_idle)
+
+def _worker_process(concurrency: int, poll_interval: float, exit_when_idle: bool) -> None:
+    try:
+        asyncio.run(_work(concurrency, poll_interval, exit_when_idle))
+    except KeyboardInterrupt:
+        pass
+
+def _run_workers(args) -> int:
+    if args.processes <= 1:
+        _worker_process(args.concurrency, args.poll_interval, args.exit_when_idle)
+        return 0
+    # Each process has its own event loop, LLM clients and DB pool; the job table is the only shared state
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_process, args=(args.concurrency, args.poll_interval, args.exit_when_idle))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+    return 1 if any(process.exitcode for process in processes) else 0
+
+def _migrate_snapshots(args) -> int:
+    db = SessionLocal()
+    try:
+        stats = migrate_storage(db, args.to, args.keyframe_every)
+    finally:
+        db.close()
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(f"{stats['rows']} snapshots of {stats['startups']} startups re-encoded as {args.to}: "
+          f"{stats['delta_rows']} deltas, {stats['bytes_before']} -> {stats['bytes_after']} content bytes ({saved:+d} saved)",
+          file=sys.stderr)
+    if args.vacuum and engine.dialect.name == "sqlite":
+        # SQLite keeps freed pages in the file until it is rebuilt
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    return 0
+
+def _export(args) -> int:
+    fields = SNAPSHOT_FIELDS if args.fields is None else [f.strip() for f in args.fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in SNAPSHOT_FIELDS]
+    if unknown:
+        print(f"Unknown snapshot fields: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.format in FILE_FORMATS and args.output == "-":
+        print(f"{args.format} export needs a file: pass -o <path>", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    rows = 0
+    try:
+        chunks = iter_snapshot_chunks(db, fields, args.startup_id, args.since, args.until, args.chunk_size)
+        if args.format in FILE_FORMATS:
+            try:
+                rows = write_columnar(chunks, args.output, args.format, fields)
+            except RuntimeError as e:
+                print(e, file=sys.stderr)
+                return 2
+        else:
+            def counted():
+                nonlocal rows
+                for chunk in chunks:
+                    rows += len(chunk)
+                    yield chunk
+
+            out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+            try:
+                for block in text_export(counted(), args.format, fields):
+                    out.write(block)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    finally:
+        db.close()
+    print(f"{rows} snapshots exported as {args.format}", file=sys.stderr)
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Founder Reality-Check command line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("analyze-batch", help="Analyze a JSONL file of {startup_id, input_text} items.")
+    batch.add_argument("input", help="JSONL input path, or - for stdin")
+    batch.add_argument("-o", "--output", default="-", help="JSONL results path (default: stdout)")
+    batch.add_argument("-w", "--workers", type=int, default=BATCH_MAX_WORKERS)
+    batch.add_argument("--commit-every", type=int, default=BATCH_COMMIT_EVERY)
+    batch.add_argument("--mode", choices=ANALYSIS_MODES, help="pipeline mode (default: ANALYSIS_MODE)")
+
+    worker = commands.add_parser("worker", help="Run queued /analyze?async=true jobs until interrupted.")
+    worker.add_argument("-p", "--processes", type=int, default=1, help="worker processes to start")
+    worker.add_argument("-c", "--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="jobs run at once per process")
+    worker.add_argument("--poll-interval", type=float, default=JOB_POLL_SECONDS)
+    worker.add_argument("--exit-when-idle", action="store_true", help="stop once the queue is empty")
+
+    migrate = commands.add_parser("migrate-snapshots", help="Re-encode stored snapshot history as deltas or full rows.")
+    migrate.add_argument("--to", choices=STORAGE_MODES, default="delta", help="target storage (default: delta)")
+    migrate.add_argument("--keyframe-every", type=int, default=SNAPSHOT_KEYFRAME_EVERY, help="versions between full keyframes")
+    migrate.add_argument("--vacuum", action="store_true", help="compact the SQLite file afterwards")
+
+    export = commands.add_parser("export", help="Export snapshot history as NDJSON, CSV, Parquet or Arrow.")
+    export.add_argument("-o", "--output", default="-", help="output path (default: stdout; required for parquet/arrow)")
+    export.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="ndjson")
+    export.add_argument("--startup-id", action="append", help="only this startup (repeatable)")
+    export.add_argument("--since", type=datetime.fromisoformat, help="snapshots saved at or after this ISO time")
+    export.add_argument("--until", type=datetime.fromisoformat, help="snapshots saved before this ISO time")
+    export.add_argument("--fields", help="comma-separated snapshot fields (default: all)")
+    export.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="rows fetched per query")
+
+    args = parser.parse_args(argv)
+    init_db()
+    if args.command == "analyze-batch":
+        return asyncio.run(_analyze_batch(args))
+    if args.command == "worker":
+        return _run_workers(args)
+    if args.command == "migrate-snapshots":
+        return _migrate_snapshots(args)
+    if args.command == "export":
+        return _export(args)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
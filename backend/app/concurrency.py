@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, List, Optional
+
+from . import metrics
+
+class KeyedLock:
+    """
+    One asyncio.Lock per key, created on demand and dropped once nobody holds
+    or waits on it. Work for the same key is serialized; different keys never
+    contend.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._users: Dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    def locked(self, key: Hashable) -> bool:
+        lock = self._locks.get(key)
+        return bool(lock and lock.locked())
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+# Serializes overlapping analyses of the same startup within this process
+startup_locks = KeyedLock()
+
+# Lower value is served first; work that does not say otherwise is interactive
+PRIORITIES = {"interactive": 0, "batch": 1}
+current_priority: ContextVar[str] = ContextVar("current_priority", default="interactive")
+
+@contextmanager
+def priority(name: str):
+    """
+    Runs the block (and every task it spawns) at the given scheduling priority.
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{name}', expected one of {list(PRIORITIES)}")
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+class TokenBucket:
+    """
+    Refills at `rate` units per second up to `capacity`. The level may go
+    negative when usage is reconciled after the fact; later takers wait it off.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self._updated: Optional[float] = None
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until `amount` can be taken (0 if it can be taken now). Amounts
+        above capacity only need a full bucket, so oversized calls still run.
+        """
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+class ConcurrencyGate:
+    """
+    Process-wide admission control for LLM calls:
+    - at most `max_concurrency` in flight (0 = unlimited)
+    - token buckets for requests/second, requests/minute and tokens/minute
+      (0 = unlimited); per-minute buckets allow `burst_seconds` worth of burst
+    - waiters are admitted strictly by priority, then FIFO, so interactive
+      calls overtake queued batch work; nothing is rejected, excess work queues
+    The asyncio primitives are (re)built for whichever event loop is running.
+    """
+
+    def __init__(self, max_concurrency: int = 0, rate_per_second: float = 0.0, requests_per_minute: float = 0.0,
+                 tokens_per_minute: float = 0.0, burst_seconds: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self._loop = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._waiters: List[list] = []
+            self._seq = itertools.count()
+            self._in_flight = 0
+            self._timer = None
+            self._request_buckets = []
+            self._token_bucket = None
+            if self.rate_per_second > 0:
+                # Capacity 1: starts are evenly spaced, no burst
+                self._request_buckets.append(TokenBucket(self.rate_per_second, 1.0))
+            if self.requests_per_minute > 0:
+                rate = self.requests_per_minute / 60.0
+                self._request_buckets.append(TokenBucket(rate, rate * self.burst_seconds))
+            if self.tokens_per_minute > 0:
+                rate = self.tokens_per_minute / 60.0
+                self._token_bucket = TokenBucket(rate, rate * self.burst_seconds)
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        waits = [bucket.wait_time(1, now) for bucket in self._request_buckets]
+        if self._token_bucket is not None:
+            waits.append(self._token_bucket.wait_time(tokens, now))
+        return max(waits, default=0.0)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            _, _, future, tokens, name = self._waiters[0]
+            if future.done():
+                # Cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+                return
+            now = self._loop.time()
+            wait = self._wait_time(tokens, now)
+            if wait > 0:
+                # The head keeps its place; nothing behind it may jump the quota
+                self._timer = self._loop.call_later(wait, self._dispatch)
+                return
+            for bucket in self._request_buckets:
+                bucket.take(1, now)
+            if self._token_bucket is not None:
+                self._token_bucket.take(tokens, now)
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            metrics.LLM_QUEUE_DEPTH.dec(priority=name)
+            future.set_result(None)
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    def adjust_tokens(self, delta: float) -> None:
+        """
+        Reconciles an admitted call's estimated tokens with what it actually used.
+        """
+        if self._loop is not None and self._token_bucket is not None and delta:
+            self._token_bucket.take(delta, self._loop.time())
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {name: 0 for name in PRIORITIES}
+        for _, _, future, _, name in getattr(self, "_waiters", []):
+            if not future.done():
+                depth[name] += 1
+        return depth
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0.0):
+        self._bind()
+        name = current_priority.get()
+        future = self._loop.create_future()
+        heapq.heappush(self._waiters, [PRIORITIES[name], next(self._seq), future, tokens, name])
+        metrics.LLM_QUEUE_DEPTH.inc(priority=name)
+        start = self._loop.time()
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: give the slot back
+                self._in_flight -= 1
+            else:
+                metrics.LLM_QUEUE_DEPTH.dec(priority=name)
+            self._schedule()
+            raise
+        metrics.LLM_QUEUE_WAIT.observe(self._loop.time() - start, priority=name)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._schedule()
@@ -0,0 +1,463 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from . import snapshot_storage
+from .models import (
+    Startup, Snapshot, DriftRecord, AnalysisReport, AnalysisJob, StartupSnapshot, DriftItem, AnalysisResponse,
+    DriftTimelineEntry, JobStatus
+)
+
+# How many times an insert is retried after losing a version race to another writer
+VERSION_ALLOCATION_ATTEMPTS = 5
+
+class VersionConflictError(Exception):
+    pass
+
+def snapshot_from_orm(snapshot: Snapshot, values: Optional[dict] = None) -> StartupSnapshot:
+    """
+    `values` is the rebuilt content of a delta-encoded row; see snapshots_from_orm.
+    """
+    if values is None:
+        if snapshot_storage.is_delta(snapshot):
+            raise ValueError(f"Snapshot v{snapshot.version} of '{snapshot.startup_id}' is delta-encoded; use snapshots_from_orm")
+        values = snapshot_storage.row_values(snapshot)
+    return StartupSnapshot(
+        startup_id=snapshot.startup_id,
+        version=snapshot.version,
+        timestamp=snapshot.timestamp,
+        **{**values, "top_risks": values["top_risks"] or [], "declared_next_steps": values["declared_next_steps"] or []}
+    )
+
+def rebuild_versions(db: Session, startup_id: str, low: int, high: int) -> Dict[int, dict]:
+    """
+    Content of versions low..high (and up to the next full row) of a startup,
+    rebuilt from the first full row at or after `high`: one query.
+    """
+    anchor = (
+        db.query(func.min(Snapshot.version))
+        .filter(Snapshot.startup_id == startup_id, Snapshot.version >= high,
+                or_(Snapshot.storage.is_(None), Snapshot.storage != "delta"))
+        .scalar()
+    )
+    chain = (
+        db.query(Snapshot)
+        .filter(Snapshot.startup_id == startup_id, Snapshot.version >= low, Snapshot.version <= (anchor or high))
+        .order_by(Snapshot.version)
+        .all()
+    )
+    return snapshot_storage.rebuild(chain)
+
+def snapshots_from_orm(db: Session, rows: Sequence[Snapshot]) -> List[StartupSnapshot]:
+    """
+    snapshot_from_orm for many rows, rebuilding delta-encoded ones with one
+    extra query per startup that has any.
+    """
+    deltas: Dict[str, List[int]] = {}
+    for row in rows:
+        if snapshot_storage.is_delta(row):
+            deltas.setdefault(row.startup_id, []).append(row.version)
+    rebuilt = {
+        (startup_id, version): values
+        for startup_id, versions in deltas.items()
+        for version, values in rebuild_versions(db, startup_id, min(versions), max(versions)).items()
+    }
+    return [snapshot_from_orm(row, rebuilt.get((row.startup_id, row.version))) for row in rows]
+
+def get_or_create_startup(db: Session, startup_id: str) -> Startup:
+    db_startup = db.query(Startup).filter(Startup.id == startup_id).first()
+    if db_startup:
+        return db_startup
+    db.add(Startup(id=startup_id))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker created it first
+        db.rollback()
+    return db.query(Startup).filter(Startup.id == startup_id).one()
+
+def get_latest_snapshot(db: Session, startup_id: str) -> Optional[Snapshot]:
+    return db.query(Snapshot).filter(Snapshot.startup_id == startup_id).order_by(Snapshot.version.desc()).first()
+
+def next_version(db: Session, startup_id: str) -> int:
+    current = db.query(func.max(Snapshot.version)).filter(Snapshot.startup_id == startup_id).scalar()
+    return (current or 0) + 1
+
+def build_snapshot_row(draft: StartupSnapshot) -> Snapshot:
+    return Snapshot(
+        startup_id=draft.startup_id,
+        version=draft.version,
+        timestamp=draft.timestamp,
+        problem=draft.problem,
+        target_user=draft.target_user,
+        job_to_be_done=draft.job_to_be_done,
+        solution=draft.solution,
+        value_prop=draft.value_prop,
+        primary_channel_type=draft.primary_channel_type,
+        primary_channel_description=draft.primary_channel_description,
+        hypothesis=draft.hypothesis,
+        metric=draft.metric,
+        timeframe=draft.timeframe,
+        tech_feasibility_notes=draft.tech_feasibility_notes,
+        top_risks=draft.top_risks,
+        declared_next_steps=draft.declared_next_steps
+    )
+
+def input_hash(input_text: str) -> str:
+    # Whitespace and case changes do not change what the pipeline extracts
+    normalized = " ".join(input_text.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def _build_rows(result: AnalysisResponse, input_text: Optional[str]) -> Snapshot:
+    draft = result.snapshot
+    row = build_snapshot_row(draft)
+    row.drift_records = [
+        DriftRecord(
+            startup_id=draft.startup_id,
+            version=draft.version,
+            field=item.field,
+            before=item.before,
+            after=item.after,
+            classification=item.classification,
+            comment=item.comment,
+            score=item.score
+        )
+        for item in result.drift
+    ]
+    row.report = AnalysisReport(
+        startup_id=draft.startup_id,
+        version=draft.version,
+        input_hash=input_hash(input_text) if input_text is not None else None,
+        status=result.status,
+        dimension_reviews=[review.dict() for review in result.dimension_reviews],
+        experiments=[experiment.dict() for experiment in result.experiments]
+    )
+    return row
+
+def save_analysis(db: Session, result: AnalysisResponse, input_text: Optional[str] = None) -> Snapshot:
+    """
+    Inserts the analysed snapshot as the startup's next version, together with
+    its drift records and full report. The version is allocated at insert time
+    (not taken from the draft) and the unique (startup_id, version) index turns
+    a lost race into a retry instead of a duplicate row.
+    `result.snapshot.version` is updated to the version actually written.
+    """
+    draft = result.snapshot
+    for _ in range(VERSION_ALLOCATION_ATTEMPTS):
+        draft.version = next_version(db, draft.startup_id)
+        row = _build_rows(result, input_text)
+        db.add(row)
+        if snapshot_storage.delta_enabled():
+            snapshot_storage.encode_previous_versions(db, [row])
+        try:
+            db.commit()
+            return row
+        except IntegrityError:
+            db.rollback()
+    raise VersionConflictError(f"Could not allocate a snapshot version for startup '{draft.startup_id}'")
+
+def save_snapshot(db: Session, draft: StartupSnapshot) -> Snapshot:
+    # A bare snapshot, e.g. imported history without an analysis
+    return save_analysis(db, AnalysisResponse(snapshot=draft, dimension_reviews=[], experiments=[], drift=[], status="OK"))
+
+def save_analyses_bulk(db: Session, entries: List[Tuple[AnalysisResponse, Optional[str]]]) -> List[Snapshot]:
+    """
+    Inserts many (result, input_text) analyses in one transaction. Versions are
+    allocated per startup from a single MAX(version) query, in the order given.
+    """
+    for _ in range(VERSION_ALLOCATION_ATTEMPTS):
+        startup_ids = {result.snapshot.startup_id for result, _ in entries}
+        current = dict(
+            db.query(Snapshot.startup_id, func.max(Snapshot.version))
+            .filter(Snapshot.startup_id.in_(startup_ids))
+            .group_by(Snapshot.startup_id)
+            .all()
+        )
+        rows = []
+        for result, input_text in entries:
+            draft = result.snapshot
+            current[draft.startup_id] = (current.get(draft.startup_id) or 0) + 1
+            draft.version = current[draft.startup_id]
+            rows.append(_build_rows(result, input_text))
+        db.add_all(rows)
+        if snapshot_storage.delta_enabled():
+            snapshot_storage.encode_previous_versions(db, rows)
+        try:
+            db.commit()
+            return rows
+        except IntegrityError:
+            db.rollback()
+    raise VersionConflictError("Could not allocate snapshot versions for batch")
+
+# --- Read paths ---
+
+# Always returned by projected reads
+SNAPSHOT_KEY_FIELDS = ["startup_id", "version", "timestamp"]
+SNAPSHOT_FIELDS = [name for name in StartupSnapshot.__fields__ if name not in SNAPSHOT_KEY_FIELDS]
+
+def startup_exists(db: Session, startup_id: str) -> bool:
+    return db.query(Startup.id).filter(Startup.id == startup_id).first() is not None
+
+def get_snapshot(db: Session, startup_id: str, version: int) -> Optional[StartupSnapshot]:
+    row = db.query(Snapshot).filter(Snapshot.startup_id == startup_id, Snapshot.version == version).first()
+    return snapshots_from_orm(db, [row])[0] if row else None
+
+def list_snapshots(db: Session, startup_id: str, fields: Sequence[str], limit: int,
+                   before_version: Optional[int] = None, after_version: Optional[int] = None,
+                   descending: bool = True) -> Tuple[List[dict], Optional[int]]:
+    """
+    One page of a startup's history, selecting only the requested columns.
+    Keyset-paginated on version; returns (items, cursor for the next page).
+    """
+    names = SNAPSHOT_KEY_FIELDS + list(fields)
+    columns = [getattr(Snapshot, name) for name in names] + [Snapshot.storage]
+    query = db.query(*columns).filter(Snapshot.startup_id == startup_id)
+    if before_version is not None:
+        query = query.filter(Snapshot.version < before_version)
+    if after_version is not None:
+        query = query.filter(Snapshot.version > after_version)
+    query = query.order_by(Snapshot.version.desc() if descending else Snapshot.version.asc())
+
+    rows = query.limit(limit + 1).all()
+    items = [{name: row._mapping[name] for name in names} for row in rows[:limit]]
+    # Delta-encoded versions in the page are rebuilt together
+    deltas = [item["version"] for item, row in zip(items, rows) if row.storage == "delta"]
+    if deltas and fields:
+        rebuilt = rebuild_versions(db, startup_id, min(deltas), max(deltas))
+        for item in items:
+            if item["version"] in deltas:
+                item.update({name: rebuilt[item["version"]][name] for name in fields})
+    next_cursor = items[-1]["version"] if len(rows) > limit else None
+    return items, next_cursor
+
+def _drift_item(record: DriftRecord) -> DriftItem:
+    return DriftItem(
+        field=record.field,
+        before=record.before,
+        after=record.after,
+        classification=record.classification,
+        comment=record.comment,
+        score=record.score
+    )
+
+def list_drift_timeline(db: Session, startup_id: str, limit: int,
+                        after_version: Optional[int] = None) -> Tuple[List[DriftTimelineEntry], Optional[int]]:
+    """
+    Persisted drift per version (oldest first), keyset-paginated on version.
+    Versions without drift are skipped.
+    """
+    versions_query = (
+        db.query(DriftRecord.version)
+        .filter(DriftRecord.startup_id == startup_id)
+        .distinct()
+        .order_by(DriftRecord.version.asc())
+    )
+    if after_version is not None:
+        versions_query = versions_query.filter(DriftRecord.version > after_version)
+    versions = [v for (v,) in versions_query.limit(limit + 1).all()]
+    page, has_more = versions[:limit], len(versions) > limit
+    if not page:
+        return [], None
+
+    rows = (
+        db.query(DriftRecord, Snapshot.timestamp)
+        .join(Snapshot, Snapshot.id == DriftRecord.snapshot_id)
+        .filter(DriftRecord.startup_id == startup_id, DriftRecord.version.in_(page))
+        .order_by(DriftRecord.version.asc(), DriftRecord.id.asc())
+        .all()
+    )
+    entries: Dict[int, DriftTimelineEntry] = {}
+    for record, timestamp in rows:
+        entry = entries.setdefault(record.version, DriftTimelineEntry(version=record.version, timestamp=timestamp, drift=[]))
+        entry.drift.append(_drift_item(record))
+    return [entries[v] for v in page], page[-1] if has_more else None
+
+def report_from_orm(report: AnalysisReport, snapshot: Snapshot,
+                    draft: Optional[StartupSnapshot] = None) -> AnalysisResponse:
+    # Drift lives only in drift_records, which the timeline reads too
+    return AnalysisResponse(
+        snapshot=draft or snapshot_from_orm(snapshot),
+        dimension_reviews=report.dimension_reviews or [],
+        experiments=report.experiments or [],
+        drift=[_drift_item(record) for record in sorted(snapshot.drift_records, key=lambda r: r.id)],
+        status=report.status
+    )
+
+def _reports_query(db: Session, startup_id: str):
+    return (
+        db.query(AnalysisReport, Snapshot)
+        .join(Snapshot, Snapshot.id == AnalysisReport.snapshot_id)
+        .filter(AnalysisReport.startup_id == startup_id)
+        # One extra query for a page's drift records instead of one per report
+        .options(selectinload(Snapshot.drift_records))
+    )
+
+def _reports_from_rows(db: Session, rows) -> List[AnalysisResponse]:
+    drafts = snapshots_from_orm(db, [snapshot for _, snapshot in rows])
+    return [report_from_orm(report, snapshot, draft) for (report, snapshot), draft in zip(rows, drafts)]
+
+def get_report(db: Session, startup_id: str, version: int) -> Optional[AnalysisResponse]:
+    row = _reports_query(db, startup_id).filter(AnalysisReport.version == version).first()
+    return _reports_from_rows(db, [row])[0] if row else None
+
+def find_identical_report(db: Session, startup_id: str, input_text: str,
+                          latest_version: Optional[int]) -> Optional[AnalysisResponse]:
+    """
+    The stored report for a re-submission of the text that produced the
+    startup's latest version (same input, same prior snapshot), if any.
+    Re-running it would only re-derive that version and drift against itself.
+    """
+    if not latest_version:
+        return None
+    row = (
+        _reports_query(db, startup_id)
+        .filter(AnalysisReport.version == latest_version, AnalysisReport.input_hash == input_hash(input_text))
+        .first()
+    )
+    return _reports_from_rows(db, [row])[0] if row else None
+
+def list_reports(db: Session, startup_id: str, limit: int,
+                 before_version: Optional[int] = None) -> Tuple[List[AnalysisResponse], Optional[int]]:
+    """
+    Past reports, newest first, keyset-paginated on version (one indexed query).
+    """
+    query = _reports_query(db, startup_id)
+    if before_version is not None:
+        query = query.filter(AnalysisReport.version < before_version)
+    rows = query.order_by(AnalysisReport.version.desc()).limit(limit + 1).all()
+    items = _reports_from_rows(db, rows[:limit])
+    next_cursor = items[-1].snapshot.version if len(rows) > limit else None
+    return items, next_cursor
+
+# --- Analysis jobs ---
+
+def create_job(db: Session, startup_id: str, input_text: str, mode: Optional[str] = None) -> AnalysisJob:
+    job = AnalysisJob(startup_id=startup_id, input_text=input_text, mode=mode, status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: int) -> Optional[AnalysisJob]:
+    return db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+
+def job_status(db: Session, job: AnalysisJob) -> JobStatus:
+    result = get_report(db, job.startup_id, job.version) if job.status == "succeeded" and job.version else None
+    return JobStatus(
+        id=job.id,
+        startup_id=job.startup_id,
+        status=job.status,
+        attempts=job.attempts or 0,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=result
+    )
+
+def requeue_expired_jobs(db: Session, max_attempts: int) -> int:
+    """
+    Running jobs whose lease ran out (the worker died or was restarted) go back
+    to the queue, or fail once they have used up `max_attempts`.
+    """
+    expired = db.query(AnalysisJob).filter(
+        AnalysisJob.status == "running", AnalysisJob.lease_expires_at < datetime.utcnow()
+    )
+    exhausted = expired.filter(AnalysisJob.attempts >= max_attempts).update({
+        "status": "failed", "error": "Worker lost while running the job", "finished_at": datetime.utcnow(),
+        "worker_id": None, "lease_expires_at": None,
+    }, synchronize_session=False)
+    requeued = expired.update({"status": "queued", "worker_id": None, "lease_expires_at": None}, synchronize_session=False)
+    db.commit()
+    return exhausted + requeued
+
+def claim_job(db: Session, worker_id: str, lease_seconds: float, candidates: int = 20) -> Optional[AnalysisJob]:
+    """
+    Moves the oldest claimable job to running under a lease for `worker_id`.
+    Jobs for one startup run one at a time in submission order, so each drifts
+    against the version the previous one wrote. The queued -> running update is
+    conditional, so concurrent workers never both win the same job.
+    """
+    other = aliased(AnalysisJob)
+    blocked = exists().where(
+        other.startup_id == AnalysisJob.startup_id,
+        other.id != AnalysisJob.id,
+        or_(other.status == "running", and_(other.status == "queued", other.id < AnalysisJob.id)),
+    )
+    rows = (
+        db.query(AnalysisJob.id, AnalysisJob.startup_id)
+        .filter(AnalysisJob.status == "queued", ~blocked)
+        .order_by(AnalysisJob.id)
+        .limit(candidates)
+        .all()
+    )
+    for job_id, startup_id in rows:
+        now = datetime.utcnow()
+        claimed = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, AnalysisJob.status == "queued").update({
+            "status": "running", "worker_id": worker_id, "attempts": AnalysisJob.attempts + 1,
+            "started_at": now, "lease_expires_at": now + timedelta(seconds=lease_seconds),
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            continue
+        # Two workers can claim different jobs of one startup at the same time; the later one backs off
+        earlier = db.query(AnalysisJob.id).filter(
+            AnalysisJob.startup_id == startup_id, AnalysisJob.status == "running", AnalysisJob.id < job_id
+        ).first()
+        if earlier:
+            _release(db, [job_id])
+            continue
+        return get_job(db, job_id)
+    return None
+
+def extend_job_lease(db: Session, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """
+    False when the job is no longer this worker's (its lease expired and it was requeued).
+    """
+    extended = db.query(AnalysisJob).filter(
+        AnalysisJob.id == job_id, AnalysisJob.worker_id == worker_id, AnalysisJob.status == "running"
+    ).update({"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}, synchronize_session=False)
+    db.commit()
+    return bool(extended)
+
+def finish_job(db: Session, job_id: int, worker_id: str, version: Optional[int] = None,
+               error: Optional[str] = None, retry: bool = False) -> None:
+    """
+    Records the outcome of a claimed job: succeeded with the snapshot `version`,
+    failed with `error`, or back to queued for another attempt when `retry`.
+    """
+    if version is not None:
+        values = {"status": "succeeded", "version": version, "error": None}
+    elif retry:
+        values = {"status": "queued", "error": error}
+    else:
+        values = {"status": "failed", "error": error}
+    if values["status"] != "queued":
+        values["finished_at"] = datetime.utcnow()
+    values.update(worker_id=None, lease_expires_at=None)
+    db.query(AnalysisJob).filter(
+        AnalysisJob.id == job_id, AnalysisJob.worker_id == worker_id, AnalysisJob.status == "running"
+    ).update(values, synchronize_session=False)
+    db.commit()
+
+def _release(db: Session, job_ids: List[int]) -> None:
+    # Not the job's fault: the claim does not count as an attempt
+    db.query(AnalysisJob).filter(AnalysisJob.id.in_(job_ids), AnalysisJob.status == "running").update({
+        "status": "queued", "worker_id": None, "lease_expires_at": None, "attempts": AnalysisJob.attempts - 1,
+    }, synchronize_session=False)
+    db.commit()
+
+def release_worker_jobs(db: Session, worker_id: str) -> int:
+    """
+    Puts the jobs a stopping worker still holds back in the queue right away
+    instead of waiting for their leases to expire.
+    """
+    job_ids = [row.id for row in db.query(AnalysisJob.id).filter(
+        AnalysisJob.worker_id == worker_id, AnalysisJob.status == "running"
+    )]
+    if job_ids:
+        _release(db, job_ids)
+    return len(job_ids)
@@ -0,0 +1,142 @@
+"""
+Bulk export of snapshot history for offline analytics.
+
+Rows are read in keyset-paginated chunks ordered by (startup_id, version), so
+memory stays bounded by EXPORT_CHUNK_SIZE however large the table is.
+Delta-encoded versions are rebuilt per chunk. NDJSON and CSV are produced as
+text that can be streamed; Parquet and Arrow files need pyarrow.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from .crud import SNAPSHOT_FIELDS, SNAPSHOT_KEY_FIELDS, rebuild_versions
+from .models import Snapshot
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "500"))
+TEXT_FORMATS = ("ndjson", "csv")
+FILE_FORMATS = ("parquet", "arrow")
+EXPORT_FORMATS = TEXT_FORMATS + FILE_FORMATS
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+LIST_FIELDS = ("top_risks", "declared_next_steps")
+
+def iter_snapshot_chunks(db: Session, fields: Optional[Sequence[str]] = None,
+                         startup_ids: Optional[Sequence[str]] = None, since: Optional[datetime] = None,
+                         until: Optional[datetime] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Snapshots matching the filters as lists of at most `chunk_size` dicts
+    holding the key fields plus `fields` (all by default). `since` is
+    inclusive and `until` exclusive, both on the snapshot timestamp.
+    """
+    fields = list(SNAPSHOT_FIELDS if fields is None else fields)
+    names = SNAPSHOT_KEY_FIELDS + fields
+    query = db.query(*[getattr(Snapshot, name) for name in names], Snapshot.storage)
+    if startup_ids:
+        query = query.filter(Snapshot.startup_id.in_(list(startup_ids)))
+    if since is not None:
+        query = query.filter(Snapshot.timestamp >= since)
+    if until is not None:
+        query = query.filter(Snapshot.timestamp < until)
+    query = query.order_by(Snapshot.startup_id, Snapshot.version)
+
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            page = page.filter(or_(Snapshot.startup_id > last[0],
+                                   and_(Snapshot.startup_id == last[0], Snapshot.version > last[1])))
+        rows = page.limit(chunk_size).all()
+        if not rows:
+            return
+        items = [{name: row._mapping[name] for name in names} for row in rows]
+        _rebuild_deltas(db, items, rows, fields)
+        yield items
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1].startup_id, rows[-1].version)
+
+def _rebuild_deltas(db: Session, items: List[Dict[str, Any]], rows, fields: Sequence[str]) -> None:
+    deltas: Dict[str, List[Dict[str, Any]]] = {}
+    for item, row in zip(items, rows):
+        if row.storage == "delta":
+            deltas.setdefault(item["startup_id"], []).append(item)
+    for startup_id, delta_items in deltas.items():
+        versions = [item["version"] for item in delta_items]
+        rebuilt = rebuild_versions(db, startup_id, min(versions), max(versions))
+        for item in delta_items:
+            item.update({name: rebuilt[item["version"]][name] for name in fields})
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def ndjson_lines(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(json.dumps({k: _plain(v) for k, v in item.items()}) + "\n" for item in chunk)
+
+def csv_lines(chunks: Iterator[List[Dict[str, Any]]], fields: Sequence[str]) -> Iterator[str]:
+    """
+    One CSV text block per chunk, the first with the header. List fields are
+    written as JSON arrays.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=SNAPSHOT_KEY_FIELDS + list(fields))
+    writer.writeheader()
+    for chunk in chunks:
+        for item in chunk:
+            writer.writerow({k: json.dumps(v) if k in LIST_FIELDS and v is not None else _plain(v) for k, v in item.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # No rows: still emit the header
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def text_export(chunks: Iterator[List[Dict[str, Any]]], export_format: str, fields: Sequence[str]) -> Iterator[str]:
+    if export_format == "ndjson":
+        return ndjson_lines(chunks)
+    if export_format == "csv":
+        return csv_lines(chunks, fields)
+    raise ValueError(f"'{export_format}' is not a text export format, expected one of {TEXT_FORMATS}")
+
+def _arrow_schema(fields: Sequence[str]):
+    import pyarrow as pa
+
+    types = {"startup_id": pa.string(), "version": pa.int64(), "timestamp": pa.timestamp("us")}
+    for name in fields:
+        types[name] = pa.list_(pa.string()) if name in LIST_FIELDS else pa.string()
+    return pa.schema([(name, types[name]) for name in SNAPSHOT_KEY_FIELDS + list(fields)])
+
+def write_columnar(chunks: Iterator[List[Dict[str, Any]]], path: str, export_format: str, fields: Sequence[str]) -> int:
+    """
+    Writes a Parquet or Arrow IPC file one record batch per chunk; returns the
+    number of rows written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"Exporting {export_format} needs pyarrow: pip install pyarrow")
+
+    schema = _arrow_schema(fields)
+    if export_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    elif export_format == "arrow":
+        writer = pyarrow.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f"'{export_format}' is not a file export format, expected one of {FILE_FORMATS}")
+    rows = 0
+    try:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
@@ -1,17 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import json
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import Optional
-from pydantic import BaseModel
-
-from .db import get_db, init_db, SessionLocal
-from .models import Startup, Snapshot, AnalysisResponse, StartupSnapshot
-from .services.snapshot_extractor import extract_snapshot
-from .services.user_validator import validate_target_user
-from .services.channel_enforcer import enforce_channel
-from .services.hypothesis_enforcer import enforce_hypothesis
-from .services.drift_analyzer import analyze_drift
-from .services.review_engine import generate_reviews_and_experiments
+from sqlalchemy.orm import Session, sessionmaker
+from typing import List, Optional
+from pydantic import BaseModel, validator
+
+from .db import get_db, init_db
+from .models import AnalysisResponse, StartupSnapshot, BatchAnalyzeRequest, SnapshotPage, DriftTimeline, ReportPage, AnalysisMode, TokenUsage, JobStatus, SimilarStartups
+from .crud import (
+    get_or_create_startup, get_latest_snapshot, snapshot_from_orm, save_analysis, VersionConflictError,
+    startup_exists, get_snapshot, list_snapshots, list_drift_timeline, SNAPSHOT_FIELDS,
+    find_identical_report, get_report, list_reports, create_job, get_job, job_status
+)
+from .concurrency import startup_locks
+from . import metrics
+from .export import EXPORT_CHUNK_SIZE, MEDIA_TYPES, TEXT_FORMATS, iter_snapshot_chunks, text_export
+from .services.batch import analyze_batch
+from .services.resilience import LLMUnavailableError
+from .services.similarity import SIMILARITY_FIELDS, index_for
+from .services.token_budget import cap_input
+from .services.pipeline import run_analysis, stage_timer, STAGE_OBSERVERS, ExtractionError
 
 app = FastAPI(title="Founder Reality-Check Agent")
 
@@ -23,112 +35,306 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+STAGE_OBSERVERS.append(metrics.observe_stage)
+
 @app.on_event("startup")
 def on_startup():
     init_db()
 
 class AnalyzeRequest(BaseModel):
     input_text: str
+    # "chain" or "plan" (single fused LLM call); None uses ANALYSIS_MODE
+    mode: Optional[AnalysisMode] = None
 
-@app.post("/api/startups/{startup_id}/analyze", response_model=AnalysisResponse)
-def analyze_startup(startup_id: str, request: AnalyzeRequest, db: Session = Depends(get_db)):
+    @validator("input_text")
+    def _cap_input(cls, value: str) -> str:
+        # Over MAX_INPUT_TOKENS: 422, or truncated with INPUT_OVERFLOW=truncate
+        return cap_input(value)
+
+def _load_latest_snapshot(db: Session, startup_id: str) -> Optional[StartupSnapshot]:
     # 1. Load latest snapshot
-    db_startup = db.query(Startup).filter(Startup.id == startup_id).first()
-    if not db_startup:
-        db_startup = Startup(id=startup_id)
-        db.add(db_startup)
-        db.commit()
-        current_version = 0
-        latest_snapshot_orm = None
-    else:
-        latest_snapshot_orm = db.query(Snapshot).filter(Snapshot.startup_id == startup_id).order_by(Snapshot.version.desc()).first()
-        current_version = latest_snapshot_orm.version if latest_snapshot_orm else 0
-
-    # 2. Extract new snapshot draft
-    try:
-        new_snapshot_draft = extract_snapshot(startup_id, request.input_text, current_version)
-    except Exception as e:
-        print(f"Error extracting snapshot: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-    # 3. Run Validators
-    user_validation = validate_target_user(new_snapshot_draft.target_user)
-    
-    # Update draft if improved user suggested and original was bad (optional, or just pass feedback)
-    # For now, we keep the user's text but flag it.
-    
-    channel_enforcement = enforce_channel(new_snapshot_draft.primary_channel_description or request.input_text)
-    # Apply enforcement to draft
-    new_snapshot_draft.primary_channel_type = channel_enforcement.get("primary_channel_type")
-    new_snapshot_draft.primary_channel_description = channel_enforcement.get("primary_channel_description")
-    
-    hypothesis_enforcement = enforce_hypothesis(new_snapshot_draft.dict())
-    new_snapshot_draft.hypothesis = hypothesis_enforcement.get("hypothesis")
-    new_snapshot_draft.metric = hypothesis_enforcement.get("metric")
-    new_snapshot_draft.timeframe = hypothesis_enforcement.get("timeframe")
-
-    validation_issues = {
-        "user": user_validation,
-        "channel": channel_enforcement,
-        "hypothesis": hypothesis_enforcement
+    with stage_timer("db_read"):
+        get_or_create_startup(db, startup_id)
+        latest_snapshot_orm = get_latest_snapshot(db, startup_id)
+
+    # Convert ORM to Pydantic for drift comparison
+    return snapshot_from_orm(latest_snapshot_orm) if latest_snapshot_orm else None
+
+def _find_stored_report(db: Session, startup_id: str, input_text: str,
+                        latest_snapshot: Optional[StartupSnapshot]) -> Optional[AnalysisResponse]:
+    # Identical re-submission against the same prior snapshot: serve the stored report
+    with stage_timer("db_read"):
+        return find_identical_report(db, startup_id, input_text, latest_snapshot.version if latest_snapshot else None)
+
+def _save_analysis(db: Session, result: AnalysisResponse, input_text: str) -> None:
+    # 6. Save new snapshot, drift and report; the version is allocated atomically at insert time
+    with stage_timer("db_write"):
+        try:
+            save_analysis(db, result, input_text)
+        except VersionConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/api/startups/analyze-batch")
+async def analyze_startups_batch(request: BatchAnalyzeRequest, db: Session = Depends(get_db)):
+    """
+    Analyzes many (startup_id, input_text) items and streams one NDJSON
+    BatchItemResult line per item as soon as its snapshot is committed.
+    """
+    # Batch workers open their own sessions on the same engine as this request
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+    async def results():
+        async for item in analyze_batch(request.items, session_factory, request.max_workers, mode=request.mode):
+            yield item.json() + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/api/startups/{startup_id}/analyze", response_model=AnalysisResponse,
+          responses={202: {"model": JobStatus, "description": "Queued with async=true; poll the Location header"}})
+async def analyze_startup(
+    startup_id: str,
+    request: AnalyzeRequest,
+    response: Response,
+    run_async: bool = Query(False, alias="async", description="Queue the analysis and return a job to poll at /api/jobs/{id}"),
+    db: Session = Depends(get_db)
+):
+    if run_async:
+        # Only the insert happens here; worker processes (python -m app.cli worker) run the pipeline
+        job = await asyncio.to_thread(_enqueue_job, db, startup_id, request)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job), headers={"Location": f"/api/jobs/{job.id}"})
+
+    # Overlapping submissions for one startup run one after another so each
+    # sees (and drifts against) the version the previous one wrote
+    with metrics.track_request("analyze") as stats:
+        async with startup_locks.hold(startup_id):
+            # Blocking DB work runs in a worker thread, off the event loop
+            latest_snapshot = await asyncio.to_thread(_load_latest_snapshot, db, startup_id)
+            stored = await asyncio.to_thread(_find_stored_report, db, startup_id, request.input_text, latest_snapshot)
+            if stored:
+                metrics.ANALYSIS_REUSED.inc(endpoint="analyze")
+                # No LLM calls were made: the headers report zero usage
+                response.headers.update(_usage_headers(stats))
+                return stored
+
+            # 2-5. Extraction, validators, drift and reviews; independent LLM calls run concurrently
+            try:
+                result = await run_analysis(startup_id, request.input_text, latest_snapshot, mode=request.mode)
+            except ExtractionError as e:
+                raise HTTPException(status_code=500, detail=str(e))
+            except LLMUnavailableError as e:
+                raise _unavailable(e)
+
+            await asyncio.to_thread(_save_analysis, db, result, request.input_text)
+            response.headers.update(_usage_headers(stats))
+            return result
+
+def _enqueue_job(db: Session, startup_id: str, request: AnalyzeRequest) -> JobStatus:
+    with stage_timer("db_write"):
+        return job_status(db, create_job(db, startup_id, request.input_text, request.mode))
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+def read_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Status of an async analysis job; `result` holds the AnalysisResponse once it succeeded.
+    """
+    job = get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_status(db, job)
+
+def _usage_headers(stats: metrics.RequestStats) -> dict:
+    usage = stats.usage()
+    return {
+        "X-LLM-Calls": str(usage["llm_calls"]),
+        "X-LLM-Cache-Hits": str(usage["cache_hits"]),
+        "X-LLM-Prompt-Tokens": str(usage["prompt_tokens"]),
+        "X-LLM-Response-Tokens": str(usage["response_tokens"]),
     }
 
-    # 4. Drift Analysis
-    drift_items = []
-    if latest_snapshot_orm:
-        # Convert ORM to Pydantic for comparison
-        old_snapshot = StartupSnapshot(
-            startup_id=latest_snapshot_orm.startup_id,
-            version=latest_snapshot_orm.version,
-            problem=latest_snapshot_orm.problem,
-            target_user=latest_snapshot_orm.target_user,
-            job_to_be_done=latest_snapshot_orm.job_to_be_done,
-            solution=latest_snapshot_orm.solution,
-            value_prop=latest_snapshot_orm.value_prop,
-            primary_channel_type=latest_snapshot_orm.primary_channel_type,
-            primary_channel_description=latest_snapshot_orm.primary_channel_description,
-            hypothesis=latest_snapshot_orm.hypothesis,
-            metric=latest_snapshot_orm.metric,
-            timeframe=latest_snapshot_orm.timeframe,
-            tech_feasibility_notes=latest_snapshot_orm.tech_feasibility_notes,
-            top_risks=latest_snapshot_orm.top_risks or [],
-            declared_next_steps=latest_snapshot_orm.declared_next_steps or []
-        )
-        drift_items = analyze_drift(old_snapshot, new_snapshot_draft)
-
-    # 5. Review Engine
-    reviews, experiments, status = generate_reviews_and_experiments(new_snapshot_draft, validation_issues)
-
-    # 6. Save new snapshot
-    new_orm = Snapshot(
-        startup_id=startup_id,
-        version=new_snapshot_draft.version,
-        timestamp=new_snapshot_draft.timestamp,
-        problem=new_snapshot_draft.problem,
-        target_user=new_snapshot_draft.target_user,
-        job_to_be_done=new_snapshot_draft.job_to_be_done,
-        solution=new_snapshot_draft.solution,
-        value_prop=new_snapshot_draft.value_prop,
-        primary_channel_type=new_snapshot_draft.primary_channel_type,
-        primary_channel_description=new_snapshot_draft.primary_channel_description,
-        hypothesis=new_snapshot_draft.hypothesis,
-        metric=new_snapshot_draft.metric,
-        timeframe=new_snapshot_draft.timeframe,
-        tech_feasibility_notes=new_snapshot_draft.tech_feasibility_notes,
-        top_risks=new_snapshot_draft.top_risks,
-        declared_next_steps=new_snapshot_draft.declared_next_steps
-    )
-    db.add(new_orm)
-    db.commit()
-
-    return AnalysisResponse(
-        snapshot=new_snapshot_draft,
-        dimension_reviews=reviews,
-        experiments=experiments,
-        drift=drift_items,
-        status=status
-    )
+def _unavailable(error: LLMUnavailableError) -> HTTPException:
+    headers = {"Retry-After": str(int(error.retry_after + 0.999))} if error.retry_after else None
+    return HTTPException(status_code=503, detail=str(error), headers=headers)
+
+def _ndjson_event(event: str, payload) -> str:
+    return json.dumps({"event": event, "data": jsonable_encoder(payload)}) + "\n"
+
+@app.post("/api/startups/{startup_id}/analyze/stream")
+async def analyze_startup_stream(startup_id: str, request: AnalyzeRequest, db: Session = Depends(get_db)):
+    """
+    Same pipeline as /analyze, streamed as NDJSON: one line per partial result
+    ("snapshot", "dimension_review", "drift", "experiments") as each stage finishes,
+    then a "usage" line with the request's LLM token usage and a final
+    "complete" line carrying the full AnalysisResponse.
+    """
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        with metrics.track_request("analyze_stream") as stats:
+            async with startup_locks.hold(startup_id):
+                latest_snapshot = await asyncio.to_thread(_load_latest_snapshot, db, startup_id)
+                stored = await asyncio.to_thread(_find_stored_report, db, startup_id, request.input_text, latest_snapshot)
+                if stored:
+                    metrics.ANALYSIS_REUSED.inc(endpoint="analyze_stream")
+                    yield _ndjson_event("complete", stored)
+                    return
+                task = asyncio.ensure_future(run_analysis(
+                    startup_id, request.input_text, latest_snapshot,
+                    on_event=lambda event, payload: queue.put_nowait((event, payload)),
+                    mode=request.mode
+                ))
+                task.add_done_callback(lambda _: queue.put_nowait(None))
+                try:
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            break
+                        yield _ndjson_event(*item)
+
+                    try:
+                        result = task.result()
+                        await asyncio.to_thread(_save_analysis, db, result, request.input_text)
+                    except LLMUnavailableError as e:
+                        yield _ndjson_event("error", {"detail": str(e), "status_code": 503})
+                        return
+                    except Exception as e:
+                        detail = e.detail if isinstance(e, HTTPException) else str(e)
+                        yield _ndjson_event("error", {"detail": detail})
+                        return
+                    yield _ndjson_event("usage", TokenUsage(**stats.usage()))
+                    yield _ndjson_event("complete", result)
+                finally:
+                    if not task.done():
+                        task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _require_startup(db: Session, startup_id: str) -> None:
+    if not startup_exists(db, startup_id):
+        raise HTTPException(status_code=404, detail=f"Startup '{startup_id}' not found")
+
+@app.get("/api/startups/{startup_id}/snapshots", response_model=SnapshotPage)
+def list_startup_snapshots(
+    startup_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated snapshot fields to return; all by default"),
+    limit: int = Query(20, ge=1, le=200),
+    before: Optional[int] = Query(None, description="Cursor: return versions older than this one"),
+    db: Session = Depends(get_db)
+):
+    """
+    A startup's snapshot history, newest first, keyset-paginated on version.
+    Pass `next_cursor` back as `before` to fetch the following page.
+    """
+    _require_startup(db, startup_id)
+    selected = SNAPSHOT_FIELDS if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in SNAPSHOT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown snapshot fields: {', '.join(unknown)}")
+    items, next_cursor = list_snapshots(db, startup_id, selected, limit, before_version=before)
+    return SnapshotPage(items=items, next_cursor=next_cursor)
+
+@app.get("/api/startups/{startup_id}/snapshots/{version}", response_model=StartupSnapshot)
+def read_startup_snapshot(startup_id: str, version: int, db: Session = Depends(get_db)):
+    snapshot = get_snapshot(db, startup_id, version)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Snapshot v{version} of '{startup_id}' not found")
+    return snapshot
+
+@app.get("/api/startups/{startup_id}/drift", response_model=DriftTimeline)
+def read_drift_timeline(
+    startup_id: str,
+    limit: int = Query(20, ge=1, le=200),
+    after: Optional[int] = Query(None, description="Cursor: return versions newer than this one"),
+    db: Session = Depends(get_db)
+):
+    """
+    Drift recorded at save time for each version, oldest first. No LLM calls.
+    """
+    _require_startup(db, startup_id)
+    items, next_cursor = list_drift_timeline(db, startup_id, limit, after_version=after)
+    return DriftTimeline(items=items, next_cursor=next_cursor)
+
+@app.get("/api/startups/{startup_id}/reports", response_model=ReportPage)
+def list_startup_reports(
+    startup_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = Query(None, description="Cursor: return versions older than this one"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stored AnalysisResponses, newest first, keyset-paginated on version.
+    """
+    _require_startup(db, startup_id)
+    items, next_cursor = list_reports(db, startup_id, limit, before_version=before)
+    return ReportPage(items=items, next_cursor=next_cursor)
+
+@app.get("/api/startups/{startup_id}/reports/{version}", response_model=AnalysisResponse)
+def read_startup_report(startup_id: str, version: int, db: Session = Depends(get_db)):
+    report = get_report(db, startup_id, version)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Report for v{version} of '{startup_id}' not found")
+    return report
+
+@app.get("/api/startups/{startup_id}/similar", response_model=SimilarStartups)
+def find_similar_startups(
+    startup_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = Query(None, description=f"Comma-separated fields to compare; default {','.join(SIMILARITY_FIELDS)}"),
+    min_score: float = Query(0.0, ge=0.0, le=1.0),
+    db: Session = Depends(get_db)
+):
+    """
+    Startups whose latest snapshot reads most like this one's, from the local
+    n-gram similarity index. No LLM calls.
+    """
+    _require_startup(db, startup_id)
+    selected = None if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected or [] if f not in SIMILARITY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown similarity fields: {', '.join(unknown)}")
+    with stage_timer("similarity"):
+        items = index_for(db).similar(startup_id, limit, selected, min_score)
+    if items is None:
+        raise HTTPException(status_code=404, detail=f"Startup '{startup_id}' has no snapshots")
+    return SimilarStartups(items=items)
+
+@app.get("/api/export")
+def export_snapshots(
+    format: str = Query("ndjson", description=f"One of {', '.join(TEXT_FORMATS)}"),
+    startup_id: Optional[List[str]] = Query(None, description="Only these startups (repeatable); all by default"),
+    since: Optional[datetime] = Query(None, description="Snapshots saved at or after this time"),
+    until: Optional[datetime] = Query(None, description="Snapshots saved before this time"),
+    fields: Optional[str] = Query(None, description="Comma-separated snapshot fields to export; all by default"),
+    db: Session = Depends(get_db)
+):
+    """
+    Streams every matching snapshot version, ordered by startup and version,
+    as NDJSON or CSV. Rows are read in chunks, so memory use does not grow
+    with the size of the history. Parquet/Arrow files: `python -m app.cli export`.
+    """
+    if format not in TEXT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{format}', expected one of {', '.join(TEXT_FORMATS)}")
+    selected = SNAPSHOT_FIELDS if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in SNAPSHOT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown snapshot fields: {', '.join(unknown)}")
+
+    # The stream outlives the request's session, so it opens its own on the same engine
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+    def rows():
+        export_db = session_factory()
+        try:
+            chunks = iter_snapshot_chunks(export_db, selected, startup_id, since, until, EXPORT_CHUNK_SIZE)
+            yield from text_export(chunks, format, selected)
+        finally:
+            export_db.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="snapshots.{format}"'}
+    return StreamingResponse(rows(), media_type=MEDIA_TYPES[format], headers=headers)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,259 @@
+"""
+Minimal in-process Prometheus metrics: counters, gauges and histograms rendered
+in the text exposition format at GET /metrics.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+# Stage the current coroutine is working on; LLM calls are attributed to it
+current_stage: ContextVar[str] = ContextVar("current_stage", default="other")
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per series: one counter per bucket, then sum and count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def sum(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-2] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(series[i])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "founder_agent_requests_total", "Analysis requests handled.", ["endpoint", "outcome"]))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "founder_agent_request_duration_seconds", "Wall time of analysis requests.", ["endpoint"]))
+REQUEST_LLM_CALLS = REGISTRY.register(Histogram(
+    "founder_agent_request_llm_calls", "LLM calls made per analysis request (cache hits excluded).", ["endpoint"], COUNT_BUCKETS))
+REQUEST_TOKENS = REGISTRY.register(Histogram(
+    "founder_agent_request_tokens", "Estimated prompt+response tokens per analysis request.", ["endpoint"], SIZE_BUCKETS))
+ANALYSIS_REUSED = REGISTRY.register(Counter(
+    "founder_agent_analysis_reused_total", "Re-submissions answered from a stored report without running the pipeline.", ["endpoint"]))
+PLAN_FALLBACKS = REGISTRY.register(Counter(
+    "founder_agent_plan_fallbacks_total", "Fused analysis-plan responses rejected in favour of the multi-call chain."))
+JOBS = REGISTRY.register(Counter(
+    "founder_agent_jobs_total", "Async analysis jobs finished by workers (retried: requeued after a transient error).", ["status"]))
+PREVALIDATION = REGISTRY.register(Counter(
+    "founder_agent_prevalidation_total", "Validator inputs answered by local rules (local) or sent to the LLM (llm).", ["stage", "outcome"]))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "founder_agent_stage_duration_seconds", "Wall time of each pipeline stage.", ["stage"]))
+
+LLM_CALLS = REGISTRY.register(Counter(
+    "founder_agent_llm_calls_total", "LLM provider calls.", ["stage", "model"]))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "founder_agent_llm_errors_total", "LLM calls that raised or returned invalid JSON.", ["stage", "model"]))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "founder_agent_llm_retries_total", "LLM call retries.", ["stage", "model"]))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "founder_agent_llm_hedges_total", "Hedged second attempts started for slow LLM calls.", ["stage", "model"]))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "founder_agent_llm_queue_depth", "LLM calls waiting for a concurrency slot or rate/token budget.", ["priority"]))
+LLM_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "founder_agent_llm_queue_wait_seconds", "Time LLM calls spent queued before admission.", ["priority"]))
+LLM_CACHE_HITS = REGISTRY.register(Counter(
+    "founder_agent_llm_cache_hits_total", "LLM calls answered from the response cache.", ["stage", "model"]))
+LLM_CALL_DURATION = REGISTRY.register(Histogram(
+    "founder_agent_llm_call_duration_seconds", "Latency of individual LLM calls.", ["stage", "model"]))
+LLM_PROMPT_CHARS = REGISTRY.register(Counter(
+    "founder_agent_llm_prompt_chars_total", "Characters sent to the LLM.", ["stage", "model"]))
+LLM_RESPONSE_CHARS = REGISTRY.register(Counter(
+    "founder_agent_llm_response_chars_total", "Characters received from the LLM.", ["stage", "model"]))
+LLM_PROMPT_TOKENS = REGISTRY.register(Counter(
+    "founder_agent_llm_prompt_tokens_total", "Estimated tokens sent to the LLM.", ["stage", "model"]))
+LLM_RESPONSE_TOKENS = REGISTRY.register(Counter(
+    "founder_agent_llm_response_tokens_total", "Estimated tokens received from the LLM.", ["stage", "model"]))
+
+class RequestStats:
+    """
+    Mutable per-request tally shared by every task spawned for the request.
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.response_tokens
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "llm_calls": self.llm_calls,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+        }
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return (len(text) + 3) // 4 if text else 0
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_DURATION.observe(seconds, stage=stage)
+
+def record_llm_call(model: str, prompt: str, response: Optional[str], seconds: float, error: bool = False) -> None:
+    stage = current_stage.get()
+    prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(response or "")
+    LLM_CALLS.inc(stage=stage, model=model)
+    LLM_CALL_DURATION.observe(seconds, stage=stage, model=model)
+    LLM_PROMPT_CHARS.inc(len(prompt), stage=stage, model=model)
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, stage=stage, model=model)
+    if response is not None:
+        LLM_RESPONSE_CHARS.inc(len(response), stage=stage, model=model)
+        LLM_RESPONSE_TOKENS.inc(response_tokens, stage=stage, model=model)
+    if error:
+        LLM_ERRORS.inc(stage=stage, model=model)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.response_tokens += response_tokens
+
+def record_cache_hit(model: str) -> None:
+    LLM_CACHE_HITS.inc(stage=current_stage.get(), model=model)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.cache_hits += 1
+
+def record_retry(model: str) -> None:
+    LLM_RETRIES.inc(stage=current_stage.get(), model=model)
+
+def record_hedge(model: str) -> None:
+    LLM_HEDGES.inc(stage=current_stage.get(), model=model)
+
+@contextmanager
+def track_request(endpoint: str):
+    """
+    Wraps one analysis request: times it and records its LLM call/token totals.
+    """
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield stats
+        outcome = "ok"
+    finally:
+        _request_stats.reset(token)
+        REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+        REQUEST_DURATION.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUEST_LLM_CALLS.observe(stats.llm_calls, endpoint=endpoint)
+        REQUEST_TOKENS.observe(stats.tokens, endpoint=endpoint)
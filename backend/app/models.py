@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Integer, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, JSON, LargeBinary, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -45,11 +45,106 @@ class Snapshot(Base):
     tech_feasibility_notes = Column(Text, nullable=True)
     top_risks = Column(JSON, default=list) # List[str]
     declared_next_steps = Column(JSON, default=list) # List[str]
+
+    # None: the columns above hold the version. "delta": they are empty and `payload`
+    # holds the compressed fields that differ from the next version (see snapshot_storage)
+    storage = Column(String, nullable=True)
+    payload = Column(LargeBinary, nullable=True)
     
     startup = relationship("Startup", back_populates="snapshots")
+    drift_records = relationship("DriftRecord", back_populates="snapshot", cascade="all, delete-orphan")
+    report = relationship("AnalysisReport", back_populates="snapshot", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # One row per version; also serves the "latest snapshot" lookup (ORDER BY version DESC)
+        Index("uq_snapshots_startup_id_version", "startup_id", "version", unique=True),
+    )
+
+class DriftRecord(Base):
+    """
+    Drift detected when `version` was saved, so timelines never re-run the LLM.
+    """
+    __tablename__ = "drift_records"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), nullable=False)
+    startup_id = Column(String, ForeignKey("startups.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    before = Column(Text, nullable=True)
+    after = Column(Text, nullable=True)
+    classification = Column(String, nullable=False)
+    comment = Column(Text, nullable=True)
+    score = Column(Float, nullable=True)
+
+    snapshot = relationship("Snapshot", back_populates="drift_records")
+
+    __table_args__ = (
+        Index("ix_drift_records_startup_id_version", "startup_id", "version"),
+    )
+
+class AnalysisReport(Base):
+    """
+    The rest of the AnalysisResponse that produced a snapshot (its drift is in
+    drift_records), stored so past reports and identical re-submissions are
+    served without re-running the pipeline.
+    """
+    __tablename__ = "analysis_reports"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, ForeignKey("snapshots.id"), nullable=False)
+    startup_id = Column(String, ForeignKey("startups.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    # Hash of the normalized input text the report was computed from
+    input_hash = Column(String(64), nullable=True)
+    status = Column(String, nullable=False)
+    dimension_reviews = Column(JSON, default=list)
+    experiments = Column(JSON, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    snapshot = relationship("Snapshot", back_populates="report")
+
+    __table_args__ = (
+        Index("uq_analysis_reports_snapshot_id", "snapshot_id", unique=True),
+        # Report history and the identical-resubmission lookup, which filters on
+        # input_hash within the single row for the latest version
+        Index("ix_analysis_reports_startup_id_version", "startup_id", "version"),
+    )
+
+class AnalysisJob(Base):
+    """
+    A queued /analyze?async=true submission. Workers claim jobs by flipping
+    status from queued to running under a lease; a job whose lease expires
+    (its worker died or was restarted) goes back to queued and is resumed.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    startup_id = Column(String, nullable=False)
+    input_text = Column(Text, nullable=False)
+    mode = Column(String, nullable=True)
+    # queued | running | succeeded | failed
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    # Snapshot version the job produced (or found already stored); the report is read from there
+    version = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The claim query: oldest queued job, skipping startups with one running
+        Index("ix_analysis_jobs_status_id", "status", "id"),
+        Index("ix_analysis_jobs_startup_id_status", "startup_id", "status"),
+    )
 
 # --- Pydantic Models ---
 
+ChannelType = Literal["cold_outreach", "community", "paid_ads", "partnerships", "marketplace", "product_led"]
+
 class StartupSnapshot(BaseModel):
     startup_id: str
     version: int
@@ -62,7 +157,7 @@ class StartupSnapshot(BaseModel):
     solution: Optional[str] = None
     value_prop: Optional[str] = None
     
-    primary_channel_type: Optional[Literal["cold_outreach", "community", "paid_ads", "partnerships", "marketplace", "product_led"]] = None
+    primary_channel_type: Optional[ChannelType] = None
     primary_channel_description: Optional[str] = None
     
     hypothesis: Optional[str] = None
@@ -73,6 +168,23 @@ class StartupSnapshot(BaseModel):
     top_risks: List[str] = Field(default_factory=list)
     declared_next_steps: List[str] = Field(default_factory=list)
 
+class UserValidation(BaseModel):
+    is_valid: bool
+    reason: Optional[str] = None
+    improved_target_user: Optional[str] = None
+
+class ChannelEnforcement(BaseModel):
+    primary_channel_type: Optional[ChannelType] = None
+    primary_channel_description: Optional[str] = None
+    other_channels: List[str] = Field(default_factory=list)
+    issues: List[str] = Field(default_factory=list)
+
+class HypothesisEnforcement(BaseModel):
+    hypothesis: Optional[str] = None
+    metric: Optional[str] = None
+    timeframe: Optional[str] = None
+    issues: List[str] = Field(default_factory=list)
+
 class DimensionReview(BaseModel):
     dimension: str
     severity: Literal["blocker", "major", "minor", "ok"]
@@ -93,6 +205,10 @@ class DriftItem(BaseModel):
     after: Optional[str]
     classification: Literal["major_change", "minor_refinement"]
     comment: Optional[str] = None
+    # 0 (same wording) to 1 (nothing in common) from hashed n-gram vectors; None when a side is empty
+    score: Optional[float] = None
+
+AnalysisMode = Literal["chain", "plan"]
 
 class AnalysisResponse(BaseModel):
     snapshot: StartupSnapshot
@@ -100,3 +216,70 @@ class AnalysisResponse(BaseModel):
     experiments: List[Experiment]
     drift: List[DriftItem]
     status: Literal["BLOCKED", "OK"]
+
+class ReportPage(BaseModel):
+    items: List[AnalysisResponse]
+    next_cursor: Optional[int] = None
+
+class BatchItem(BaseModel):
+    startup_id: str
+    input_text: str
+
+class BatchAnalyzeRequest(BaseModel):
+    items: List[BatchItem]
+    max_workers: Optional[int] = Field(None, ge=1)
+    # None uses ANALYSIS_MODE
+    mode: Optional[AnalysisMode] = None
+
+class TokenUsage(BaseModel):
+    # Estimated LLM usage of one analysis request; zero calls when a stored report was reused
+    llm_calls: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+
+class BatchItemResult(BaseModel):
+    index: int
+    startup_id: str
+    status: Literal["ok", "error"]
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+
+class SnapshotPage(BaseModel):
+    # Projected snapshots: startup_id, version and timestamp plus the requested fields
+    items: List[dict]
+    next_cursor: Optional[int] = None
+
+class DriftTimelineEntry(BaseModel):
+    version: int
+    timestamp: Optional[datetime] = None
+    drift: List[DriftItem]
+
+class DriftTimeline(BaseModel):
+    items: List[DriftTimelineEntry]
+    next_cursor: Optional[int] = None
+
+JobState = Literal["queued", "running", "succeeded", "failed"]
+
+class JobStatus(BaseModel):
+    id: int
+    startup_id: str
+    status: JobState
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Set once the job succeeded
+    result: Optional[AnalysisResponse] = None
+
+class SimilarStartup(BaseModel):
+    startup_id: str
+    version: int
+    # Mean cosine similarity over the compared fields both snapshots state
+    score: float
+    field_scores: Dict[str, float] = Field(default_factory=dict)
+
+class SimilarStartups(BaseModel):
+    items: List[SimilarStartup]
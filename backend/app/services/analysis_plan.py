@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+from pydantic import ValidationError
+from ..models import StartupSnapshot, UserValidation, ChannelEnforcement, HypothesisEnforcement
+from .llm_client import LLMClient, client_for
+from .snapshot_extractor import _to_snapshot
+from .user_validator import _precheck as _precheck_user
+from .channel_enforcer import _precheck as _precheck_channel
+from .prevalidation import check_hypothesis, flag_vanity_metric
+
+class PlanValidationError(Exception):
+    pass
+
+def _build_prompt(input_text: str) -> str:
+    return f"""
+    Produce a single analysis plan for this founder's startup idea: extract the
+    idea, then validate its target user, distribution channel and hypothesis.
+
+    Input Text:
+    "{input_text}"
+
+    Extract the following snapshot fields:
+    - problem, target_user (close to their words), job_to_be_done, solution, value_prop
+    - primary_channel_type: One of ["cold_outreach", "community", "paid_ads", "partnerships", "marketplace", "product_led"] or null.
+    - primary_channel_description, hypothesis, metric, timeframe, tech_feasibility_notes
+    - top_risks, declared_next_steps: lists of strings.
+
+    Then, using the extracted snapshot:
+    1. user_validation: is the target user concrete? It must define WHO (role), WHERE (context) and WHAT they are doing.
+       BAD: "startups", "students". GOOD: "early-stage B2B SaaS founders at seed preparing their first pitch deck".
+    2. channel: the ONE primary channel type, an executable description, other channels mentioned,
+       and issues if the description is vague (e.g. "go viral", "social media" without platform/strategy).
+    3. hypothesis: rewrite as "For <target_user>, if we offer <solution> through <channel>, then within <timeframe>
+       we expect <measurable change in <metric>>.", with metric, timeframe, and issues for vanity metrics or unrealistic timeframes.
+
+    Output JSON:
+    {{
+        "snapshot": {{"problem": "string", "target_user": "string", "...": "remaining snapshot fields"}},
+        "user_validation": {{"is_valid": boolean, "reason": "string", "improved_target_user": "string or null"}},
+        "channel": {{"primary_channel_type": "string (enum) or null", "primary_channel_description": "string", "other_channels": ["string"], "issues": ["string"]}},
+        "hypothesis": {{"hypothesis": "string", "metric": "string", "timeframe": "string", "issues": ["string"]}}
+    }}
+    """
+
+def _parse_plan(data, startup_id: str, input_text: str, current_version: int) -> Tuple[StartupSnapshot, dict, dict, dict]:
+    """
+    Validates the fused response against the same models the multi-call chain
+    produces. Raises PlanValidationError if any part does not fit.
+    """
+    if not isinstance(data, dict):
+        raise PlanValidationError("Analysis plan is not a JSON object")
+    missing = [key for key in ("snapshot", "user_validation", "channel", "hypothesis") if not isinstance(data.get(key), dict)]
+    if missing:
+        raise PlanValidationError(f"Analysis plan is missing {', '.join(missing)}")
+    try:
+        draft = _to_snapshot(dict(data["snapshot"]), startup_id, current_version)
+        user = UserValidation(**data["user_validation"]).dict()
+        channel = ChannelEnforcement(**data["channel"]).dict()
+        hypothesis = HypothesisEnforcement(**data["hypothesis"]).dict()
+    except (ValidationError, TypeError) as e:
+        raise PlanValidationError(f"Analysis plan failed validation: {e}") from e
+
+    # Same deterministic short-circuits as the separate validators
+    user = _precheck_user(draft.target_user) or user
+    channel = _precheck_channel(draft.primary_channel_description or input_text) or channel
+    hypothesis = check_hypothesis(draft.dict()) or flag_vanity_metric(hypothesis)
+    return draft, user, channel, hypothesis
+
+async def generate_analysis_plan(startup_id: str, input_text: str, current_version: int,
+                                       client: Optional[LLMClient] = None) -> Tuple[StartupSnapshot, dict, dict, dict]:
+    """
+    One LLM call returning the snapshot plus the user, channel and hypothesis verdicts.
+    """
+    data = await (client or client_for("plan")).generate_json_async(_build_prompt(input_text))
+    return _parse_plan(data, startup_id, input_text, current_version)
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..concurrency import priority, startup_locks
+from ..crud import (
+    get_or_create_startup, get_latest_snapshot, snapshot_from_orm, save_analysis, save_analyses_bulk,
+    find_identical_report, input_hash
+)
+from ..models import AnalysisResponse, BatchItem, BatchItemResult, TokenUsage
+from .pipeline import run_analysis
+from .token_budget import InputTooLargeError, cap_input
+
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "8"))
+BATCH_COMMIT_EVERY = int(os.environ.get("BATCH_COMMIT_EVERY", "25"))
+
+SessionFactory = Callable[[], Session]
+
+class BulkSnapshotWriter:
+    """
+    Buffers finished analyses and writes their snapshots in bulk transactions.
+    Results are only emitted once their snapshot is committed.
+    """
+
+    def __init__(self, session_factory: SessionFactory, output: asyncio.Queue, commit_every: int):
+        self.session_factory = session_factory
+        self.output = output
+        self.commit_every = max(commit_every, 1)
+        self._pending: List[Tuple[int, str, str, AnalysisResponse, Optional[TokenUsage]]] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, index: int, startup_id: str, input_text: str, result: AnalysisResponse,
+                  usage: Optional[TokenUsage] = None) -> None:
+        self._pending.append((index, startup_id, input_text, result, usage))
+        if len(self._pending) >= self.commit_every:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            # Blocking DB work runs off the event loop
+            errors = await asyncio.to_thread(self._commit, pending)
+        for index, startup_id, _, result, usage in pending:
+            if index in errors:
+                self.output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="error", error=errors[index], usage=usage))
+            else:
+                self.output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="ok", result=result, usage=usage))
+
+    def _commit(self, pending) -> dict:
+        db = self.session_factory()
+        try:
+            try:
+                save_analyses_bulk(db, [(result, input_text) for _, _, input_text, result, _ in pending])
+                return {}
+            except Exception as e:
+                print(f"Bulk snapshot write failed, retrying row by row: {e}")
+                db.rollback()
+            errors = {}
+            for index, _, input_text, result, _ in pending:
+                try:
+                    save_analysis(db, result, input_text)
+                except Exception as e:
+                    db.rollback()
+                    errors[index] = str(e)
+            return errors
+        finally:
+            db.close()
+
+def _load_group_state(session_factory: SessionFactory, startup_id: str, first_text: Optional[str]):
+    """
+    The startup's latest snapshot, plus (input hash, result) when `first_text`
+    is what produced it, so repeated text is answered without the pipeline.
+    """
+    db = session_factory()
+    try:
+        get_or_create_startup(db, startup_id)
+        latest_orm = get_latest_snapshot(db, startup_id)
+        if latest_orm is None:
+            return None, None
+        latest = snapshot_from_orm(latest_orm)
+        stored = find_identical_report(db, startup_id, first_text, latest_orm.version) if first_text else None
+        return latest, (input_hash(first_text), stored) if stored else None
+    finally:
+        db.close()
+
+async def _run_group(startup_id: str, items: List[Tuple[int, BatchItem]], session_factory: SessionFactory,
+                     writer: BulkSnapshotWriter, output: asyncio.Queue, mode: Optional[str] = None) -> None:
+    async with startup_locks.hold(startup_id):
+        first_text = items[0][1].input_text if items else None
+        latest, produced_latest = await asyncio.to_thread(_load_group_state, session_factory, startup_id, first_text)
+
+        # Items for one startup are applied in submission order, each drifting against the previous one
+        for index, item in items:
+            try:
+                input_text = cap_input(item.input_text)
+            except InputTooLargeError as e:
+                output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="error", error=str(e)))
+                continue
+            if produced_latest and produced_latest[0] == input_hash(input_text):
+                # The stored result must be committed before it is handed out
+                await writer.flush()
+                metrics.ANALYSIS_REUSED.inc(endpoint="analyze_batch_item")
+                output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="ok", result=produced_latest[1]))
+                continue
+            try:
+                with metrics.track_request("analyze_batch_item") as stats:
+                    result = await run_analysis(startup_id, input_text, latest, mode=mode)
+            except Exception as e:
+                output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="error", error=str(e)))
+                continue
+            latest = result.snapshot
+            produced_latest = (input_hash(input_text), result)
+            await writer.add(index, startup_id, input_text, result, TokenUsage(**stats.usage()))
+
+        # Later single analyses of this startup must see these versions
+        await writer.flush()
+
+async def analyze_batch(items: List[BatchItem], session_factory: SessionFactory, max_workers: Optional[int] = None,
+                        commit_every: int = BATCH_COMMIT_EVERY, mode: Optional[str] = None) -> AsyncIterator[BatchItemResult]:
+    """
+    Analyzes many submissions on a bounded pool of workers and yields each
+    item's result once its snapshot is committed (completion order, not input
+    order; use `index` to match them up). LLM concurrency and quotas are
+    enforced process-wide by the LLM client's gate, where batch calls yield to
+    interactive ones.
+    """
+    groups: "OrderedDict[str, List[Tuple[int, BatchItem]]]" = OrderedDict()
+    for index, item in enumerate(items):
+        groups.setdefault(item.startup_id, []).append((index, item))
+
+    output: asyncio.Queue = asyncio.Queue()
+    writer = BulkSnapshotWriter(session_factory, output, commit_every)
+    work: asyncio.Queue = asyncio.Queue()
+    for group in groups.items():
+        work.put_nowait(group)
+
+    async def worker():
+        while True:
+            try:
+                startup_id, group_items = work.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                # Queued behind interactive /analyze calls at the LLM gate
+                with priority("batch"):
+                    await _run_group(startup_id, group_items, session_factory, writer, output, mode)
+            except Exception as e:
+                for index, _ in group_items:
+                    output.put_nowait(BatchItemResult(index=index, startup_id=startup_id, status="error", error=str(e)))
+
+    workers = max(1, min(max_workers or BATCH_MAX_WORKERS, BATCH_MAX_WORKERS, len(groups)))
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    done = asyncio.ensure_future(asyncio.gather(*tasks))
+    done.add_done_callback(lambda _: output.put_nowait(None))
+
+    try:
+        while True:
+            result = await output.get()
+            if result is None:
+                break
+            yield result
+        await done
+    finally:
+        for task in tasks:
+            task.cancel()
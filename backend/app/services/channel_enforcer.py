@@ -1,10 +1,10 @@
-from typing import List
-from .llm_client import llm_client
+from typing import Optional
+from .. import metrics
+from .llm_client import LLMClient, client_for
+from .prevalidation import check_channel
+from .token_budget import compact
 
-def enforce_channel(channel_text: str) -> dict:
-    """
-    Enforces a single primary channel and specific description.
-    """
+def _precheck(channel_text: str):
     if not channel_text:
         return {
             "primary_channel_type": None,
@@ -12,8 +12,12 @@ def enforce_channel(channel_text: str) -> dict:
             "other_channels": [],
             "issues": ["No distribution channel defined."]
         }
+    return check_channel(channel_text)
 
-    prompt = f"""
+def _build_prompt(channel_text: str) -> str:
+    # Falls back to the whole submission when extraction found no channel description
+    channel_text = compact(channel_text, "channel")
+    return f"""
     Analyze this distribution strategy: "{channel_text}"
     
     Allowed Types: ["cold_outreach", "community", "paid_ads", "partnerships", "marketplace", "product_led"]
@@ -32,5 +36,13 @@ def enforce_channel(channel_text: str) -> dict:
         "issues": ["string"]
     }}
     """
-    
-    return llm_client.generate_json(prompt)
+
+async def enforce_channel(channel_text: str, client: Optional[LLMClient] = None) -> dict:
+    """
+    Enforces a single primary channel and specific description.
+    """
+    local = _precheck(channel_text)
+    metrics.PREVALIDATION.inc(stage="channel", outcome="llm" if local is None else "local")
+    if local is not None:
+        return local
+    return await (client or client_for("channel")).generate_json_async(_build_prompt(channel_text))
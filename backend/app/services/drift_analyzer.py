@@ -1,42 +1,145 @@
-from typing import List, Optional
+import asyncio
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence
 from ..models import StartupSnapshot, DriftItem
-from .llm_client import llm_client
+from .llm_client import LLMClient, client_for
+from .similarity import drift_score
+from .token_budget import compact
 
-def analyze_drift(old_snapshot: StartupSnapshot, new_snapshot: StartupSnapshot) -> List[DriftItem]:
-    """
-    Compares two snapshots and detects drift.
+DRIFT_FIELDS = ["target_user", "problem", "solution", "primary_channel_type", "hypothesis"]
+DRIFT_CLASSIFICATIONS = ("major_change", "minor_refinement")
+
+# Words whose addition or removal never changes what a field means. Negations and prepositions
+# ("not", "without", "outside") are deliberately absent: one of them can flip the meaning.
+FILLER_WORDS = {
+    "a", "an", "the", "our", "their", "its", "this", "these", "those", "that", "which", "very", "really",
+    "just", "also", "basically", "actually", "simply", "currently", "so",
+}
+
+def _build_prompt(field: str, old_val, new_val) -> str:
+    old_val, new_val = compact(old_val, "drift"), compact(new_val, "drift")
+    return f"""
+    Compare these two values for the field '{field}':
+    Old: "{old_val}"
+    New: "{new_val}"
+    
+    Is this a "major_change" (pivot, completely different audience/problem) or a "minor_refinement" (clarification, rewording)?
+    
+    Output JSON:
+    {{
+        "classification": "major_change" | "minor_refinement",
+        "comment": "Brief explanation of the change"
+    }}
     """
-    # Simple field comparison first
-    fields_to_check = ["target_user", "problem", "solution", "primary_channel_type", "hypothesis"]
-    drift_items = []
+
+def _build_batch_prompt(changes) -> str:
+    fields_text = "\n".join(
+        f"""    - {field}:
+        Old: "{compact(old_val, 'drift')}"
+        New: "{compact(new_val, 'drift')}\""""
+        for field, old_val, new_val in changes
+    )
+    keys_text = ",\n".join(
+        f'        "{field}": {{"classification": "major_change" | "minor_refinement", "comment": "Brief explanation of the change"}}'
+        for field, _, _ in changes
+    )
+    return f"""
+    Compare the old and new values of each of these startup fields:
+{fields_text}
     
-    for field in fields_to_check:
+    For EACH field, decide whether it is a "major_change" (pivot, completely different audience/problem) or a "minor_refinement" (clarification, rewording).
+    
+    Output JSON keyed by field name:
+    {{
+{keys_text}
+    }}
+    """
+
+def _normalize(value) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", str(value).lower()).split())
+
+def _only_filler_changed(a: str, b: str) -> bool:
+    tokens_a, tokens_b = a.split(), b.split()
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, tokens_a, tokens_b, autojunk=False).get_opcodes():
+        if tag != "equal" and any(token not in FILLER_WORDS for token in tokens_a[i1:i2] + tokens_b[j1:j2]):
+            return False
+    return True
+
+def classify_locally(old_val, new_val) -> Optional[dict]:
+    """
+    Cheap pre-classifier for trivial rewordings: whitespace, casing,
+    punctuation or filler words. Returns None when the LLM has to decide.
+    """
+    if not old_val or not new_val:
+        return None
+    old_norm, new_norm = _normalize(old_val), _normalize(new_val)
+    if old_norm == new_norm:
+        return {"classification": "minor_refinement", "comment": "Only whitespace, casing or punctuation changed."}
+    if _only_filler_changed(old_norm, new_norm):
+        return {"classification": "minor_refinement", "comment": "Only filler words changed."}
+    return None
+
+def _changed_fields(old_snapshot: StartupSnapshot, new_snapshot: StartupSnapshot, fields: Sequence[str]):
+    for field in fields:
         old_val = getattr(old_snapshot, field)
         new_val = getattr(new_snapshot, field)
-        
         if old_val != new_val:
-            # Use LLM to classify the change
-            prompt = f"""
-            Compare these two values for the field '{field}':
-            Old: "{old_val}"
-            New: "{new_val}"
-            
-            Is this a "major_change" (pivot, completely different audience/problem) or a "minor_refinement" (clarification, rewording)?
-            
-            Output JSON:
-            {{
-                "classification": "major_change" | "minor_refinement",
-                "comment": "Brief explanation of the change"
-            }}
-            """
-            result = llm_client.generate_json(prompt)
-            
-            drift_items.append(DriftItem(
-                field=field,
-                before=str(old_val),
-                after=str(new_val),
-                classification=result["classification"],
-                comment=result["comment"]
-            ))
-            
-    return drift_items
+            yield field, old_val, new_val
+
+def _to_item(field: str, old_val, new_val, result: dict) -> DriftItem:
+    return DriftItem(
+        field=field,
+        before=str(old_val),
+        after=str(new_val),
+        classification=result["classification"],
+        comment=result["comment"],
+        score=drift_score(old_val, new_val)
+    )
+
+def _parse_batch(result, changes) -> Dict[str, dict]:
+    """
+    Picks the well-formed per-field verdicts out of a batched response.
+    """
+    parsed = {}
+    if not isinstance(result, dict):
+        return parsed
+    for field, _, _ in changes:
+        verdict = result.get(field)
+        if isinstance(verdict, dict) and verdict.get("classification") in DRIFT_CLASSIFICATIONS:
+            parsed[field] = {"classification": verdict["classification"], "comment": verdict.get("comment")}
+    return parsed
+
+def _split_local(changes):
+    verdicts, remote = {}, []
+    for field, old_val, new_val in changes:
+        local = classify_locally(old_val, new_val)
+        if local is not None:
+            verdicts[field] = local
+        else:
+            remote.append((field, old_val, new_val))
+    return verdicts, remote
+
+async def analyze_drift(old_snapshot: StartupSnapshot, new_snapshot: StartupSnapshot, fields: Optional[Sequence[str]] = None,
+                              client: Optional[LLMClient] = None) -> List[DriftItem]:
+    """
+    Compares two snapshots and detects drift.
+    Only `fields` are compared when given (defaults to DRIFT_FIELDS). Trivial rewordings are
+    classified locally; every other changed field goes to the LLM in a single batched call.
+    """
+    changes = list(_changed_fields(old_snapshot, new_snapshot, fields or DRIFT_FIELDS))
+    verdicts, remote = _split_local(changes)
+
+    if remote:
+        client = client or client_for("drift")
+        verdicts.update(_parse_batch(await client.generate_json_async(_build_batch_prompt(remote)), remote))
+        # Fall back to one call per field the batched answer left out
+        missing = [change for change in remote if change[0] not in verdicts]
+        results = await asyncio.gather(*(
+            client.generate_json_async(_build_prompt(field, old_val, new_val))
+            for field, old_val, new_val in missing
+        ))
+        for (field, _, _), result in zip(missing, results):
+            verdicts[field] = result
+
+    return [_to_item(field, old_val, new_val, verdicts[field]) for field, old_val, new_val in changes]
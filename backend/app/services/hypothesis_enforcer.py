@@ -1,15 +1,16 @@
-from .llm_client import llm_client
+from typing import Optional
+from .. import metrics
+from .llm_client import LLMClient, client_for
+from .prevalidation import check_hypothesis, flag_vanity_metric
+from .token_budget import compact
 
-def enforce_hypothesis(snapshot_data: dict) -> dict:
-    """
-    Structures the hypothesis and checks for vanity metrics.
-    """
-    user = snapshot_data.get("target_user", "")
-    solution = snapshot_data.get("solution", "")
+def _build_prompt(snapshot_data: dict) -> str:
+    user = compact(snapshot_data.get("target_user", ""), "hypothesis")
+    solution = compact(snapshot_data.get("solution", ""), "hypothesis")
     channel = snapshot_data.get("primary_channel_type", "")
-    raw_hypothesis = snapshot_data.get("hypothesis", "")
+    raw_hypothesis = compact(snapshot_data.get("hypothesis", ""), "hypothesis")
     
-    prompt = f"""
+    return f"""
     Construct or refine a structured hypothesis for this startup.
     
     Context:
@@ -34,5 +35,15 @@ def enforce_hypothesis(snapshot_data: dict) -> dict:
         "issues": ["string"]
     }}
     """
-    
-    return llm_client.generate_json(prompt)
+
+async def enforce_hypothesis(snapshot_data: dict, client: Optional[LLMClient] = None) -> dict:
+    """
+    Structures the hypothesis and checks for vanity metrics.
+    A snapshot that already states every part of the template is structured
+    locally; vanity metrics are flagged by rule either way.
+    """
+    local = check_hypothesis(snapshot_data)
+    metrics.PREVALIDATION.inc(stage="hypothesis", outcome="llm" if local is None else "local")
+    if local is not None:
+        return local
+    return flag_vanity_metric(await (client or client_for("hypothesis")).generate_json_async(_build_prompt(snapshot_data)))
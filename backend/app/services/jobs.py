@@ -0,0 +1,126 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Callable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..crud import (
+    get_or_create_startup, get_latest_snapshot, snapshot_from_orm, save_analysis, find_identical_report,
+    claim_job, extend_job_lease, finish_job, release_worker_jobs, requeue_expired_jobs, VersionConflictError
+)
+from ..models import AnalysisJob
+from .pipeline import run_analysis
+from .resilience import LLMUnavailableError
+
+# A running job whose worker stops renewing its lease for this long is requeued
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "1.0"))
+# Jobs one worker process runs at the same time
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", "4"))
+
+SessionFactory = Callable[[], Session]
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _with_session(session_factory: SessionFactory, fn, *args):
+    db = session_factory()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+def _claim(session_factory: SessionFactory, worker_id: str) -> Optional[AnalysisJob]:
+    db = session_factory()
+    try:
+        requeue_expired_jobs(db, JOB_MAX_ATTEMPTS)
+        job = claim_job(db, worker_id, JOB_LEASE_SECONDS)
+        if job is not None:
+            # Used after the session is closed
+            db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+def _load_state(db: Session, job: AnalysisJob):
+    get_or_create_startup(db, job.startup_id)
+    latest_orm = get_latest_snapshot(db, job.startup_id)
+    latest = snapshot_from_orm(latest_orm) if latest_orm else None
+    stored = find_identical_report(db, job.startup_id, job.input_text, latest_orm.version if latest_orm else None)
+    return latest, stored
+
+async def run_job(job: AnalysisJob, session_factory: SessionFactory) -> int:
+    """
+    Runs one claimed job like a synchronous /analyze call and returns the
+    snapshot version holding its report.
+    """
+    latest, stored = await asyncio.to_thread(_with_session, session_factory, _load_state, job)
+    if stored:
+        metrics.ANALYSIS_REUSED.inc(endpoint="analyze_job")
+        return stored.snapshot.version
+    with metrics.track_request("analyze_job"):
+        result = await run_analysis(job.startup_id, job.input_text, latest, mode=job.mode)
+    await asyncio.to_thread(_with_session, session_factory, save_analysis, result, job.input_text)
+    return result.snapshot.version
+
+async def _keep_lease(job: AnalysisJob, session_factory: SessionFactory, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(_with_session, session_factory, extend_job_lease, job.id, worker_id, JOB_LEASE_SECONDS):
+            print(f"Lost the lease on job {job.id}; another worker will run it")
+            return
+
+async def process_job(job: AnalysisJob, session_factory: SessionFactory, worker_id: str) -> None:
+    heartbeat = asyncio.ensure_future(_keep_lease(job, session_factory, worker_id))
+    outcome = {}
+    try:
+        outcome["version"] = await run_job(job, session_factory)
+    except (LLMUnavailableError, VersionConflictError) as e:
+        # Transient: another attempt may succeed
+        outcome.update(error=str(e), retry=job.attempts < JOB_MAX_ATTEMPTS)
+    except Exception as e:
+        outcome.update(error=str(e) or type(e).__name__)
+    finally:
+        heartbeat.cancel()
+    await asyncio.to_thread(_with_session, session_factory, finish_job, job.id, worker_id,
+                            outcome.get("version"), outcome.get("error"), outcome.get("retry", False))
+    status = "succeeded" if "version" in outcome else "retried" if outcome.get("retry") else "failed"
+    metrics.JOBS.inc(status=status)
+
+async def run_worker(session_factory: SessionFactory, concurrency: int = JOB_WORKER_CONCURRENCY,
+                     poll_interval: float = JOB_POLL_SECONDS, stop: Optional[asyncio.Event] = None,
+                     exit_when_idle: bool = False, worker_id: Optional[str] = None) -> None:
+    """
+    Claims queued analysis jobs from the database and runs up to `concurrency`
+    at a time until `stop` is set (or, with `exit_when_idle`, until nothing is
+    left to claim). Jobs still running when the worker stops go back to the
+    queue; jobs of a worker that died are requeued once their lease expires.
+    """
+    worker_id = worker_id or new_worker_id()
+    stop = stop or asyncio.Event()
+    running: Set[asyncio.Task] = set()
+    concurrency = max(1, concurrency)
+    try:
+        while not stop.is_set():
+            job = await asyncio.to_thread(_claim, session_factory, worker_id) if len(running) < concurrency else None
+            if job is not None:
+                task = asyncio.ensure_future(process_job(job, session_factory, worker_id))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                continue
+            if exit_when_idle and not running:
+                return
+            # Wake on a finished job (a free slot, or the next job of its startup), the poll interval or stop
+            waiters = [asyncio.ensure_future(stop.wait()), *running]
+            await asyncio.wait(waiters, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            waiters[0].cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        for task in list(running):
+            task.cancel()
+        await asyncio.to_thread(_with_session, session_factory, release_worker_jobs, worker_id)
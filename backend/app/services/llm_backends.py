@@ -0,0 +1,128 @@
+"""
+Pluggable LLM providers. A backend only turns a prompt into response text;
+caching, admission control, retries and metrics live in LLMClient.
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional
+
+if TYPE_CHECKING:
+    # Imported where used: only processes that talk to an HTTP provider pay for it
+    import httpx
+
+# Use a model that supports JSON mode well
+GEMINI_MODEL_NAME = "gemini-2.0-flash"
+
+class ProviderHTTPError(Exception):
+    """
+    Non-2xx answer from an HTTP provider; `code` is the status, which is what
+    the resilience layer inspects to decide whether to retry.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+
+class LLMBackend(ABC):
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def provider(self) -> str:
+        """
+        What quotas and outages are tracked by: clients on the same provider
+        share one gate and circuit breaker, whatever model they call.
+        """
+        return self.name
+
+    @abstractmethod
+    async def generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        ...
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME, api_key: Optional[str] = None):
+        super().__init__(model_name)
+        import google.generativeai as genai
+
+        # Expects GOOGLE_API_KEY in environment variables
+        genai.configure(api_key=api_key or os.environ.get("GOOGLE_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        response = await self.model.generate_content_async(prompt, generation_config=generation_config)
+        return response.text
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server exposing POST {base_url}/chat/completions: OpenAI, or a local
+    llama.cpp / vLLM / Ollama server standing in for a hosted model.
+    """
+    name = "openai"
+
+    def __init__(self, model_name: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 json_mode: Optional[bool] = None, async_transport: Optional["httpx.AsyncBaseTransport"] = None):
+        super().__init__(model_name)
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        # Some local servers reject response_format; OPENAI_JSON_MODE=0 leaves it to the prompt
+        if json_mode is None:
+            json_mode = os.environ.get("OPENAI_JSON_MODE", "1").lower() in ("1", "true", "yes")
+        self.json_mode = json_mode
+        self._async_transport = async_transport
+        # httpx.AsyncClient pools are bound to the loop that created them
+        self._async_loop = None
+        self._async_pool: Optional[AsyncIterator["httpx.AsyncClient"]] = None
+        self._async_client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def provider(self) -> str:
+        # A local server and api.openai.com are different providers
+        return f"{self.name}:{self.base_url}"
+
+    def _payload(self, prompt: str, generation_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model_name, "messages": [{"role": "user", "content": prompt}]}
+        if self.json_mode and (generation_config or {}).get("response_mime_type") == "application/json":
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _parse(self, response: "httpx.Response") -> str:
+        if response.status_code >= 400:
+            raise ProviderHTTPError(response.status_code, response.text[:500])
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def _pool(self) -> AsyncIterator["httpx.AsyncClient"]:
+        """
+        The running loop's client. Held open as an async generator so the loop
+        closes it on shutdown (asyncio.run finalizes pending async generators
+        before closing the loop), which a later loop could no longer do.
+        """
+        import httpx
+
+        client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers,
+                                   transport=self._async_transport, timeout=None)
+        try:
+            yield client
+        finally:
+            await client.aclose()
+
+    async def generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._async_loop:
+            self._async_loop = loop
+            self._async_pool = self._pool()
+            self._async_client = await self._async_pool.__anext__()
+        try:
+            response = await self._async_client.post("/chat/completions", json=self._payload(prompt, generation_config))
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        return self._parse(response)
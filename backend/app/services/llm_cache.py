@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+def make_cache_key(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Content address for an LLM call: identical (model, prompt, config) -> identical key.
+    """
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "config": generation_config or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """
+    In-process LRU tier with optional TTL.
+    """
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache:
+    """
+    On-disk tier shared across processes. Expired rows are dropped on read and
+    the least recently used rows are evicted once `max_entries` is exceeded.
+    """
+    name = "sqlite"
+    # Reads and writes hit the disk; async callers run them in a worker thread
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+class LLMCache:
+    """
+    Tiered cache: tiers are checked in order and a hit in a slower tier is
+    promoted into the faster ones.
+    """
+
+    def __init__(self, tiers: List[Any]):
+        self.tiers = tiers
+        self.hits = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                with self._lock:
+                    self.hits[tier.name] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """
+        get() for callers on an event loop: a hit in the in-memory front tier is
+        served inline, anything that has to reach a disk tier runs in a thread.
+        """
+        head = self.tiers[0] if self.tiers else None
+        if head is not None and not head.blocking:
+            value = head.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits[head.name] += 1
+                return value
+        if not any(tier.blocking for tier in self.tiers):
+            with self._lock:
+                self.misses += 1
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, value: str) -> None:
+        if any(tier.blocking for tier in self.tiers):
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "entries": {tier.name: len(tier) for tier in self.tiers},
+            }
+
+def build_cache_from_env() -> Optional[LLMCache]:
+    """
+    Caching is on by default; LLM_CACHE_ENABLED=0 disables it. LLM_CACHE_PATH adds the SQLite tier.
+    """
+    if os.environ.get("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    ttl = os.environ.get("LLM_CACHE_TTL_SECONDS", "86400")
+    ttl_seconds = float(ttl) if ttl else None
+    tiers: List[Any] = [MemoryCache(int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1024")), ttl_seconds)]
+
+    path = os.environ.get("LLM_CACHE_PATH")
+    if path:
+        tiers.append(SQLiteCache(path, int(os.environ.get("LLM_CACHE_DISK_MAX_ENTRIES", "10000")), ttl_seconds))
+
+    return LLMCache(tiers)
@@ -1,47 +1,315 @@
+import asyncio
 import os
 import json
-import google.generativeai as genai
-from typing import Any, Dict, Optional
-from dotenv import load_dotenv
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from .llm_cache import LLMCache, build_cache_from_env, make_cache_key
+from .llm_backends import GEMINI_MODEL_NAME, LLMBackend, GeminiBackend, OpenAICompatibleBackend
+from .mock_llm import LatencyModel, MockBackend
+from .. import metrics
+from ..concurrency import ConcurrencyGate
+from .resilience import CircuitBreaker, LLMUnavailableError, ResiliencePolicy, build_resilience_from_env, is_transient
 
-load_dotenv()
+MODEL_NAME = GEMINI_MODEL_NAME
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
 
-# Configure Gemini
-# Expects GOOGLE_API_KEY in environment variables
-genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+def build_gate_from_env() -> ConcurrencyGate:
+    """
+    Process-wide cap on concurrent async LLM calls (LLM_MAX_CONCURRENCY) and
+    optional quotas (0 = unlimited).
+    """
+    return ConcurrencyGate(
+        int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+        float(os.environ.get("LLM_RATE_PER_SECOND", "0")),
+        float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "0")),
+        float(os.environ.get("LLM_TOKENS_PER_MINUTE", "0")),
+        float(os.environ.get("LLM_BURST_SECONDS", "10")),
+    )
 
-# Use a model that supports JSON mode well
-MODEL_NAME = "gemini-2.0-flash"
 class LLMClient:
-    def __init__(self):
-        self.model = genai.GenerativeModel(MODEL_NAME)
+    def __init__(self, cache: Optional[LLMCache] = None, gate: Optional[ConcurrencyGate] = None,
+                 resilience: Optional[ResiliencePolicy] = None, backend: Optional[LLMBackend] = None):
+        self.backend = backend or GeminiBackend(MODEL_NAME)
+        self.model_name = self.backend.model_name
+        self.cache = cache
+        self.gate = gate or ConcurrencyGate()
+        self.resilience = resilience or ResiliencePolicy()
+        # Response size assumed when reserving token budget; reconciled once the call returns
+        self.response_token_estimate = int(os.environ.get("LLM_RESPONSE_TOKEN_ESTIMATE", "512"))
 
-    def generate_json(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _cached(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        text = await self.cache.get_async(key)
+        if text is None:
+            return None
+        metrics.record_cache_hit(self.model_name)
+        return json.loads(text)
+
+    def _cache_key(self, full_prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(self.model_name, full_prompt, JSON_GENERATION_CONFIG)
+
+    async def _store(self, key: Optional[str], text: str) -> None:
+        if key is not None:
+            await self.cache.set_async(key, text)
+
+    async def _generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        return await self.backend.generate_async(prompt, generation_config)
+
+    def _json_prompt(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        full_prompt = f"{prompt}\n\nOutput strictly valid JSON."
+        if schema:
+            full_prompt += f"\nFollow this schema structure:\n{json.dumps(schema, indent=2)}"
+        return full_prompt
+
+    async def _attempt_async(self, full_prompt: str) -> Tuple[str, Dict[str, Any]]:
+        reserved = metrics.estimate_tokens(full_prompt) + self.response_token_estimate
+        async with self.gate.slot(tokens=reserved):
+            start = time.perf_counter()
+            text = None
+            try:
+                text = await asyncio.wait_for(self._generate_async(full_prompt, JSON_GENERATION_CONFIG), self.resilience.timeout)
+                data = json.loads(text)
+            except asyncio.CancelledError:
+                # The losing half of a hedged pair; not a provider failure
+                raise
+            except Exception as e:
+                metrics.record_llm_call(self.model_name, full_prompt, text, time.perf_counter() - start, error=True)
+                print(f"LLM Error: {e!r}")
+                raise
+            finally:
+                used = metrics.estimate_tokens(full_prompt) + metrics.estimate_tokens(text or "")
+                self.gate.adjust_tokens(used - reserved)
+            elapsed = time.perf_counter() - start
+            metrics.record_llm_call(self.model_name, full_prompt, text, elapsed)
+            self.resilience.latency.observe(elapsed)
+            return text, data
+
+    async def _hedged_attempt_async(self, full_prompt: str) -> Tuple[str, Dict[str, Any]]:
         """
-        Generates JSON output from the LLM.
+        Starts a second identical call if the first has not answered within the
+        recent p95 latency, and keeps whichever usable response arrives first.
         """
+        first = asyncio.ensure_future(self._attempt_async(full_prompt))
+        done, _ = await asyncio.wait({first}, timeout=self.resilience.hedge_after())
+        if done:
+            return first.result()
+
+        metrics.record_hedge(self.model_name)
+        pending = {first, asyncio.ensure_future(self._attempt_async(full_prompt))}
+        error: Optional[BaseException] = None
         try:
-            full_prompt = f"{prompt}\n\nOutput strictly valid JSON."
-            if schema:
-                full_prompt += f"\nFollow this schema structure:\n{json.dumps(schema, indent=2)}"
-            
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config={"response_mime_type": "application/json"}
-            )
-            
-            return json.loads(response.text)
-        except Exception as e:
-            print(f"LLM Error: {e}")
-            # Fallback or re-raise depending on severity
-            raise e
-
-    def generate_text(self, prompt: str) -> str:
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"LLM Error: {e}")
-            raise e
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _on_failure(self, error: Exception, attempt: int) -> None:
+        """
+        Decides what a failed attempt means: re-raise it (not retryable),
+        give up (attempts exhausted), or record a retry and return.
+        """
+        if not is_transient(error):
+            raise error
+        if not isinstance(error, json.JSONDecodeError):
+            # A malformed answer says nothing about provider health
+            self.resilience.breaker.record_failure()
+        if attempt >= self.resilience.retry.max_attempts:
+            raise LLMUnavailableError(f"LLM call failed after {attempt} attempts: {error!r}") from error
+        metrics.record_retry(self.model_name)
+
+    async def generate_json_async(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Generates JSON output from the LLM. Identical prompts are served from the cache.
+        Transient failures and invalid JSON are retried with backoff; each attempt
+        has a deadline, waits its turn at the gate and, with hedging on, may race a second copy.
+        """
+        full_prompt = self._json_prompt(prompt, schema)
+        key = self._cache_key(full_prompt)
+        cached = await self._cached(key)
+        if cached is not None:
+            return cached
+        attempt_fn = self._hedged_attempt_async if self.resilience.hedge else self._attempt_async
+        for attempt in range(1, self.resilience.retry.max_attempts + 1):
+            self.resilience.breaker.before_call()
+            try:
+                text, data = await attempt_fn(full_prompt)
+            except Exception as e:
+                self._on_failure(e, attempt)
+                await asyncio.sleep(self.resilience.retry.delay(attempt))
+                continue
+            finally:
+                self.resilience.breaker.release_trial()
+            self.resilience.breaker.record_success()
+            await self._store(key, text)
+            return data
+
+class MockLLMClient(LLMClient):
+    """
+    LLMClient wired to a MockBackend; works without network or API key.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, cache: Optional[LLMCache] = None,
+                 gate: Optional[ConcurrencyGate] = None, resilience: Optional[ResiliencePolicy] = None,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(cache=cache, gate=gate, resilience=resilience,
+                         backend=MockBackend(latency, error_rate, seed))
+
+    @classmethod
+    def from_env(cls, cache: Optional[LLMCache] = None, gate: Optional[ConcurrencyGate] = None,
+                 resilience: Optional[ResiliencePolicy] = None) -> "MockLLMClient":
+        seed = os.environ.get("MOCK_LLM_SEED")
+        latency = LatencyModel(
+            mean_ms=float(os.environ.get("MOCK_LLM_LATENCY_MS", "0")),
+            jitter_ms=float(os.environ.get("MOCK_LLM_JITTER_MS", "0")),
+            distribution=os.environ.get("MOCK_LLM_LATENCY_DIST", "constant"),
+            seed=int(seed) if seed else None,
+        )
+        return cls(latency=latency, cache=cache, gate=gate, resilience=resilience,
+                   error_rate=float(os.environ.get("MOCK_LLM_ERROR_RATE", "0")), seed=int(seed) if seed else None)
+
+    # Shortcuts to the backend, which tests and benchmarks tune directly
+    @property
+    def latency(self) -> LatencyModel:
+        return self.backend.latency
+
+    @latency.setter
+    def latency(self, value: LatencyModel) -> None:
+        self.backend.latency = value
+
+    @property
+    def calls(self) -> int:
+        return self.backend.calls
+
+    @calls.setter
+    def calls(self, value: int) -> None:
+        self.backend.calls = value
+
+    def respond(self, prompt: str) -> str:
+        return self.backend.respond(prompt)
+
+# Stages that can run on their own backend/model via LLM_STAGE_<NAME>=backend[:model]
+LLM_STAGES = ("extract", "plan", "user", "channel", "hypothesis", "drift", "experiments")
+LLM_BACKENDS = ("gemini", "openai", "mock")
+
+def parse_backend_spec(spec: str):
+    """
+    "openai:llama-3.1-8b" -> ("openai", "llama-3.1-8b"); the model is optional.
+    """
+    backend, _, model = spec.strip().partition(":")
+    backend = backend.lower()
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}', expected one of {LLM_BACKENDS}")
+    return backend, model or None
+
+# One gate and circuit breaker per provider (backend + endpoint), shared by every client on it
+_limits_lock = threading.Lock()
+_provider_limits: Dict[str, Tuple[ConcurrencyGate, CircuitBreaker]] = {}
+
+def provider_limits(provider: str) -> Tuple[ConcurrencyGate, CircuitBreaker]:
+    """
+    The gate and circuit breaker of `provider`, built from the environment on
+    first use. Stages routed to other models of the same provider draw on the
+    same LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE quota and trip together.
+    """
+    with _limits_lock:
+        if provider not in _provider_limits:
+            _provider_limits[provider] = (build_gate_from_env(), build_resilience_from_env().breaker)
+        return _provider_limits[provider]
+
+def build_client(spec: str, cache: Optional[LLMCache] = None) -> LLMClient:
+    """
+    A client for one backend/model. Clients of the same provider share its gate
+    and circuit breaker (see provider_limits); the response cache is shared by all.
+    """
+    backend, model = parse_backend_spec(spec)
+    resilience = build_resilience_from_env()
+    if backend == "mock":
+        gate, resilience.breaker = provider_limits(MockBackend.name)
+        return MockLLMClient.from_env(cache=cache, gate=gate, resilience=resilience)
+    if backend == "openai":
+        impl = OpenAICompatibleBackend(model or os.environ.get("OPENAI_MODEL", "gpt-4o-mini"))
+    else:
+        impl = GeminiBackend(model or MODEL_NAME)
+    gate, resilience.breaker = provider_limits(impl.provider)
+    return LLMClient(cache=cache, gate=gate, resilience=resilience, backend=impl)
+
+def _default_spec() -> str:
+    # FOUNDER_AGENT_MODE=mock swaps every stage for the offline deterministic backend
+    if os.environ.get("FOUNDER_AGENT_MODE", "real").lower() == "mock":
+        return "mock"
+    return os.environ.get("LLM_BACKEND", "gemini")
+
+def _build_stage_clients(env=os.environ) -> Dict[str, LLMClient]:
+    """
+    Per-stage overrides from LLM_STAGE_<NAME>. FOUNDER_AGENT_MODE=mock ignores
+    them on purpose: mock mode must stay fully offline whatever else is set.
+    """
+    if env.get("FOUNDER_AGENT_MODE", "real").lower() == "mock":
+        return {}
+    clients: Dict[str, LLMClient] = {}
+    by_spec: Dict[str, LLMClient] = {}
+    for stage in LLM_STAGES:
+        spec = env.get(f"LLM_STAGE_{stage.upper()}")
+        if spec:
+            if spec not in by_spec:
+                by_spec[spec] = build_client(spec, _shared_cache)
+            clients[stage] = by_spec[spec]
+    return clients
+
+# Built on first use, not at import: constructing a provider client pulls in its
+# SDK (google.generativeai alone takes over a second to import), which workers
+# and tests that never call the LLM should not pay for
+_init_lock = threading.Lock()
+_shared_cache: Optional[LLMCache] = None
+_default_client: Optional[LLMClient] = None
+_stage_clients: Optional[Dict[str, LLMClient]] = None
+
+def _load_env() -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def get_llm_client() -> LLMClient:
+    """
+    The default client, built from the environment on first call.
+    """
+    global _shared_cache, _default_client
+    if _default_client is None:
+        with _init_lock:
+            if _default_client is None:
+                _load_env()
+                _shared_cache = build_cache_from_env()
+                _default_client = build_client(_default_spec(), _shared_cache)
+    return _default_client
+
+def get_stage_clients() -> Dict[str, LLMClient]:
+    global _stage_clients
+    if _stage_clients is None:
+        get_llm_client()
+        with _init_lock:
+            if _stage_clients is None:
+                _stage_clients = _build_stage_clients()
+    return _stage_clients
+
+def client_for(stage: str) -> LLMClient:
+    """
+    The client a service stage should call: its LLM_STAGE_<NAME> override, else the default.
+    """
+    return get_stage_clients().get(stage) or get_llm_client()
 
-llm_client = LLMClient()
+def __getattr__(name: str):
+    # `llm_client` and `STAGE_CLIENTS` stay importable module attributes, resolved lazily
+    if name == "llm_client":
+        return get_llm_client()
+    if name == "STAGE_CLIENTS":
+        return get_stage_clients()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
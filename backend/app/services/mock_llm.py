@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# Only the provider interface: llm_client imports this module, never the reverse
+from .llm_backends import LLMBackend
+
+CHANNEL_TYPES = ["cold_outreach", "community", "paid_ads", "partnerships", "marketplace", "product_led"]
+
+CHANNEL_KEYWORDS = {
+    "cold_outreach": ["cold email", "cold call", "outreach", "linkedin dm", "email"],
+    "community": ["community", "discord", "slack", "reddit", "forum", "meetup"],
+    "paid_ads": ["ads", "adwords", "facebook ads", "google ads", "paid"],
+    "partnerships": ["partner", "partnership", "reseller", "integration"],
+    "marketplace": ["marketplace", "app store", "shopify", "etsy", "amazon"],
+    "product_led": ["free trial", "freemium", "self-serve", "viral", "referral", "product-led"],
+}
+
+METRIC_WORDS = ["signups", "revenue", "retention", "conversion", "users", "customers", "mrr", "downloads"]
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+
+def _match(pattern: str, prompt: str) -> Optional[str]:
+    m = re.search(pattern, prompt, re.DOTALL)
+    return m.group(1).strip() if m else None
+
+def _sentences(text: str) -> List[str]:
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+def _detect_channel(text: str) -> Optional[str]:
+    lowered = text.lower()
+    for channel_type, keywords in CHANNEL_KEYWORDS.items():
+        if any(k in lowered for k in keywords):
+            return channel_type
+    return None
+
+def _find_sentence(sentences: List[str], words: List[str]) -> Optional[str]:
+    for s in sentences:
+        if any(w in s.lower() for w in words):
+            return s
+    return None
+
+def mock_extract(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    text = _match(r'Input Text:\s*"(.*)"\s*Extract the following', prompt) or ""
+    sentences = _sentences(text)
+    target_user = _match(r"\bfor ([^.,;!?]{5,80})", text)
+    metric = next((w for w in METRIC_WORDS if w in text.lower()), None)
+    timeframe = _match(r"\b(?:in|within) (\d+\s+(?:days?|weeks?|months?))", text)
+    return {
+        "problem": sentences[0] if sentences else None,
+        "target_user": target_user,
+        "job_to_be_done": f"Get {sentences[0].rstrip('.').lower()} solved" if sentences else None,
+        "solution": _find_sentence(sentences, ["build", "app", "platform", "tool", "service"]) or (sentences[1] if len(sentences) > 1 else None),
+        "value_prop": _find_sentence(sentences, ["save", "faster", "cheaper", "better"]),
+        "primary_channel_type": _detect_channel(text),
+        "primary_channel_description": _find_sentence(sentences, [k for ks in CHANNEL_KEYWORDS.values() for k in ks]),
+        "hypothesis": _find_sentence(sentences, ["believe", "expect", "if we"]),
+        "metric": metric,
+        "timeframe": timeframe,
+        "tech_feasibility_notes": None,
+        "top_risks": [rng.choice(["Low willingness to pay", "Crowded market", "Long sales cycle"])],
+        "declared_next_steps": [s for s in sentences if s.lower().startswith(("next", "we will"))],
+    }
+
+def _user_verdict(target_user: str) -> Dict[str, Any]:
+    is_valid = len(target_user.split()) >= 4
+    return {
+        "is_valid": is_valid,
+        "reason": "Names a role and a context." if is_valid else "Too broad; names no role or context.",
+        "improved_target_user": None if is_valid else f"{target_user} at seed-stage B2B SaaS companies".strip(),
+    }
+
+def mock_validate_user(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    return _user_verdict(_match(r'target user definition: "(.*?)"\n', prompt) or "")
+
+def _channel_verdict(channel_text: str, rng: random.Random) -> Dict[str, Any]:
+    channel_type = _detect_channel(channel_text) or rng.choice(CHANNEL_TYPES)
+    vague = any(w in channel_text.lower() for w in ["viral", "social media", "word of mouth"])
+    return {
+        "primary_channel_type": channel_type,
+        "primary_channel_description": channel_text,
+        "other_channels": [],
+        "issues": ["Channel description is vague."] if vague else [],
+    }
+
+def mock_enforce_channel(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    return _channel_verdict(_match(r'distribution strategy: "(.*?)"\n', prompt) or "", rng)
+
+def _hypothesis_verdict(user: str, solution: str, channel: str, rng: random.Random) -> Dict[str, Any]:
+    metric = rng.choice(["weekly active teams", "paid conversions", "qualified demos booked"])
+    timeframe = rng.choice(["2 weeks", "4 weeks", "6 weeks"])
+    return {
+        "hypothesis": f"For {user}, if we offer {solution} through {channel}, then within {timeframe} we expect a measurable increase in {metric}.",
+        "metric": metric,
+        "timeframe": timeframe,
+        "issues": [],
+    }
+
+def mock_enforce_hypothesis(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    return _hypothesis_verdict(
+        _match(r"- User: (.*?)\n", prompt) or "<target_user>",
+        _match(r"- Solution: (.*?)\n", prompt) or "<solution>",
+        _match(r"- Channel: (.*?)\n", prompt) or "<channel>",
+        rng,
+    )
+
+def mock_plan(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    snapshot = mock_extract(prompt, rng)
+    channel = _channel_verdict(snapshot["primary_channel_description"] or "", rng)
+    return {
+        "snapshot": snapshot,
+        "user_validation": _user_verdict(snapshot["target_user"] or ""),
+        "channel": channel,
+        "hypothesis": _hypothesis_verdict(
+            snapshot["target_user"] or "<target_user>",
+            snapshot["solution"] or "<solution>",
+            channel["primary_channel_type"] or "<channel>",
+            rng,
+        ),
+    }
+
+def _drift_verdict(rng: random.Random) -> Dict[str, Any]:
+    classification = rng.choice(["major_change", "minor_refinement"])
+    comment = "Different audience or problem." if classification == "major_change" else "Clarified wording."
+    return {"classification": classification, "comment": comment}
+
+def mock_drift(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    if "Output JSON keyed by field name" in prompt:
+        fields = re.findall(r"^\s*- (\w+):\s*$", prompt, re.MULTILINE)
+        return {field: _drift_verdict(rng) for field in fields}
+    return _drift_verdict(rng)
+
+def mock_experiments(prompt: str, rng: random.Random) -> List[Dict[str, Any]]:
+    channel_type = _match(r'"channel_type": "(.*?)"', prompt) or "cold_outreach"
+    return [
+        {
+            "title": f"Experiment {i + 1}: {title}",
+            "channel_type": channel_type,
+            "steps": ["Define the target list", "Run the outreach", "Log every response"],
+            "success_criteria": f"At least {rng.randint(3, 10)} positive responses",
+            "time_cost": f"{rng.randint(1, 5)} days",
+        }
+        for i, title in enumerate(["Problem interviews", "Smoke-test landing page", "Concierge pilot"])
+    ]
+
+# Routed by a phrase unique to each service prompt; first match wins
+MOCK_ROUTES: List[tuple] = [
+    ("single analysis plan", mock_plan),
+    ("expert startup analyst", mock_extract),
+    ("concreteness of this target user", mock_validate_user),
+    ("Analyze this distribution strategy", mock_enforce_channel),
+    ("structured hypothesis", mock_enforce_hypothesis),
+    ("Compare the", mock_drift),
+    ("Design 3 minimal", mock_experiments),
+]
+
+class LatencyModel:
+    """
+    Simulated provider latency in milliseconds.
+    """
+
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, distribution: str = "constant", seed: Optional[int] = None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}', expected one of {LATENCY_DISTRIBUTIONS}")
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self._rng = random.Random(seed)
+
+    def sample_seconds(self) -> float:
+        mean, jitter = self.mean_ms, self.jitter_ms
+        if mean <= 0 and jitter <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            ms = self._rng.uniform(mean - jitter, mean + jitter)
+        elif self.distribution == "normal":
+            ms = self._rng.gauss(mean, jitter)
+        elif self.distribution == "lognormal":
+            # Median is `mean`; sigma chosen so the spread is roughly `jitter`
+            sigma = math.sqrt(math.log1p((jitter / mean) ** 2)) if mean > 0 else 0.0
+            ms = mean * self._rng.lognormvariate(0.0, sigma)
+        elif self.distribution == "exponential":
+            ms = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            ms = mean
+        # Heavy tails are the point, but a single sample must not stall a benchmark
+        return min(max(ms, 0.0), mean + 10 * jitter) / 1000.0
+
+class MockProviderError(Exception):
+    """
+    Simulated provider overload; carries a 503 like google.api_core's ServiceUnavailable.
+    """
+    code = 503
+
+class MockBackend(LLMBackend):
+    """
+    Offline provider: deterministic, schema-correct JSON for each service
+    prompt, with configurable latency. Responses depend only on the prompt.
+    """
+    name = "mock"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__("mock")
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        # Fraction of calls that fail with MockProviderError, to exercise retries and the breaker
+        self.error_rate = error_rate
+        self._error_rng = random.Random(seed)
+
+    def respond(self, prompt: str) -> str:
+        rng = random.Random(_seed(prompt))
+        handler: Callable = next((fn for marker, fn in MOCK_ROUTES if marker in prompt), None)
+        return json.dumps(handler(prompt, rng) if handler else {})
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate > 0 and self._error_rng.random() < self.error_rate:
+            raise MockProviderError("Simulated provider overload")
+
+    async def generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample_seconds())
+        self._maybe_fail()
+        return self.respond(prompt)
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .. import metrics
+from ..metrics import current_stage
+from ..models import StartupSnapshot, AnalysisResponse
+from .snapshot_extractor import extract_snapshot
+from .analysis_plan import generate_analysis_plan
+from .llm_client import LLMClient
+from .resilience import LLMUnavailableError
+from .token_budget import fits
+from .user_validator import validate_target_user
+from .channel_enforcer import enforce_channel
+from .hypothesis_enforcer import enforce_hypothesis
+from .drift_analyzer import analyze_drift
+from .review_engine import generate_reviews_and_experiments, review_user, review_channel, review_hypothesis
+
+StageFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+Stages = Dict[str, Tuple[Sequence[str], StageFn]]
+# `(event, payload)` callback for partial results: "snapshot", "dimension_review", "drift", "experiments"
+EventCallback = Callable[[str, Any], None]
+
+# Drift on these fields only reads what extraction produced; the rest are
+# rewritten by the channel/hypothesis enforcers and must wait for them.
+EXTRACTED_DRIFT_FIELDS = ["target_user", "problem", "solution"]
+ENFORCED_DRIFT_FIELDS = ["primary_channel_type", "hypothesis"]
+
+# "chain": one LLM call per extraction/validation step; "plan": a single fused call
+# for the snapshot and all three validator verdicts, falling back to the chain
+ANALYSIS_MODES = ("chain", "plan")
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "chain").lower()
+
+# Callbacks `(stage_name, seconds)` invoked whenever a timed stage finishes
+STAGE_OBSERVERS: List[Callable[[str, float], None]] = []
+
+class ExtractionError(Exception):
+    pass
+
+@contextmanager
+def stage_timer(name: str):
+    """
+    Times a block of work and reports it to every registered stage observer.
+    LLM calls made inside the block are attributed to `name`.
+    """
+    token = current_stage.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        current_stage.reset(token)
+        for observer in list(STAGE_OBSERVERS):
+            observer(name, elapsed)
+
+async def run_stages(stages: Stages) -> Dict[str, Any]:
+    """
+    Runs a dependency graph of async stages. Each stage is `name -> (deps, fn)`;
+    `fn` receives the results of its deps and starts as soon as they are all done.
+    """
+    for name, (deps, _) in stages.items():
+        for dep in deps:
+            if dep not in stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(name: str):
+        deps, fn = stages[name]
+        inputs = {dep: await tasks[dep] for dep in deps}
+        # Only the stage's own work is timed, not the wait on its dependencies
+        with stage_timer(name):
+            return await fn(inputs)
+
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return {name: task.result() for name, task in tasks.items()}
+
+async def run_analysis(startup_id: str, input_text: str, latest_snapshot: Optional[StartupSnapshot],
+                       on_event: Optional[EventCallback] = None, mode: Optional[str] = None,
+                       client: Optional[LLMClient] = None) -> AnalysisResponse:
+    """
+    Runs the full analysis chain for one submission without touching the DB.
+    `on_event` receives each partial result as soon as the stage producing it finishes.
+    `mode` ("chain" or "plan") defaults to ANALYSIS_MODE.
+    `client` serves every stage; by default each stage uses its routed client.
+    """
+    current_version = latest_snapshot.version if latest_snapshot else 0
+    mode = mode or ANALYSIS_MODE
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{mode}', expected one of {ANALYSIS_MODES}")
+    # Validator verdicts from the fused call; stays empty in chain mode or after a fallback
+    plan: Dict[str, dict] = {}
+
+    def emit(event: str, payload: Any):
+        if on_event is not None:
+            on_event(event, payload)
+
+    async def extract_with_plan() -> Optional[StartupSnapshot]:
+        try:
+            draft, plan["user"], plan["channel"], plan["hypothesis"] = await generate_analysis_plan(
+                startup_id, input_text, current_version, client
+            )
+            return draft
+        except LLMUnavailableError:
+            # The chain would hit the same unavailable provider
+            raise
+        except Exception as e:
+            print(f"Analysis plan failed, falling back to the multi-call chain: {e}")
+            plan.clear()
+            metrics.PLAN_FALLBACKS.inc()
+            return None
+
+    async def extract(_):
+        # A text too long for one plan prompt goes through the chain's chunked extraction
+        draft = await extract_with_plan() if mode == "plan" and fits(input_text, "plan") else None
+        if draft is not None:
+            emit("snapshot", draft.copy())
+            return draft
+        try:
+            draft = await extract_snapshot(startup_id, input_text, current_version, client)
+        except LLMUnavailableError:
+            # Provider trouble, not bad input: surfaces as 503
+            raise
+        except Exception as e:
+            print(f"Error extracting snapshot: {e}")
+            raise ExtractionError(str(e)) from e
+        # Copy: later stages keep rewriting the draft
+        emit("snapshot", draft.copy())
+        return draft
+
+    async def user(deps):
+        result = plan.get("user") or await validate_target_user(deps["extract"].target_user, client)
+        emit("dimension_review", review_user(result))
+        return result
+
+    async def channel(deps):
+        draft = deps["extract"]
+        result = plan.get("channel") or await enforce_channel(draft.primary_channel_description or input_text, client)
+        # Apply enforcement to draft
+        draft.primary_channel_type = result.get("primary_channel_type")
+        draft.primary_channel_description = result.get("primary_channel_description")
+        emit("dimension_review", review_channel(result))
+        return result
+
+    async def hypothesis(deps):
+        draft = deps["extract"]
+        result = plan.get("hypothesis") or await enforce_hypothesis(draft.dict(), client)
+        draft.hypothesis = result.get("hypothesis")
+        draft.metric = result.get("metric")
+        draft.timeframe = result.get("timeframe")
+        emit("dimension_review", review_hypothesis(result))
+        return result
+
+    async def drift(draft: StartupSnapshot, fields):
+        if not latest_snapshot:
+            return []
+        items = await analyze_drift(latest_snapshot, draft, fields, client)
+        for item in items:
+            emit("drift", item)
+        return items
+
+    # Drift runs as two stages so the extracted fields are compared (and streamed)
+    # as soon as extraction finishes, instead of waiting for the enforcers
+    async def drift_extracted(deps):
+        return await drift(deps["extract"], EXTRACTED_DRIFT_FIELDS)
+
+    # Channel type and hypothesis are only final once the enforcers rewrote them
+    async def drift_enforced(deps):
+        return await drift(deps["extract"], ENFORCED_DRIFT_FIELDS)
+
+    async def reviews(deps):
+        validation_issues = {
+            "user": deps["user"],
+            "channel": deps["channel"],
+            "hypothesis": deps["hypothesis"]
+        }
+        dimension_reviews, experiments, status = await generate_reviews_and_experiments(deps["extract"], validation_issues, client)
+        emit("experiments", experiments)
+        return dimension_reviews, experiments, status
+
+    results = await run_stages({
+        "extract": ((), extract),
+        "user": (("extract",), user),
+        "channel": (("extract",), channel),
+        "hypothesis": (("extract", "channel"), hypothesis),
+        "drift_extracted": (("extract",), drift_extracted),
+        "drift_enforced": (("extract", "hypothesis"), drift_enforced),
+        "reviews": (("extract", "user", "channel", "hypothesis"), reviews),
+    })
+
+    dimension_reviews, experiments, status = results["reviews"]
+    return AnalysisResponse(
+        snapshot=results["extract"],
+        dimension_reviews=dimension_reviews,
+        experiments=experiments,
+        drift=results["drift_extracted"] + results["drift_enforced"],
+        status=status
+    )
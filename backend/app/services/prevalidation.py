@@ -0,0 +1,216 @@
+"""
+Deterministic rules that answer the validator prompts locally when the input
+leaves no doubt: a target user made only of vague audience words, a channel
+description naming exactly one channel type, a hypothesis that already has
+every part of the template. Verdicts have the same shape as the LLM's; any
+input the rules are not sure about returns None and goes to the LLM.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+PREVALIDATION_ENABLED = os.environ.get("PREVALIDATION_ENABLED", "1") != "0"
+
+# --- Target user ---
+
+VAGUE_AUDIENCES = {
+    "everyone", "everybody", "anyone", "anybody", "people", "person", "users", "user", "consumers", "consumer",
+    "customers", "customer", "businesses", "business", "companies", "company", "students", "student",
+    "millennials", "boomers", "genz", "parents", "families", "kids", "adults", "teens", "teenagers", "humans",
+    "individuals", "professionals", "workers", "employees", "smbs", "smes", "startups", "startup",
+    "enterprises", "brands", "creators", "shoppers", "buyers", "public", "world", "market", "women", "men",
+    "b2b", "b2c", "organizations", "teams", "internet",
+}
+# Words that add nothing to a vague audience ("all small businesses", "busy people worldwide")
+AUDIENCE_FILLER = {
+    "all", "any", "every", "the", "a", "an", "of", "and", "or", "everyday", "regular", "normal", "ordinary",
+    "average", "general", "typical", "modern", "busy", "young", "old", "many", "most", "various", "different",
+    "potential", "online", "global", "worldwide", "small", "big", "large", "local", "kinds", "types", "gen", "z",
+    "mass", "basically", "users", "in", "on", "who", "use", "uses", "using",
+}
+ROLES = {
+    "manager", "founder", "engineer", "nurse", "teacher", "owner", "recruiter", "developer", "designer",
+    "accountant", "doctor", "dentist", "lawyer", "marketer", "analyst", "director", "cto", "ceo", "cfo", "coo",
+    "officer", "administrator", "coordinator", "specialist", "consultant", "agent", "operator", "technician",
+    "pharmacist", "therapist", "researcher", "scientist", "planner", "lead", "head", "vp", "buyer", "clinician",
+}
+CONTEXT = re.compile(r"\b(?:at|in|for|from|inside|within)\s+\w+")
+# An explicit behavior clause: "who schedule...", "that run...", "when hiring...", "while they...".
+# A bare -ing word is not enough: "engineering managers", "a marketing agency" name no behavior.
+BEHAVIOR = re.compile(
+    r"\bwho\s+(?:\w+ly\s+)?\w+"
+    r"|\bthat\s+(?:\w+ly\s+)?(?:are|is|have|has|need|want|run|use|manage|\w+(?:ing|ed|es))\b"
+    r"|\b(?:when|while)\s+(?:(?:they|their\s+\w+)\s+\w+|\w+ing\b)"
+)
+
+def _words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+def _singular(word: str) -> str:
+    return word[:-1] if word.endswith("s") and len(word) > 3 else word
+
+def check_target_user(target_user: str) -> Optional[Dict[str, Any]]:
+    if not PREVALIDATION_ENABLED:
+        return None
+    words = _words(target_user)
+    vague = [w for w in words if w in VAGUE_AUDIENCES]
+    if vague and all(w in VAGUE_AUDIENCES or w in AUDIENCE_FILLER for w in words):
+        return {
+            "is_valid": False,
+            "reason": f"'{target_user.strip()}' is a broad audience: it names no role, context or behavior.",
+            "improved_target_user": f"A specific role among {vague[-1]} in a specific context, e.g. "
+                                    "'HR managers at Series B tech companies scheduling 20+ interviews a week'.",
+        }
+    has_role = any(_singular(w) in ROLES for w in words)
+    if has_role and len(words) >= 6 and CONTEXT.search(target_user.lower()) and BEHAVIOR.search(target_user.lower()):
+        return {"is_valid": True, "reason": "Names a role, a context and what they are doing.", "improved_target_user": None}
+    return None
+
+# --- Channel ---
+
+# Phrases that name a channel type; bare platform names ("LinkedIn", "Reddit") are left to the LLM,
+# since posting there, advertising there and messaging people there are different channels
+CHANNEL_LEXICON = {
+    "cold_outreach": ["cold email", "cold emails", "cold emailing", "cold call", "cold calls", "cold calling",
+                      "cold outreach", "outbound", "cold dms", "email outreach", "sales calls", "door to door"],
+    "community": ["community", "communities", "slack group", "slack community", "subreddit", "forum", "forums",
+                  "meetup", "meetups", "facebook group", "facebook groups", "whatsapp group"],
+    "paid_ads": ["ads", "advert", "adverts", "advertising", "adwords", "ppc", "paid social", "sponsored posts",
+                 "paid acquisition", "paid search"],
+    "partnerships": ["partnership", "partnerships", "partner", "partners", "reseller", "resellers", "affiliate",
+                     "affiliates", "co marketing", "distributor", "distributors"],
+    "marketplace": ["marketplace", "marketplaces", "app store", "play store", "chrome web store"],
+    "product_led": ["free trial", "freemium", "free tier", "self serve", "product led", "referral program",
+                    "referral loop", "invite loop"],
+}
+VAGUE_CHANNELS = ["go viral", "going viral", "viral", "social media", "word of mouth", "marketing", "buzz", "hype",
+                  "organic growth", "influencers", "press"]
+# Words that may surround a vague phrase without making it concrete ("we will just go viral on social media")
+CHANNEL_FILLER = {"we", "will", "ll", "just", "hope", "to", "and", "or", "on", "via", "through", "by", "with", "use",
+                  "using", "rely", "relying", "get", "getting", "lots", "of", "a", "the", "our", "it", "be", "some",
+                  "lot", "mostly", "plan", "planning", "go", "grow", "growth"}
+# Longer text is usually the whole submission (no channel was extracted): leave it to the LLM
+CHANNEL_RULE_MAX_WORDS = 40
+
+def _phrases(text: str, phrases: List[str]) -> List[str]:
+    normalized = " " + " ".join(_words(text.replace("-", " "))) + " "
+    return [p for p in phrases if f" {p} " in normalized]
+
+def _only_vague(text: str) -> List[str]:
+    """
+    The vague phrases `text` is made of, if it says nothing else: no platform,
+    audience or tactic outside the filler words.
+    """
+    normalized = remaining = " " + " ".join(_words(text.replace("-", " "))) + " "
+    found = []
+    for phrase in sorted(VAGUE_CHANNELS, key=len, reverse=True):
+        if f" {phrase} " in remaining:
+            found.append(phrase)
+            remaining = remaining.replace(f" {phrase} ", " ")
+    if not found or any(word not in CHANNEL_FILLER for word in remaining.split()):
+        return []
+    return sorted(found, key=lambda phrase: normalized.index(f" {phrase} "))
+
+def check_channel(channel_text: str) -> Optional[Dict[str, Any]]:
+    if not PREVALIDATION_ENABLED or len(channel_text.split()) > CHANNEL_RULE_MAX_WORDS:
+        return None
+    vague = _only_vague(channel_text)
+    if vague:
+        return {
+            "primary_channel_type": None,
+            "primary_channel_description": channel_text.strip(),
+            "other_channels": [],
+            "issues": [f"'{vague[0]}' is not an executable channel: name the platform, who you reach there and how."],
+        }
+    types = [t for t, keywords in CHANNEL_LEXICON.items() if _phrases(channel_text, keywords)]
+    if len(types) == 1 and not _phrases(channel_text, VAGUE_CHANNELS):
+        return {
+            "primary_channel_type": types[0],
+            "primary_channel_description": channel_text.strip(),
+            "other_channels": [],
+            "issues": [],
+        }
+    return None
+
+# --- Hypothesis ---
+
+VANITY_METRICS = ["likes", "views", "page views", "pageviews", "followers", "impressions", "visits", "visitors",
+                  "traffic", "shares", "retweets", "upvotes", "downloads", "installs", "mentions", "reach",
+                  "engagement", "clicks", "open rate", "opens", "waitlist"]
+TIMEFRAME = re.compile(r"\d+\s*(?:days?|weeks?|months?|quarters?|years?)\b", re.IGNORECASE)
+LEAD_IN = re.compile(r"^(?:we\s+)?(?:believe|expect|think|predict|hypothesi[sz]e)\s+(?:that\s+)?", re.IGNORECASE)
+
+def vanity_metric(metric: Optional[str]) -> Optional[str]:
+    """
+    The vanity measure `metric` is about (likes, views, downloads...), if any.
+    """
+    found = _phrases(metric or "", VANITY_METRICS)
+    return found[0] if found else None
+
+def _vanity_issue(word: str) -> str:
+    return f"'{word}' is a vanity metric: measure a behavior that shows value, e.g. paid conversions or weekly active use."
+
+# Already in the template's shape, e.g. the hypothesis of a refined earlier version
+STRUCTURED = re.compile(
+    r"^for\s+.+?,\s*if we offer\s+.+?\s+through\s+.+?,\s*then within\s+.+?,?\s+we expect\s+(?P<expectation>.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+SOLUTION_LEAD_IN = re.compile(r"^(?:we\s+(?:are\s+)?(?:build|building|offer|offering|make|making|create|creating|provide|providing|develop|developing)\s+)", re.IGNORECASE)
+CHANNEL_LABELS = {
+    "cold_outreach": "cold outreach", "community": "community channels", "paid_ads": "paid ads",
+    "partnerships": "partnerships", "marketplace": "a marketplace", "product_led": "product-led acquisition",
+}
+
+def _inline(text: str) -> str:
+    # "Students" -> "students" mid-sentence, but keep acronyms like "HR"
+    first = text.split(" ", 1)[0]
+    return text[0].lower() + text[1:] if first and first == first.capitalize() else text
+
+def check_hypothesis(snapshot_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Structures the hypothesis locally when the snapshot already states a
+    measurable target (a number), a metric and a timeframe: a hypothesis in the
+    template's shape is kept, a plain "we believe 20 teams will..." is filled in.
+    """
+    if not PREVALIDATION_ENABLED:
+        return None
+    parts = {key: (snapshot_data.get(key) or "").strip().rstrip(".")
+             for key in ("target_user", "solution", "primary_channel_type", "hypothesis", "metric", "timeframe")}
+    if not parts["hypothesis"] or not parts["metric"] or not TIMEFRAME.search(parts["timeframe"]):
+        return None
+
+    structured = STRUCTURED.match(parts["hypothesis"])
+    if structured:
+        expectation = structured.group("expectation")
+        hypothesis = parts["hypothesis"] + "."
+    else:
+        if not (parts["target_user"] and parts["solution"] and parts["primary_channel_type"]):
+            return None
+        expectation = TIMEFRAME.sub("", LEAD_IN.sub("", parts["hypothesis"]))
+        expectation = re.sub(r"\s+(?:with)?in\s*$", "", expectation.strip(" ,"))
+        channel = CHANNEL_LABELS.get(parts["primary_channel_type"], parts["primary_channel_type"])
+        hypothesis = (f"For {_inline(parts['target_user'])}, if we offer {_inline(SOLUTION_LEAD_IN.sub('', parts['solution']))} "
+                      f"through {channel}, then within {parts['timeframe']} we expect {_inline(expectation)}.")
+    # The target itself must be a number, not just the timeframe
+    if not re.search(r"\d", TIMEFRAME.sub("", expectation)):
+        return None
+
+    vanity = vanity_metric(parts["metric"])
+    return {
+        "hypothesis": hypothesis,
+        "metric": parts["metric"],
+        "timeframe": parts["timeframe"],
+        "issues": [_vanity_issue(vanity)] if vanity else [],
+    }
+
+def flag_vanity_metric(result: Any) -> Any:
+    """
+    Adds the vanity-metric issue to an LLM hypothesis verdict that missed it.
+    """
+    if not PREVALIDATION_ENABLED or not isinstance(result, dict):
+        return result
+    vanity = vanity_metric(result.get("metric"))
+    issues = result.get("issues") or []
+    if vanity and not any("vanity" in str(issue).lower() for issue in issues):
+        result["issues"] = list(issues) + [_vanity_issue(vanity)]
+    return result
@@ -0,0 +1,164 @@
+"""
+Failure handling for LLM provider calls: per-call deadlines, jittered
+exponential retries, a circuit breaker and a latency tracker for hedging.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# HTTP statuses worth retrying (google.api_core exceptions carry them as `.code`)
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class LLMUnavailableError(Exception):
+    """
+    The provider could not produce a usable response: retries were exhausted
+    or the circuit breaker is open. `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Errors a retry can plausibly fix: timeouts, dropped connections, provider
+    overload/5xx, and a response that was not valid JSON.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, json.JSONDecodeError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+class RetryPolicy:
+    """
+    Up to `max_attempts` tries with "full jitter" exponential backoff between them.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, seed: Optional[int] = None):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = random.Random(seed)
+
+    def delay(self, attempt: int) -> float:
+        # Sleep before try `attempt + 1`; spreads retries from many callers apart
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive provider failures and rejects
+    calls for `reset_timeout` seconds. After that a single trial call is let
+    through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError("LLM provider circuit is open; failing fast", retry_after=max(remaining, 1.0))
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self.failure_threshold > 0 and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        # Called after every attempt, whatever it raised (non-transient errors,
+        # bad JSON, cancellation), so a trial that recorded nothing cannot
+        # leave the breaker rejecting calls forever
+        with self._lock:
+            self._trial_in_flight = False
+
+class LatencyTracker:
+    """
+    Recent successful call latencies; the hedge fires after their p95.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class ResiliencePolicy:
+    """
+    Everything LLMClient needs to decide how long to wait, whether to retry,
+    whether to call at all, and when to hedge.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge: bool = False,
+                 hedge_delay: float = 2.0, latency: Optional[LatencyTracker] = None):
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.retry = retry or RetryPolicy(max_attempts=1)
+        self.breaker = breaker or CircuitBreaker(failure_threshold=0)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.latency = latency or LatencyTracker()
+
+    def hedge_after(self) -> float:
+        p95 = self.latency.quantile(0.95)
+        return p95 if p95 is not None else self.hedge_delay
+
+def build_resilience_from_env() -> ResiliencePolicy:
+    return ResiliencePolicy(
+        timeout=float(os.environ.get("LLM_TIMEOUT_SECONDS", "30")),
+        retry=RetryPolicy(
+            max_attempts=int(os.environ.get("LLM_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.environ.get("LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.environ.get("LLM_RETRY_MAX_DELAY", "8")),
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.environ.get("LLM_BREAKER_RESET_SECONDS", "30")),
+        ),
+        hedge=os.environ.get("LLM_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes"),
+        hedge_delay=float(os.environ.get("LLM_HEDGE_DELAY_SECONDS", "2")),
+        latency=LatencyTracker(min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))),
+    )
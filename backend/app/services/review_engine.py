@@ -1,56 +1,55 @@
-from typing import List, Tuple
-from ..models import StartupSnapshot, DimensionReview, Experiment, DriftItem
-from .llm_client import llm_client
+from typing import List, Optional, Tuple
+from ..models import StartupSnapshot, DimensionReview, Experiment
+from .llm_client import LLMClient, client_for
+from .token_budget import compact
 
-def generate_reviews_and_experiments(snapshot: StartupSnapshot, validation_issues: dict) -> Tuple[List[DimensionReview], List[Experiment], str]:
-    """
-    Generates dimension reviews and experiments based on the snapshot and validation results.
-    """
-    
-    # 1. Compile Reviews
-    reviews = []
-    status = "OK"
-    
-    # User Review
-    user_valid = validation_issues.get("user", {}).get("is_valid", True)
-    reviews.append(DimensionReview(
+def review_user(user_validation: dict) -> DimensionReview:
+    user_valid = user_validation.get("is_valid", True)
+    return DimensionReview(
         dimension="User",
         severity="blocker" if not user_valid else "ok",
-        issue=None if user_valid else validation_issues["user"].get("reason"),
-        recommendation=None if user_valid else f"Try: {validation_issues['user'].get('improved_target_user')}"
-    ))
-    
-    # Channel Review
-    channel_issues = validation_issues.get("channel", {}).get("issues", [])
-    reviews.append(DimensionReview(
+        issue=None if user_valid else user_validation.get("reason"),
+        recommendation=None if user_valid else f"Try: {user_validation.get('improved_target_user')}"
+    )
+
+def review_channel(channel_enforcement: dict) -> DimensionReview:
+    channel_issues = channel_enforcement.get("issues", [])
+    return DimensionReview(
         dimension="Distribution",
         severity="blocker" if channel_issues else "ok",
         issue="; ".join(channel_issues) if channel_issues else None,
         recommendation="Pick one concrete channel." if channel_issues else None
-    ))
-    
-    # Hypothesis Review
-    hypo_issues = validation_issues.get("hypothesis", {}).get("issues", [])
-    reviews.append(DimensionReview(
+    )
+
+def review_hypothesis(hypothesis_enforcement: dict) -> DimensionReview:
+    hypo_issues = hypothesis_enforcement.get("issues", [])
+    return DimensionReview(
         dimension="Hypothesis",
         severity="major" if hypo_issues else "ok",
         issue="; ".join(hypo_issues) if hypo_issues else None,
         recommendation="Refine metric and timeframe." if hypo_issues else None
-    ))
-    
-    if any(r.severity == "blocker" for r in reviews):
-        status = "BLOCKED"
-        
-    # 2. Generate Experiments (only if not completely blocked on user/channel basics)
-    experiments = []
-    if status != "BLOCKED":
-        prompt = f"""
+    )
+
+def compile_reviews(validation_issues: dict) -> Tuple[List[DimensionReview], str]:
+    """
+    Turns validator outputs into dimension reviews and an overall status.
+    """
+    reviews = [
+        review_user(validation_issues.get("user", {})),
+        review_channel(validation_issues.get("channel", {})),
+        review_hypothesis(validation_issues.get("hypothesis", {})),
+    ]
+    status = "BLOCKED" if any(r.severity == "blocker" for r in reviews) else "OK"
+    return reviews, status
+
+def _build_experiments_prompt(snapshot: StartupSnapshot) -> str:
+    return f"""
         Design 3 minimal, concrete experiments for this startup to validate their hypothesis.
         
         Context:
-        - User: {snapshot.target_user}
-        - Hypothesis: {snapshot.hypothesis}
-        - Channel: {snapshot.primary_channel_type} ({snapshot.primary_channel_description})
+        - User: {compact(snapshot.target_user, "experiments")}
+        - Hypothesis: {compact(snapshot.hypothesis, "experiments")}
+        - Channel: {snapshot.primary_channel_type} ({compact(snapshot.primary_channel_description, "experiments")})
         
         Output JSON:
         [
@@ -63,12 +62,29 @@ def generate_reviews_and_experiments(snapshot: StartupSnapshot, validation_issue
             }}
         ]
         """
-        exps_data = llm_client.generate_json(prompt)
-        if isinstance(exps_data, list):
-            for e in exps_data:
-                experiments.append(Experiment(**e))
-        elif isinstance(exps_data, dict) and "experiments" in exps_data:
-             for e in exps_data["experiments"]:
-                experiments.append(Experiment(**e))
 
+def _parse_experiments(exps_data) -> List[Experiment]:
+    experiments = []
+    if isinstance(exps_data, list):
+        for e in exps_data:
+            experiments.append(Experiment(**e))
+    elif isinstance(exps_data, dict) and "experiments" in exps_data:
+        for e in exps_data["experiments"]:
+            experiments.append(Experiment(**e))
+    return experiments
+
+async def generate_experiments(snapshot: StartupSnapshot, client: Optional[LLMClient] = None) -> List[Experiment]:
+    return _parse_experiments(await (client or client_for("experiments")).generate_json_async(_build_experiments_prompt(snapshot)))
+
+async def generate_reviews_and_experiments(snapshot: StartupSnapshot, validation_issues: dict,
+                                                 client: Optional[LLMClient] = None) -> Tuple[List[DimensionReview], List[Experiment], str]:
+    """
+    Generates dimension reviews and experiments based on the snapshot and validation results.
+    """
+    reviews, status = compile_reviews(validation_issues)
+
+    # Generate Experiments (only if not completely blocked on user/channel basics)
+    experiments = []
+    if status != "BLOCKED":
+        experiments = await generate_experiments(snapshot, client)
     return reviews, experiments, status
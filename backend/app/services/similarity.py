@@ -0,0 +1,199 @@
+"""
+Local similarity over snapshot text: hashed word and character n-grams in a
+fixed-size vector, compared by cosine. No LLM calls and no model download.
+"""
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Snapshot, SimilarStartup
+
+SIMILARITY_FIELDS = ["problem", "target_user", "solution"]
+# Hashed feature dimensions; the index holds len(SIMILARITY_FIELDS) * SIMILARITY_DIM float32s per startup
+SIMILARITY_DIM = int(os.environ.get("SIMILARITY_DIM", "512"))
+
+def _features(text: str) -> List[str]:
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    # Character trigrams keep plurals and small spelling changes close
+    for word in words:
+        padded = f" {word} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+def vectorize(texts: Sequence[Optional[str]], dim: int = SIMILARITY_DIM) -> np.ndarray:
+    """
+    One L2-normalized row per text (all zeros for an empty one). Features are
+    hashed with a signed CRC32, which is stable across processes.
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        if not text:
+            continue
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in _features(str(text))), dtype=np.uint32)
+        if not hashes.size:
+            continue
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(matrix[row], hashes % dim, signs)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def similarity(a: Optional[str], b: Optional[str]) -> Optional[float]:
+    """
+    Cosine similarity of two texts, or None when either is empty.
+    """
+    if not a or not b:
+        return None
+    vectors = vectorize([a, b])
+    if not vectors[0].any() or not vectors[1].any():
+        return None
+    return float(np.clip(vectors[0] @ vectors[1], 0.0, 1.0))
+
+def drift_score(old_val, new_val) -> Optional[float]:
+    """
+    1 - similarity: 0 for the same wording, 1 for nothing in common.
+    None when one side is empty.
+    """
+    score = similarity(old_val and str(old_val), new_val and str(new_val))
+    return None if score is None else round(1.0 - score, 3)
+
+class SimilarityIndex:
+    """
+    Vectors of every startup's latest snapshot, one matrix per field, queried
+    with a single matrix-vector product per field. The index catches up with
+    new snapshot rows (by id) before each query, so saves from any process,
+    including job workers, are picked up incrementally.
+    """
+
+    def __init__(self, fields: Sequence[str] = SIMILARITY_FIELDS, dim: int = SIMILARITY_DIM):
+        self.fields = list(fields)
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._startups: List[str] = []
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._vectors = {field: np.zeros((0, dim), dtype=np.float32) for field in self.fields}
+        self._last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._startups)
+
+    def _grow(self, size: int) -> None:
+        # Capacity doubles, so adding startups one save at a time stays amortized O(1)
+        capacity = len(self._versions)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        versions = np.zeros(capacity, dtype=np.int64)
+        versions[:len(self._versions)] = self._versions
+        self._versions = versions
+        for field in self.fields:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:len(self._vectors[field])] = self._vectors[field]
+            self._vectors[field] = grown
+
+    def _add(self, snapshots: Iterable[Snapshot]) -> None:
+        # Latest version per startup only; rows arrive in id order
+        latest: Dict[str, Snapshot] = {}
+        for snapshot in snapshots:
+            current = latest.get(snapshot.startup_id)
+            if current is None or snapshot.version >= current.version:
+                latest[snapshot.startup_id] = snapshot
+        if not latest:
+            return
+        updates = [s for s in latest.values()
+                   if s.startup_id not in self._rows or s.version >= self._versions[self._rows[s.startup_id]]]
+        for snapshot in updates:
+            if snapshot.startup_id not in self._rows:
+                self._rows[snapshot.startup_id] = len(self._startups)
+                self._startups.append(snapshot.startup_id)
+        self._grow(len(self._startups))
+        rows = np.array([self._rows[s.startup_id] for s in updates], dtype=np.int64)
+        self._versions[rows] = [s.version for s in updates]
+        for field in self.fields:
+            self._vectors[field][rows] = vectorize([getattr(s, field) for s in updates], self.dim)
+
+    def sync(self, db: Session) -> int:
+        """
+        Adds snapshot rows written since the last sync; returns how many were read.
+        """
+        with self._lock:
+            query = db.query(Snapshot).filter(Snapshot.id > self._last_id)
+            if not self._last_id:
+                # First load: only each startup's latest version
+                latest = (
+                    db.query(Snapshot.startup_id, func.max(Snapshot.version).label("version"))
+                    .group_by(Snapshot.startup_id)
+                    .subquery()
+                )
+                query = query.join(latest, (Snapshot.startup_id == latest.c.startup_id) & (Snapshot.version == latest.c.version))
+            rows = query.order_by(Snapshot.id).all()
+            if not rows:
+                return 0
+            self._add(rows)
+            self._last_id = max(self._last_id, max(row.id for row in rows))
+            return len(rows)
+
+    def similar(self, startup_id: str, limit: int = 10, fields: Optional[Sequence[str]] = None,
+                min_score: float = 0.0) -> Optional[List[SimilarStartup]]:
+        """
+        Startups whose latest snapshot is closest to `startup_id`'s, best first.
+        The score averages the per-field cosines over fields both sides state.
+        None when `startup_id` is not indexed.
+        """
+        fields = list(fields or self.fields)
+        with self._lock:
+            row = self._rows.get(startup_id)
+            if row is None:
+                return None
+            n = len(self._startups)
+            total = np.zeros(n, dtype=np.float32)
+            counted = np.zeros(n, dtype=np.float32)
+            per_field: Dict[str, np.ndarray] = {}
+            for field in fields:
+                matrix = self._vectors[field][:n]
+                query = matrix[row]
+                if not query.any():
+                    continue
+                scores = np.clip(matrix @ query, 0.0, 1.0)
+                present = matrix.any(axis=1)
+                per_field[field] = scores
+                total += np.where(present, scores, 0.0)
+                counted += present
+            combined = np.divide(total, counted, out=np.zeros_like(total), where=counted > 0)
+            combined[row] = -1.0
+            candidates = np.flatnonzero(combined >= min_score if min_score > 0 else combined > 0)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-combined[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-combined[candidates], kind="stable")]
+            return [
+                SimilarStartup(
+                    startup_id=self._startups[i],
+                    version=int(self._versions[i]),
+                    score=round(float(combined[i]), 4),
+                    field_scores={field: round(float(scores[i]), 4) for field, scores in per_field.items()},
+                )
+                for i in candidates
+            ]
+
+_indexes: Dict[str, SimilarityIndex] = {}
+_indexes_lock = threading.Lock()
+
+def index_for(db: Session) -> SimilarityIndex:
+    """
+    The process-wide index of the database `db` is bound to, synced with rows
+    written since it was last used.
+    """
+    key = str(db.get_bind().url)
+    with _indexes_lock:
+        index = _indexes.setdefault(key, SimilarityIndex())
+    index.sync(db)
+    return index
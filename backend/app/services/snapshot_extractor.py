@@ -1,15 +1,16 @@
+import asyncio
+from typing import Optional
 from ..models import StartupSnapshot
-from .llm_client import llm_client
+from .llm_client import LLMClient, client_for
+from .token_budget import chunk_text, merge_partials, stage_budget
 from datetime import datetime
 
-def extract_snapshot(startup_id: str, input_text: str, current_version: int) -> StartupSnapshot:
-    """
-    Extracts a StartupSnapshot from raw text using the LLM.
-    """
-    prompt = f"""
+def _build_prompt(input_text: str, part: Optional[str] = None) -> str:
+    scope = f"\n    This is {part} of a longer text; extract only what this part states." if part else ""
+    return f"""
     You are an expert startup analyst.
     Analyze the following text from a founder describing their startup idea.
-    Extract key information into a structured JSON format.
+    Extract key information into a structured JSON format.{scope}
     
     Input Text:
     "{input_text}"
@@ -31,14 +32,32 @@ def extract_snapshot(startup_id: str, input_text: str, current_version: int) ->
 
     If a field is not present, leave it null or empty.
     """
-    
-    # We don't enforce strict schema validation in the prompt for every field to allow flexibility,
-    # but we cast it to the Pydantic model.
-    data = llm_client.generate_json(prompt)
-    
+
+def _to_snapshot(data: dict, startup_id: str, current_version: int) -> StartupSnapshot:
     # Ensure required fields for the model
     data["startup_id"] = startup_id
     data["version"] = current_version + 1
     data["timestamp"] = datetime.utcnow().isoformat()
     
     return StartupSnapshot(**data)
+
+async def extract_snapshot(startup_id: str, input_text: str, current_version: int,
+                                 client: Optional[LLMClient] = None) -> StartupSnapshot:
+    """
+    Extracts a StartupSnapshot from raw text using the LLM.
+    """
+    # We don't enforce strict schema validation in the prompt for every field to allow flexibility,
+    # but we cast it to the Pydantic model.
+    client = client or client_for("extract")
+    budget = stage_budget("extract")
+    chunks = chunk_text(input_text, budget) if budget > 0 else [input_text]
+    if len(chunks) == 1:
+        data = await client.generate_json_async(_build_prompt(input_text))
+    else:
+        # Long texts are extracted part by part, concurrently, and merged in text order
+        partials = await asyncio.gather(*(
+            client.generate_json_async(_build_prompt(chunk, f"part {i} of {len(chunks)}"))
+            for i, chunk in enumerate(chunks, 1)
+        ))
+        data = merge_partials(partials)
+    return _to_snapshot(data, startup_id, current_version)
@@ -0,0 +1,134 @@
+"""
+Token accounting for prompts: per-stage budgets for the text a stage pastes
+into its prompt, compaction of over-long fields, chunking for extraction, and
+the hard cap on submitted input.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from ..metrics import estimate_tokens
+
+# Tokens of caller-supplied text (input or snapshot fields) a stage may put in one prompt
+DEFAULT_STAGE_BUDGETS = {
+    "extract": 3000,
+    "plan": 3000,
+    "user": 200,
+    "channel": 400,
+    "hypothesis": 300,
+    "drift": 400,
+    "experiments": 300,
+}
+
+# Submissions above MAX_INPUT_TOKENS are rejected, or cut down with INPUT_OVERFLOW=truncate
+MAX_INPUT_TOKENS = int(os.environ.get("MAX_INPUT_TOKENS", "20000"))
+INPUT_OVERFLOW = os.environ.get("INPUT_OVERFLOW", "reject").lower()
+# Context repeated at the start of each extraction chunk so sentences split across chunks survive
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("EXTRACT_CHUNK_OVERLAP_TOKENS", "100"))
+
+TRUNCATION_MARKER = " [...]"
+
+class InputTooLargeError(ValueError):
+    pass
+
+def count_tokens(text: Optional[str]) -> int:
+    return estimate_tokens(text or "")
+
+def stage_budget(stage: str) -> int:
+    """
+    LLM_TOKEN_BUDGET_<STAGE> or the default; 0 disables the budget.
+    """
+    return int(os.environ.get(f"LLM_TOKEN_BUDGET_{stage.upper()}", DEFAULT_STAGE_BUDGETS.get(stage, 0)))
+
+def _cut(text: str, tokens: int) -> str:
+    # estimate_tokens is ~4 characters per token; cut at a word boundary when there is one
+    limit = max(tokens * 4, 0)
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    space = head.rfind(" ")
+    return head[:space] if space > limit // 2 else head
+
+def compact(value: Any, stage: str) -> Any:
+    """
+    `value` clipped to the stage's budget, marked as truncated. Long fields are
+    otherwise repeated verbatim in every downstream prompt.
+    """
+    budget = stage_budget(stage)
+    if not isinstance(value, str) or budget <= 0 or count_tokens(value) <= budget:
+        return value
+    return _cut(value, budget - count_tokens(TRUNCATION_MARKER)) + TRUNCATION_MARKER
+
+def fits(text: str, stage: str) -> bool:
+    budget = stage_budget(stage)
+    return budget <= 0 or count_tokens(text) <= budget
+
+def cap_input(text: str) -> str:
+    """
+    Applies the hard cap on a submission: raises InputTooLargeError, or with
+    INPUT_OVERFLOW=truncate returns the text cut down to MAX_INPUT_TOKENS.
+    """
+    if MAX_INPUT_TOKENS <= 0 or count_tokens(text) <= MAX_INPUT_TOKENS:
+        return text
+    if INPUT_OVERFLOW == "truncate":
+        return _cut(text, MAX_INPUT_TOKENS)
+    raise InputTooLargeError(
+        f"input_text is about {count_tokens(text)} tokens; the limit is {MAX_INPUT_TOKENS}"
+    )
+
+def _tail(text: str, tokens: int) -> str:
+    limit = max(tokens * 4, 0)
+    if len(text) <= limit:
+        return text
+    tail = text[-limit:] if limit else ""
+    space = tail.find(" ")
+    return tail[space + 1:] if 0 <= space < limit // 2 else tail
+
+def chunk_text(text: str, chunk_tokens: int, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """
+    Splits `text` into pieces of roughly `chunk_tokens`, breaking between
+    paragraphs or sentences, each starting with the tail of the previous piece.
+    """
+    if count_tokens(text) <= chunk_tokens:
+        return [text]
+    overlap_tokens = min(overlap_tokens, chunk_tokens // 4)
+
+    units: List[str] = []
+    for unit in re.split(r"(?<=[.!?])\s+|\n\s*\n", text):
+        unit = unit.strip()
+        # A single sentence longer than a chunk is hard-split
+        while count_tokens(unit) > chunk_tokens:
+            piece = _cut(unit, chunk_tokens)
+            units.append(piece)
+            unit = unit[len(piece):].lstrip()
+        if unit:
+            units.append(unit)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    fresh = 0  # units in `current` not already sent in the previous chunk
+    for unit in units:
+        if fresh and count_tokens(" ".join(current + [unit])) > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, fresh = ([_tail(chunks[-1], overlap_tokens)] if overlap_tokens else []), 0
+        current.append(unit)
+        fresh += 1
+    chunks.append(" ".join(current))
+    return chunks
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combines per-chunk extractions in text order: the first chunk that states a
+    field wins, list fields are concatenated without duplicates.
+    """
+    merged: Dict[str, Any] = {}
+    for partial in partials:
+        if not isinstance(partial, dict):
+            continue
+        for key, value in partial.items():
+            if isinstance(value, list):
+                existing = merged.setdefault(key, [])
+                existing.extend(v for v in value if v not in existing)
+            elif value not in (None, "") and merged.get(key) in (None, ""):
+                merged[key] = value
+    return merged
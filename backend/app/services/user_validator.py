@@ -1,18 +1,21 @@
-from .llm_client import llm_client
+from typing import Optional
+from .. import metrics
+from .llm_client import LLMClient, client_for
+from .prevalidation import check_target_user
+from .token_budget import compact
 
-def validate_target_user(target_user: str) -> dict:
-    """
-    Validates if the target user is concrete enough.
-    Returns: { "is_valid": bool, "reason": str, "improved_target_user": str }
-    """
+def _precheck(target_user: str):
     if not target_user or len(target_user.strip()) < 5:
         return {
             "is_valid": False,
             "reason": "Target user is missing or too short.",
             "improved_target_user": "Specific role in a specific industry (e.g., 'HR Managers in Series B Tech Companies')."
         }
+    return check_target_user(target_user)
 
-    prompt = f"""
+def _build_prompt(target_user: str) -> str:
+    target_user = compact(target_user, "user")
+    return f"""
     Evaluate the concreteness of this target user definition: "{target_user}"
     
     Rules:
@@ -31,5 +34,14 @@ def validate_target_user(target_user: str) -> dict:
         "improved_target_user": "a more concrete version if invalid, else null"
     }}
     """
-    
-    return llm_client.generate_json(prompt)
+
+async def validate_target_user(target_user: str, client: Optional[LLMClient] = None) -> dict:
+    """
+    Validates if the target user is concrete enough.
+    Returns: { "is_valid": bool, "reason": str, "improved_target_user": str }
+    """
+    local = _precheck(target_user)
+    metrics.PREVALIDATION.inc(stage="user", outcome="llm" if local is None else "local")
+    if local is not None:
+        return local
+    return await (client or client_for("user")).generate_json_async(_build_prompt(target_user))
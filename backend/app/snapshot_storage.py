@@ -0,0 +1,125 @@
+"""
+Delta-encoded snapshot history.
+
+A startup's latest version is always a full row, so reading it stays a
+single-row lookup. With SNAPSHOT_STORAGE=delta, the previous version is
+rewritten as a reverse delta when a new one is saved: its content columns are
+cleared and `payload` holds the zlib-compressed JSON of the fields that differ
+from the version after it. Every SNAPSHOT_KEYFRAME_EVERY-th version stays a
+full keyframe, so rebuilding any version applies at most that many deltas.
+"""
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .models import Snapshot, StartupSnapshot
+
+# "full": every row keeps all columns (the original layout) | "delta": reverse deltas between keyframes
+SNAPSHOT_STORAGE = os.environ.get("SNAPSHOT_STORAGE", "full").lower()
+SNAPSHOT_KEYFRAME_EVERY = int(os.environ.get("SNAPSHOT_KEYFRAME_EVERY", "10"))
+STORAGE_MODES = ("full", "delta")
+
+CONTENT_FIELDS = [name for name in StartupSnapshot.__fields__ if name not in ("startup_id", "version", "timestamp")]
+
+def delta_enabled() -> bool:
+    return SNAPSHOT_STORAGE == "delta"
+
+def is_keyframe(version: int, every: Optional[int] = None) -> bool:
+    every = SNAPSHOT_KEYFRAME_EVERY if every is None else every
+    return every <= 1 or version % every == 1
+
+def is_delta(row: Snapshot) -> bool:
+    return row.storage == "delta"
+
+def row_values(row: Snapshot) -> Dict[str, Any]:
+    return {field: getattr(row, field) for field in CONTENT_FIELDS}
+
+def encode_delta(values: Dict[str, Any], next_values: Dict[str, Any]) -> bytes:
+    changed = {field: value for field, value in values.items() if next_values.get(field) != value}
+    return zlib.compress(json.dumps(changed, separators=(",", ":")).encode("utf-8"))
+
+def decode_delta(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+def store_delta(row: Snapshot, values: Dict[str, Any], next_values: Dict[str, Any]) -> None:
+    """
+    Rewrites `row` (holding `values`) as a delta against the version after it.
+    """
+    row.payload = encode_delta(values, next_values)
+    row.storage = "delta"
+    for field in CONTENT_FIELDS:
+        setattr(row, field, None)
+
+def store_full(row: Snapshot, values: Dict[str, Any]) -> None:
+    for field, value in values.items():
+        setattr(row, field, value)
+    row.storage = None
+    row.payload = None
+
+def rebuild(chain: Sequence[Snapshot]) -> Dict[int, Dict[str, Any]]:
+    """
+    Content of every version in `chain`: consecutive rows of one startup in
+    ascending version order, the last of which is stored in full.
+    """
+    rebuilt: Dict[int, Dict[str, Any]] = {}
+    values: Optional[Dict[str, Any]] = None
+    for row in reversed(chain):
+        if not is_delta(row):
+            values = row_values(row)
+        elif values is None:
+            raise ValueError(f"Snapshot v{row.version} of '{row.startup_id}' has no full version after it")
+        else:
+            values = {**values, **decode_delta(row.payload)}
+        rebuilt[row.version] = values
+    return rebuilt
+
+def encode_previous_versions(db: Session, rows: List[Snapshot]) -> None:
+    """
+    Turns the version before each newly added row into a delta against it.
+    `rows` are new, not yet committed rows; several may belong to one startup.
+    """
+    by_startup: Dict[str, List[Snapshot]] = {}
+    for row in rows:
+        by_startup.setdefault(row.startup_id, []).append(row)
+    for startup_id, new_rows in by_startup.items():
+        new_rows.sort(key=lambda r: r.version)
+        previous = db.query(Snapshot).filter(
+            Snapshot.startup_id == startup_id, Snapshot.version == new_rows[0].version - 1
+        ).first()
+        for row in new_rows:
+            if previous is not None and not is_delta(previous) and not is_keyframe(previous.version):
+                store_delta(previous, row_values(previous), row_values(row))
+            previous = row
+
+def _stored_bytes(row: Snapshot) -> int:
+    columns = sum(len(json.dumps(value)) for value in row_values(row).values() if value is not None)
+    return columns + len(row.payload or b"")
+
+def migrate_storage(db: Session, mode: str, keyframe_every: Optional[int] = None) -> Dict[str, int]:
+    """
+    Re-encodes every startup's history in `mode` ("delta" or "full"), one
+    transaction per startup. Safe to re-run and to interrupt.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown snapshot storage '{mode}', expected one of {STORAGE_MODES}")
+    stats = {"startups": 0, "rows": 0, "delta_rows": 0, "bytes_before": 0, "bytes_after": 0}
+    for (startup_id,) in db.query(Snapshot.startup_id).distinct().order_by(Snapshot.startup_id).all():
+        chain = db.query(Snapshot).filter(Snapshot.startup_id == startup_id).order_by(Snapshot.version).all()
+        if not chain:
+            continue
+        stats["bytes_before"] += sum(_stored_bytes(row) for row in chain)
+        values = rebuild(chain)
+        for row, next_row in zip(chain, chain[1:] + [None]):
+            if mode == "delta" and next_row is not None and not is_keyframe(row.version, keyframe_every):
+                store_delta(row, values[row.version], values[next_row.version])
+                stats["delta_rows"] += 1
+            else:
+                store_full(row, values[row.version])
+        stats["bytes_after"] += sum(_stored_bytes(row) for row in chain)
+        stats["startups"] += 1
+        stats["rows"] += len(chain)
+        db.commit()
+    return stats
@@ -0,0 +1,204 @@
+"""
+Load benchmark for POST /api/startups/{id}/analyze.
+
+Drives the real FastAPI app through the test client with the mock LLM backend
+(simulated latency, no network) and a throwaway SQLite database (or the one in
+DATABASE_URL), then reports
+throughput, p50/p95/p99 latency per concurrency level and a per-stage timing
+breakdown. Results are saved as JSON so runs can be compared across commits.
+
+    cd backend
+    python -m benchmarks.bench_analyze --concurrency 1,4,16 --requests 64 \\
+        --latency-ms 300 --jitter-ms 100 --output bench.json --compare baseline.json
+
+Use --mode plan to measure the fused single-call pipeline against the default chain.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# Must be set before the app (its LLM client and DB engine) is imported
+os.environ["FOUNDER_AGENT_MODE"] = "mock"
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP_DIR.name, 'bench.db')}")
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.db import DATABASE_URL
+from app.main import app
+from app.services.llm_client import llm_client
+from app.services.mock_llm import LatencyModel
+from app.services.pipeline import STAGE_OBSERVERS
+
+IDEAS = [
+    "Recruiters lose candidates to slow scheduling. We build a scheduling tool for HR managers at Series B tech companies. "
+    "We will reach them by cold email. We believe 20 teams will sign up within 4 weeks.",
+    "Small bakeries waste unsold bread every night. We build a marketplace app for bakery owners in Berlin to sell surplus at a discount. "
+    "We will list on existing food marketplace apps. We expect 50 orders per week within 6 weeks.",
+    "Indie game developers struggle to find playtesters. We build a community platform for solo developers on Discord. "
+    "We believe 100 developers will post builds within 2 weeks.",
+]
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+        "p99_ms": round(1000 * percentile(values, 99), 3),
+    }
+
+def run_level(client: TestClient, concurrency: int, total_requests: int, startups: int, run_id: str, mode: str) -> Dict:
+    stage_times: Dict[str, List[float]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def observe(stage: str, seconds: float):
+        with lock:
+            stage_times[stage].append(seconds)
+
+    latencies: List[float] = []
+    errors = 0
+
+    def one(i: int):
+        startup_id = f"bench-{run_id}-c{concurrency}-{i % startups}"
+        text = f"{IDEAS[i % len(IDEAS)]} Iteration {i // startups}."
+        start = time.perf_counter()
+        response = client.post(f"/api/startups/{startup_id}/analyze", json={"input_text": text, "mode": mode})
+        return time.perf_counter() - start, response.status_code
+
+    # Per-request LLM usage comes from the app's own request histograms
+    requests_before = metrics.REQUEST_TOKENS.count(endpoint="analyze")
+    tokens_before = metrics.REQUEST_TOKENS.sum(endpoint="analyze")
+    calls_before = metrics.REQUEST_LLM_CALLS.sum(endpoint="analyze")
+
+    STAGE_OBSERVERS.append(observe)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for elapsed, status in pool.map(one, range(total_requests)):
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+        wall = time.perf_counter() - start
+    finally:
+        STAGE_OBSERVERS.remove(observe)
+    handled = metrics.REQUEST_TOKENS.count(endpoint="analyze") - requests_before
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 3) if wall else 0.0,
+        "latency": summarize(latencies),
+        "llm_calls_per_request": round((metrics.REQUEST_LLM_CALLS.sum(endpoint="analyze") - calls_before) / handled, 3) if handled else 0.0,
+        "tokens_per_request": round((metrics.REQUEST_TOKENS.sum(endpoint="analyze") - tokens_before) / handled, 1) if handled else 0.0,
+        "stages": {stage: summarize(times) for stage, times in sorted(stage_times.items())},
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def print_report(results: Dict) -> None:
+    print(f"commit {results['commit']}  mode {results['config'].get('mode', 'chain')}  mock latency {results['config']['latency_ms']}ms "
+          f"±{results['config']['jitter_ms']}ms ({results['config']['distribution']})")
+    for level in results["levels"]:
+        lat = level["latency"]
+        print(f"\nconcurrency={level['concurrency']:<3} throughput={level['throughput_rps']:.2f} req/s "
+              f"p50={lat['p50_ms']:.1f}ms p95={lat['p95_ms']:.1f}ms p99={lat['p99_ms']:.1f}ms errors={level['errors']}\n"
+              f"    llm calls/request={level['llm_calls_per_request']:.2f} tokens/request={level['tokens_per_request']:.0f}")
+        for stage, s in level["stages"].items():
+            print(f"    {stage:<16} n={s['count']:<5} mean={s['mean_ms']:>9.1f}ms p50={s['p50_ms']:>9.1f}ms p95={s['p95_ms']:>9.1f}ms")
+
+def print_comparison(results: Dict, baseline: Dict) -> None:
+    base_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nvs baseline {baseline.get('commit', '?')}:")
+    for level in results["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = base["latency"][key], level["latency"][key]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  c={level['concurrency']:<3} {key:<7} {old:>9.1f} -> {new:>9.1f} ({change:+.1f}%)")
+        old, new = base["throughput_rps"], level["throughput_rps"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  c={level['concurrency']:<3} rps     {old:>9.2f} -> {new:>9.2f} ({change:+.1f}%)")
+        for key in ("llm_calls_per_request", "tokens_per_request"):
+            if key in base:
+                old, new = base[key], level[key]
+                change = (new - old) / old * 100 if old else 0.0
+                print(f"  c={level['concurrency']:<3} {key:<22} {old:>9.1f} -> {new:>9.1f} ({change:+.1f}%)")
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--startups", type=int, default=8, help="distinct startup ids per level (repeats exercise drift)")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--distribution", default="lognormal")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=("chain", "plan"), default="chain", help="analysis pipeline mode")
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    llm_client.latency = LatencyModel(args.latency_ms, args.jitter_ms, args.distribution, args.seed)
+
+    run_id = str(int(time.time()))
+    with TestClient(app) as client:
+        levels = [
+            run_level(client, int(c), args.requests, args.startups, run_id, args.mode)
+            for c in args.concurrency.split(",")
+        ]
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "requests": args.requests,
+            "startups": args.startups,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "distribution": args.distribution,
+            "seed": args.seed,
+            "mode": args.mode,
+            "database": DATABASE_URL.split("://")[0],
+        },
+        "levels": levels,
+    }
+
+    print_report(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""
+Hit-rate report for the local pre-validation rules: how many target-user,
+channel and hypothesis checks on a corpus of real snapshots the rules answer
+without an LLM call, and roughly how many prompt tokens that saves.
+
+The corpus is every startup's latest snapshot in DATABASE_URL (by default the
+checked-in founder_agent.db), or a JSONL file of snapshot objects such as the
+items of GET /api/startups/{id}/snapshots:
+
+    cd backend
+    python -m benchmarks.bench_prevalidation
+    python -m benchmarks.bench_prevalidation --all-versions --output prevalidation.json
+    python -m benchmarks.bench_prevalidation --jsonl snapshots.jsonl
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from typing import Dict, List
+
+from app.metrics import estimate_tokens
+from app.services import channel_enforcer, hypothesis_enforcer, user_validator
+from app.services.prevalidation import check_hypothesis
+
+STAGES = ("user", "channel", "hypothesis")
+
+def load_jsonl(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_db(all_versions: bool) -> List[dict]:
+    from sqlalchemy import func
+
+    from app.crud import snapshots_from_orm
+    from app.db import SessionLocal, init_db
+    from app.models import Snapshot
+
+    # Adds any columns introduced since the database was created, as the app does on startup
+    init_db()
+    db = SessionLocal()
+    try:
+        query = db.query(Snapshot)
+        if not all_versions:
+            latest = db.query(Snapshot.startup_id, func.max(Snapshot.version).label("version")).group_by(Snapshot.startup_id).subquery()
+            query = query.join(latest, (Snapshot.startup_id == latest.c.startup_id) & (Snapshot.version == latest.c.version))
+        return [s.dict() for s in snapshots_from_orm(db, query.order_by(Snapshot.startup_id, Snapshot.version).all())]
+    finally:
+        db.close()
+
+def evaluate(snapshots: List[dict]) -> Dict[str, dict]:
+    """
+    Per stage: inputs seen, local verdicts by kind, and prompt tokens the LLM
+    calls they replace would have sent.
+    """
+    report = {stage: {"inputs": 0, "local": 0, "kinds": Counter(), "prompt_tokens_saved": 0} for stage in STAGES}
+    for snapshot in snapshots:
+        target_user = snapshot.get("target_user") or ""
+        channel_text = snapshot.get("primary_channel_description") or ""
+        checks = {
+            "user": (user_validator._precheck(target_user), lambda: user_validator._build_prompt(target_user)),
+            "channel": (channel_enforcer._precheck(channel_text), lambda: channel_enforcer._build_prompt(channel_text)),
+            "hypothesis": (check_hypothesis(snapshot), lambda: hypothesis_enforcer._build_prompt(snapshot)),
+        }
+        for stage, (verdict, prompt) in checks.items():
+            row = report[stage]
+            row["inputs"] += 1
+            if verdict is None:
+                continue
+            row["local"] += 1
+            row["prompt_tokens_saved"] += estimate_tokens(prompt())
+            if stage == "user":
+                row["kinds"]["valid" if verdict["is_valid"] else "invalid"] += 1
+            elif stage == "channel":
+                row["kinds"][verdict["primary_channel_type"] or "no_channel"] += 1
+            else:
+                row["kinds"]["vanity_metric" if verdict["issues"] else "structured"] += 1
+    for row in report.values():
+        row["hit_rate"] = round(row["local"] / row["inputs"], 3) if row["inputs"] else 0.0
+        row["kinds"] = dict(row["kinds"])
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jsonl", help="snapshot objects, one per line (default: read DATABASE_URL)")
+    parser.add_argument("--all-versions", action="store_true", help="every stored version, not just the latest per startup")
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    snapshots = load_jsonl(args.jsonl) if args.jsonl else load_db(args.all_versions)
+    report = evaluate(snapshots)
+
+    print(f"{'stage':<12} {'inputs':>7} {'local':>7} {'hit_rate':>9} {'tokens_saved':>13}  verdicts")
+    for stage, row in report.items():
+        kinds = ", ".join(f"{k}={v}" for k, v in sorted(row["kinds"].items())) or "-"
+        print(f"{stage:<12} {row['inputs']:>7} {row['local']:>7} {row['hit_rate']:>9.1%} {row['prompt_tokens_saved']:>13}  {kinds}")
+    calls = sum(row["inputs"] for row in report.values())
+    saved = sum(row["local"] for row in report.values())
+    print(f"\n{saved}/{calls} validator LLM calls avoided ({saved / calls:.1%})" if calls else "\nno snapshots found")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"snapshots": len(snapshots), "stages": report}, f, indent=2)
+        print(f"results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app.
+
+Each module is imported in its own new Python process, several times, as an
+autoscaled worker or a test run would on boot. Reports the median and best
+wall-clock import time per module and which heavy provider SDKs the import
+pulled in (none should: LLM clients are built on first use). Results are saved
+as JSON so runs can be compared across commits.
+
+    cd backend
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 1500 --output startup.json
+
+--budget-ms makes the run fail (exit 1) when any module's median exceeds it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+DEFAULT_MODULES = "app.services.user_validator,app.services.pipeline,app.main"
+# Provider SDKs that must not be imported until an LLM call needs them
+HEAVY_MODULES = ("google.generativeai", "httpx")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _backend_dir() -> str:
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(module: str, runs: int, env: Dict[str, str]) -> Dict:
+    samples: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=_backend_dir(), env=env, capture_output=True, text=True, check=True,
+        )
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(probe["seconds"])
+        loaded = probe["loaded"]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(1000 * statistics.median(samples), 1),
+        "min_ms": round(1000 * min(samples), 1),
+        "heavy_modules_loaded": loaded,
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--mode", choices=("real", "mock"), default="real",
+                        help="FOUNDER_AGENT_MODE for the probes; real is what production workers import")
+    parser.add_argument("--budget-ms", type=float, help="fail if any module's median import time exceeds this")
+    parser.add_argument("--output", help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, FOUNDER_AGENT_MODE=args.mode)
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"runs": args.runs, "mode": args.mode, "budget_ms": args.budget_ms},
+        "modules": [measure(module, args.runs, env) for module in args.modules.split(",")],
+    }
+
+    print(f"{'module':<34} {'median_ms':>10} {'min_ms':>10}  heavy imports")
+    over_budget = []
+    for row in results["modules"]:
+        print(f"{row['module']:<34} {row['median_ms']:>10.1f} {row['min_ms']:>10.1f}  {', '.join(row['heavy_modules_loaded']) or '-'}")
+        if args.budget_ms is not None and row["median_ms"] > args.budget_ms:
+            over_budget.append(row["module"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if over_budget:
+        print(f"\nover the {args.budget_ms:.0f}ms import budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
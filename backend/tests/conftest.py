@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+# Tests never talk to Gemini: route every LLM call through the offline mock backend
+os.environ.setdefault("FOUNDER_AGENT_MODE", "mock")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+# Never touch the checked-in founder_agent.db
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+# A founder submission the mock backend turns into a complete, valid analysis
+IDEA = (
+    "Hiring managers waste hours scheduling interviews. "
+    "We build a scheduling tool for HR managers at Series B tech companies. "
+    "We will reach them by cold email on LinkedIn. "
+    "We believe 20 teams will sign up within 4 weeks."
+)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Session factory for a fresh SQLite database file.
+    """
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db import create_db_engine, init_db
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_db(engine)
+    try:
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+
+@pytest.fixture
+def api_client(session_factory):
+    """
+    TestClient for the app backed by the `session_factory` database.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.db import get_db
+    from app.main import app
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
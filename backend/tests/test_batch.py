@@ -0,0 +1,43 @@
+import json
+
+from app.cli import main as cli_main
+from conftest import IDEA
+
+def test_batch_endpoint_streams_one_result_per_item(api_client):
+    items = [
+        {"startup_id": "alpha", "input_text": IDEA},
+        {"startup_id": "beta", "input_text": IDEA.replace("HR managers", "recruiters")},
+        {"startup_id": "alpha", "input_text": IDEA.replace("cold email", "Discord community")},
+    ]
+    with api_client.stream("POST", "/api/startups/analyze-batch", json={"items": items, "max_workers": 2}) as response:
+        assert response.status_code == 200
+        results = sorted((json.loads(line) for line in response.iter_lines() if line), key=lambda r: r["index"])
+
+    assert [r["status"] for r in results] == ["ok", "ok", "ok"]
+    assert [r["result"]["snapshot"]["version"] for r in results] == [1, 1, 2]
+    # The second alpha item drifts against the first one from the same batch
+    assert any(d["field"] == "primary_channel_type" for d in results[2]["result"]["drift"])
+
+def test_batch_endpoint_rejects_non_positive_workers(api_client):
+    response = api_client.post("/api/startups/analyze-batch", json={"items": [], "max_workers": 0})
+    assert response.status_code == 422
+
+def test_cli_analyze_batch_writes_jsonl(tmp_path):
+    # Runs against the app's own (in-memory, see conftest) database
+    source = tmp_path / "items.jsonl"
+    source.write_text("\n".join(json.dumps({"startup_id": f"cli-{i}", "input_text": IDEA}) for i in range(3)))
+    output = tmp_path / "out.jsonl"
+
+    # A non-positive worker count still runs on one worker
+    assert cli_main(["analyze-batch", str(source), "-o", str(output), "-w", "-1"]) == 0
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["startup_id"] for r in lines) == ["cli-0", "cli-1", "cli-2"]
+
+def test_batch_repeated_text_reuses_the_previous_result(api_client):
+    items = [{"startup_id": "dup", "input_text": IDEA}, {"startup_id": "dup", "input_text": IDEA}]
+    with api_client.stream("POST", "/api/startups/analyze-batch", json={"items": items}) as response:
+        results = sorted((json.loads(line) for line in response.iter_lines() if line), key=lambda r: r["index"])
+
+    assert [r["status"] for r in results] == ["ok", "ok"]
+    assert results[1]["result"] == results[0]["result"]
+    assert [s["version"] for s in api_client.get("/api/startups/dup/snapshots").json()["items"]] == [1]
@@ -0,0 +1,106 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app import metrics
+from app.concurrency import ConcurrencyGate, KeyedLock, priority
+from app.crud import save_snapshot
+from app.db import create_db_engine, init_db
+from app.models import StartupSnapshot
+from sqlalchemy.orm import sessionmaker
+from conftest import IDEA
+
+def test_keyed_lock_serializes_same_key_only():
+    locks = KeyedLock()
+    events = []
+
+    async def work(key, name):
+        async with locks.hold(key):
+            events.append(f"start:{name}")
+            await asyncio.sleep(0.01)
+            events.append(f"end:{name}")
+
+    async def main():
+        await asyncio.gather(work("a", "a1"), work("a", "a2"), work("b", "b1"))
+
+    asyncio.run(main())
+    assert events.index("end:a1") < events.index("start:a2")
+    assert events.index("start:b1") < events.index("end:a1")
+    assert len(locks) == 0
+
+def test_save_snapshot_allocates_next_version_regardless_of_draft(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'v.db'}")
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        first = StartupSnapshot(startup_id="s", version=1)
+        stale = StartupSnapshot(startup_id="s", version=1)
+        save_snapshot(db, first)
+        save_snapshot(db, stale)
+        assert (first.version, stale.version) == (1, 2)
+    finally:
+        db.close()
+        engine.dispose()
+
+def test_concurrent_submissions_for_one_startup_get_distinct_versions(api_client):
+    with api_client as client:
+        def submit(i):
+            return client.post("/api/startups/race/analyze", json={"input_text": f"{IDEA} Take {i}."}).json()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(submit, range(4)))
+
+    assert sorted(r["snapshot"]["version"] for r in results) == [1, 2, 3, 4]
+
+def test_gate_admits_interactive_before_queued_batch_work():
+    gate = ConcurrencyGate(max_concurrency=1)
+    order = []
+
+    async def call(name, level):
+        with priority(level):
+            async with gate.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.ensure_future(call("first", "batch"))
+        await asyncio.sleep(0)
+        batch = [asyncio.ensure_future(call(f"batch{i}", "batch")) for i in range(3)]
+        await asyncio.sleep(0)
+        assert gate.queue_depth() == {"interactive": 0, "batch": 3}
+        interactive = asyncio.ensure_future(call("interactive", "interactive"))
+        await asyncio.gather(first, interactive, *batch)
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "batch0", "batch1", "batch2"]
+
+def test_gate_paces_requests_and_tokens_per_minute():
+    async def run(gate, tokens, n):
+        async def one():
+            async with gate.slot(tokens=tokens):
+                pass
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(one() for _ in range(n)))
+        return asyncio.get_running_loop().time() - start
+
+    waits = metrics.LLM_QUEUE_WAIT.count(priority="interactive")
+    # 600 rpm with a 0.1s burst: one call up front, then one every 0.1s
+    assert 0.18 <= asyncio.run(run(ConcurrencyGate(requests_per_minute=600, burst_seconds=0.1), 0, 3)) < 0.5
+    # 60k tpm with a 0.1s burst holds 100 tokens: the second 100-token call waits ~0.1s
+    assert 0.08 <= asyncio.run(run(ConcurrencyGate(tokens_per_minute=60000, burst_seconds=0.1), 100, 2)) < 0.4
+    assert metrics.LLM_QUEUE_WAIT.count(priority="interactive") == waits + 5
+
+def test_gate_cancelled_waiter_does_not_leak_its_place():
+    gate = ConcurrencyGate(max_concurrency=1)
+
+    async def main():
+        async with gate.slot():
+            waiter = asyncio.ensure_future(gate.slot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        # The cancelled waiter never held the slot, so it is free again
+        async with gate.slot():
+            pass
+        assert gate.queue_depth()["interactive"] == 0
+
+    asyncio.run(asyncio.wait_for(main(), 1.0))
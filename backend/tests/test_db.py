@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import create_db_engine, engine_options, init_db, normalize_url
+
+def test_file_sqlite_uses_wal_and_busy_timeout(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    engine.dispose()
+
+def test_init_db_adds_snapshot_index_to_existing_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    legacy = create_engine(url)
+    with legacy.begin() as conn:
+        conn.execute(text("CREATE TABLE startups (id VARCHAR PRIMARY KEY, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE snapshots (id INTEGER PRIMARY KEY, startup_id VARCHAR, version INTEGER NOT NULL)"))
+    legacy.dispose()
+
+    engine = create_db_engine(url)
+    init_db(engine)
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("snapshots")}
+    assert "uq_snapshots_startup_id_version" in indexes
+    engine.dispose()
+
+def test_init_db_adds_new_nullable_columns_to_existing_tables(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    legacy = create_engine(url)
+    with legacy.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE drift_records (id INTEGER PRIMARY KEY, snapshot_id INTEGER NOT NULL, startup_id VARCHAR NOT NULL, "
+            "version INTEGER NOT NULL, field VARCHAR NOT NULL, before TEXT, after TEXT, classification VARCHAR NOT NULL, comment TEXT)"
+        ))
+    legacy.dispose()
+
+    engine = create_db_engine(url)
+    init_db(engine)
+    assert "score" in {column["name"] for column in inspect(engine).get_columns("drift_records")}
+    engine.dispose()
+
+def test_postgres_urls_get_a_real_connection_pool():
+    assert normalize_url("postgres://u:p@db/app") == "postgresql://u:p@db/app"
+    options = engine_options("postgres://u:p@db/app")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] >= 1
+    assert "connect_args" not in options
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_schema_round_trips_on_postgres():
+    engine = create_db_engine(os.environ["TEST_POSTGRES_URL"])
+    init_db(engine)
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("snapshots")}
+    assert "uq_snapshots_startup_id_version" in indexes
+    engine.dispose()
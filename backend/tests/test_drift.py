@@ -0,0 +1,42 @@
+import asyncio
+
+from app.models import StartupSnapshot
+from app.services import llm_client as llm_client_module
+from app.services.drift_analyzer import analyze_drift, classify_locally
+
+def test_drift_batches_changed_fields_and_skips_trivial_rewordings(monkeypatch):
+    prompts = []
+
+    class FakeClient:
+        async def generate_json_async(self, prompt, schema=None):
+            prompts.append(prompt)
+            return {
+                "problem": {"classification": "major_change", "comment": "New problem."},
+                "solution": {"classification": "minor_refinement", "comment": "Clarified."},
+            }
+
+    # Drift calls go to whatever client the "drift" stage is routed to
+    monkeypatch.setitem(llm_client_module.STAGE_CLIENTS, "drift", FakeClient())
+
+    old = StartupSnapshot(startup_id="s1", version=1, target_user="HR managers at startups",
+                          problem="Hiring is slow", solution="An ATS")
+    new = StartupSnapshot(startup_id="s1", version=2, target_user="HR Managers, at startups!",
+                          problem="Payroll is error-prone", solution="An ATS with scheduling")
+
+    items = asyncio.run(analyze_drift(old, new))
+
+    assert len(prompts) == 1
+    assert [i.field for i in items] == ["target_user", "problem", "solution"]
+    assert [i.classification for i in items] == ["minor_refinement", "major_change", "minor_refinement"]
+
+def test_only_trivial_rewordings_are_classified_locally():
+    assert classify_locally("We sell to hospitals, not clinics", "We sell to clinics, not hospitals") is None
+    # One word can change the meaning of a long field
+    assert classify_locally("A scheduling tool for clinics with automated SMS reminders for patients",
+                            "A scheduling tool for clinics without automated SMS reminders for patients") is None
+    assert classify_locally("HR managers at Series B tech companies in the US",
+                            "HR managers at Series B tech companies outside the US") is None
+    assert classify_locally("HR managers at Series B tech companies in the US",
+                            "HR managers at Series B tech companies in the US and Canada") is None
+    assert classify_locally("HR managers at tech companies in the US",
+                            "HR Managers at tech companies in US.")["classification"] == "minor_refinement"
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import snapshot_storage
+from app.cli import main as cli_main
+from app.crud import get_snapshot, save_snapshot
+from app.export import iter_snapshot_chunks
+from app.models import StartupSnapshot
+from conftest import IDEA
+
+START = datetime(2026, 1, 1)
+
+def _save_history(db, startup_id, versions):
+    for v in range(1, versions + 1):
+        save_snapshot(db, StartupSnapshot(
+            startup_id=startup_id, version=v, timestamp=START + timedelta(days=v),
+            problem="Interview scheduling wastes hours", target_user=f"HR managers, take {v}",
+            hypothesis="20 teams sign up within 4 weeks", top_risks=["churn"] * v,
+        ))
+
+def test_chunks_rebuild_every_version_in_order(session_factory, monkeypatch):
+    monkeypatch.setattr(snapshot_storage, "SNAPSHOT_STORAGE", "delta")
+    monkeypatch.setattr(snapshot_storage, "SNAPSHOT_KEYFRAME_EVERY", 3)
+    db = session_factory()
+    try:
+        _save_history(db, "b", 5)
+        _save_history(db, "a", 4)
+
+        chunks = list(iter_snapshot_chunks(db, chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 2, 2, 1]
+        rows = [row for chunk in chunks for row in chunk]
+        assert [(r["startup_id"], r["version"]) for r in rows] == [("a", v) for v in range(1, 5)] + [("b", v) for v in range(1, 6)]
+        for row in rows:
+            assert row == get_snapshot(db, row["startup_id"], row["version"]).dict()
+
+        # Filters and projection, still rebuilding the delta rows they hit
+        rows = [r for chunk in iter_snapshot_chunks(db, ["target_user", "top_risks"], ["b"], since=START + timedelta(days=2),
+                                                     until=START + timedelta(days=4), chunk_size=1) for r in chunk]
+        assert rows == [
+            {"startup_id": "b", "version": v, "timestamp": START + timedelta(days=v), "target_user": f"HR managers, take {v}", "top_risks": ["churn"] * v}
+            for v in (2, 3)
+        ]
+    finally:
+        db.close()
+
+def test_export_endpoint_streams_ndjson_and_csv(api_client):
+    api_client.post("/api/startups/one/analyze", json={"input_text": IDEA})
+    api_client.post("/api/startups/one/analyze", json={"input_text": IDEA.replace("cold email", "Discord")})
+    api_client.post("/api/startups/two/analyze", json={"input_text": IDEA})
+
+    response = api_client.get("/api/export")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["startup_id"], r["version"]) for r in rows] == [("one", 1), ("one", 2), ("two", 1)]
+    assert rows[1] == api_client.get("/api/startups/one/snapshots/2").json()
+
+    response = api_client.get("/api/export", params={"format": "csv", "startup_id": "one", "fields": "primary_channel_description,top_risks"})
+    table = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(table[0]) == ["startup_id", "version", "timestamp", "primary_channel_description", "top_risks"]
+    assert [r["version"] for r in table] == ["1", "2"] and "Discord" in table[1]["primary_channel_description"]
+    assert json.loads(table[0]["top_risks"]) == rows[0]["top_risks"]
+
+    assert api_client.get("/api/export", params={"format": "csv", "startup_id": "nobody"}).text.startswith("startup_id,version")
+    assert api_client.get("/api/export", params={"fields": "nope"}).status_code == 400
+    assert api_client.get("/api/export", params={"format": "parquet"}).status_code == 400
+
+def test_cli_export(tmp_path):
+    # Runs against the app's own (in-memory, see conftest) database
+    output = tmp_path / "snapshots.ndjson"
+    assert cli_main(["export", "-o", str(output), "--fields", "problem", "--since", "2026-01-01"]) == 0
+    assert all(set(json.loads(line)) == {"startup_id", "version", "timestamp", "problem"} for line in output.read_text().splitlines())
+    assert cli_main(["export", "--fields", "nope"]) == 2
+    assert cli_main(["export", "--format", "parquet"]) == 2
+
+def test_parquet_export_round_trips(session_factory, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.export import write_columnar
+    db = session_factory()
+    try:
+        _save_history(db, "a", 3)
+        path = str(tmp_path / "snapshots.parquet")
+        assert write_columnar(iter_snapshot_chunks(db, ["target_user", "top_risks"], chunk_size=2), path, "parquet", ["target_user", "top_risks"]) == 3
+        table = pq.read_table(path).to_pylist()
+        assert [(r["version"], r["target_user"], r["top_risks"]) for r in table] == [(v, f"HR managers, take {v}", ["churn"] * v) for v in (1, 2, 3)]
+    finally:
+        db.close()
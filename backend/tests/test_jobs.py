@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.crud import claim_job, create_job, get_job
+from app.services.jobs import run_worker
+from conftest import IDEA
+
+def _drain(session_factory):
+    asyncio.run(run_worker(session_factory, concurrency=4, poll_interval=0.01, exit_when_idle=True))
+
+def test_async_analyze_returns_a_job_that_workers_complete(api_client, session_factory):
+    response = api_client.post("/api/startups/queued/analyze", params={"async": "true"}, json={"input_text": IDEA})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued" and job["result"] is None
+    assert response.headers["Location"] == f"/api/jobs/{job['id']}"
+
+    _drain(session_factory)
+
+    done = api_client.get(f"/api/jobs/{job['id']}").json()
+    assert done["status"] == "succeeded" and done["attempts"] == 1
+    assert done["result"] == api_client.get("/api/startups/queued/reports/1").json()
+    assert api_client.get("/api/jobs/999").status_code == 404
+
+    # The OpenAPI schema documents both outcomes of /analyze
+    responses = api_client.get("/openapi.json").json()["paths"]["/api/startups/{startup_id}/analyze"]["post"]["responses"]
+    assert responses["202"]["content"]["application/json"]["schema"]["$ref"].endswith("/JobStatus")
+    assert responses["200"]["content"]["application/json"]["schema"]["$ref"].endswith("/AnalysisResponse")
+
+def test_jobs_for_one_startup_run_in_submission_order(api_client, session_factory):
+    texts = [IDEA, IDEA.replace("cold email", "Discord community")]
+    ids = [api_client.post("/api/startups/ordered/analyze?async=true", json={"input_text": t}).json()["id"] for t in texts]
+
+    _drain(session_factory)
+
+    first, second = (api_client.get(f"/api/jobs/{i}").json()["result"] for i in ids)
+    assert [first["snapshot"]["version"], second["snapshot"]["version"]] == [1, 2]
+    assert any(d["field"] == "primary_channel_type" for d in second["drift"])
+
+def test_claims_skip_startups_with_a_running_job(session_factory):
+    db = session_factory()
+    try:
+        a1, a2, b1 = (create_job(db, sid, IDEA).id for sid in ("a", "a", "b"))
+        assert claim_job(db, "w1", 60).id == a1
+        assert claim_job(db, "w2", 60).id == b1
+        # a2 waits until a1 is done
+        assert claim_job(db, "w3", 60) is None
+        assert get_job(db, a2).status == "queued"
+    finally:
+        db.close()
+
+def test_job_of_a_dead_worker_is_resumed_after_its_lease_expires(session_factory):
+    db = session_factory()
+    try:
+        job_id = create_job(db, "orphan", IDEA).id
+        job = claim_job(db, "crashed-worker", 60)
+        # The worker died mid-job: nobody renews the lease
+        job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+
+    _drain(session_factory)
+
+    db = session_factory()
+    try:
+        job = get_job(db, job_id)
+        assert job.status == "succeeded" and job.attempts == 2 and job.version == 1
+    finally:
+        db.close()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+from app.services import llm_client as llm_client_module
+from app.services.llm_backends import LLMBackend, OpenAICompatibleBackend, ProviderHTTPError
+from app.services.llm_client import LLMClient, client_for
+from app.services.llm_client import MockLLMClient
+from app.services.resilience import ResiliencePolicy, RetryPolicy
+
+def _completion(content: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+def _backend(handler, **kwargs) -> OpenAICompatibleBackend:
+    return OpenAICompatibleBackend("local-8b", base_url="http://llm.local/v1", api_key="k", **kwargs,
+                                   async_transport=httpx.MockTransport(handler))
+
+def test_backend_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        LLMBackend("x")
+
+def test_openai_backend_sends_chat_completion_with_json_mode():
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append((request.url.path, request.headers["authorization"], json.loads(request.content)))
+        return httpx.Response(200, json=_completion('{"ok": true}'))
+
+    client = LLMClient(backend=_backend(handler))
+    assert asyncio.run(client.generate_json_async("prompt")) == {"ok": True}
+
+    path, auth, payload = seen[0]
+    assert path == "/v1/chat/completions" and auth == "Bearer k"
+    assert payload["model"] == "local-8b"
+    assert payload["messages"][0]["role"] == "user" and payload["messages"][0]["content"].startswith("prompt")
+    assert payload["response_format"] == {"type": "json_object"}
+    assert client.model_name == "local-8b"
+
+def test_openai_backend_json_mode_can_be_disabled():
+    payloads = []
+
+    def handler(request):
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json=_completion("{}"))
+
+    asyncio.run(_backend(handler, json_mode=False).generate_async("p", {"response_mime_type": "application/json"}))
+    assert "response_format" not in payloads[0]
+
+@pytest.mark.parametrize("status", [400, 429, 503])
+def test_openai_backend_maps_http_errors_to_status_codes(status):
+    backend = _backend(lambda request: httpx.Response(status, text="nope"))
+    with pytest.raises(ProviderHTTPError) as error:
+        asyncio.run(backend.generate_async("p"))
+    assert error.value.code == status
+
+def test_openai_backend_maps_timeouts_and_transport_errors():
+    def timeout(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    def refused(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(_backend(timeout).generate_async("p"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(_backend(refused).generate_async("p"))
+
+def test_openai_backend_closes_each_loops_connection_pool():
+    backend = _backend(lambda request: httpx.Response(200, json=_completion("{}")))
+    asyncio.run(backend.generate_async("p"))
+    first = backend._async_client
+    asyncio.run(backend.generate_async("p"))
+
+    # Closed when its loop shut down; the second loop got its own
+    assert first.is_closed and backend._async_client is not first
+
+def test_transient_http_errors_are_retried_through_the_client():
+    responses = [httpx.Response(503, text="busy"), httpx.Response(200, json=_completion('{"ok": 1}'))]
+    client = LLMClient(backend=_backend(lambda request: responses.pop(0)),
+                       resilience=ResiliencePolicy(retry=RetryPolicy(max_attempts=2, base_delay=0.001)))
+    assert asyncio.run(client.generate_json_async("p")) == {"ok": 1}
+    assert responses == []
+
+def test_stage_overrides_build_one_client_per_backend_spec():
+    clients = llm_client_module._build_stage_clients({
+        "LLM_STAGE_DRIFT": "openai:local-8b",
+        "LLM_STAGE_USER": "openai:local-8b",
+        "LLM_STAGE_EXTRACT": "mock",
+    })
+    assert set(clients) == {"drift", "user", "extract"}
+    assert clients["drift"] is clients["user"]
+    assert clients["drift"].model_name == "local-8b"
+    assert isinstance(clients["extract"], MockLLMClient)
+
+    # Mock mode stays offline whatever overrides are set
+    assert llm_client_module._build_stage_clients({"FOUNDER_AGENT_MODE": "mock", "LLM_STAGE_DRIFT": "openai"}) == {}
+    with pytest.raises(ValueError):
+        llm_client_module._build_stage_clients({"LLM_STAGE_DRIFT": "anthropic"})
+
+def test_clients_of_one_provider_share_its_gate_and_breaker(monkeypatch):
+    clients = llm_client_module._build_stage_clients({"LLM_STAGE_DRIFT": "openai:local-8b", "LLM_STAGE_USER": "openai:local-70b"})
+    assert clients["drift"] is not clients["user"]
+    assert clients["drift"].gate is clients["user"].gate
+    assert clients["drift"].resilience.breaker is clients["user"].resilience.breaker
+
+    # Another endpoint is another provider, with its own quota
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:8080/v1")
+    local = llm_client_module.build_client("openai:local-8b")
+    assert local.gate is not clients["drift"].gate
+
+def test_services_call_the_client_routed_to_their_stage(monkeypatch):
+    from app.services.user_validator import validate_target_user
+
+    models = []
+
+    def handler(request):
+        models.append(json.loads(request.content)["model"])
+        return httpx.Response(200, json=_completion('{"is_valid": true, "reason": "ok", "improved_target_user": null}'))
+
+    monkeypatch.setitem(llm_client_module.STAGE_CLIENTS, "user", LLMClient(backend=_backend(handler)))
+    assert client_for("user").model_name == "local-8b"
+    assert client_for("experiments") is llm_client_module.llm_client
+
+    result = asyncio.run(validate_target_user("HR managers at Series B tech companies"))
+    assert result["is_valid"] is True
+    assert models == ["local-8b"]
+
+def test_importing_services_builds_no_client_and_loads_no_sdk():
+    code = (
+        "import sys\n"
+        "import app.main, app.services.user_validator\n"
+        "from app.services import llm_client\n"
+        "assert llm_client._default_client is None\n"
+        "assert 'google.generativeai' not in sys.modules and 'httpx' not in sys.modules\n"
+    )
+    env = dict(os.environ, FOUNDER_AGENT_MODE="real", LLM_BACKEND="gemini")
+    subprocess.run([sys.executable, "-c", code], check=True, env=env,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
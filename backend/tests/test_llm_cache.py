@@ -0,0 +1,68 @@
+import asyncio
+import time
+from app.services.llm_cache import LLMCache, MemoryCache, SQLiteCache, make_cache_key
+from app.services.llm_client import LLMClient
+
+def test_cache_key_depends_on_model_prompt_and_config():
+    key = make_cache_key("m", "p", {"a": 1})
+    assert key == make_cache_key("m", "p", {"a": 1})
+    assert key != make_cache_key("m2", "p", {"a": 1})
+    assert key != make_cache_key("m", "p2", {"a": 1})
+    assert key != make_cache_key("m", "p", {"a": 2})
+
+def test_memory_tier_evicts_least_recently_used_and_expires():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    expiring = MemoryCache(ttl_seconds=0.01)
+    expiring.set("a", "1")
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+def test_sqlite_tier_hits_are_promoted_and_counted(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+    disk.set("a", "1")
+    cache = LLMCache([MemoryCache(), disk])
+
+    assert cache.get("a") == "1"
+    assert cache.get("a") == "1"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == {"memory": 1, "sqlite": 1}
+    assert cache.stats()["misses"] == 1
+
+    disk.set("b", "2")
+    disk.set("c", "3")
+    assert len(disk) == 2
+
+def test_async_lookups_match_sync_tier_accounting(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    cache = LLMCache([MemoryCache(), disk])
+    asyncio.run(cache.set_async("a", "1"))
+
+    assert disk.get("a") == "1"
+    cache.tiers[0].clear()
+    assert asyncio.run(cache.get_async("a")) == "1"
+    assert asyncio.run(cache.get_async("a")) == "1"
+    assert asyncio.run(cache.get_async("missing")) is None
+    assert cache.stats()["hits"] == {"memory": 1, "sqlite": 1}
+    assert cache.stats()["misses"] == 1
+
+def test_llm_client_serves_identical_prompts_from_cache():
+    class FakeModel:
+        calls = 0
+
+        async def generate_content_async(self, prompt, generation_config=None):
+            FakeModel.calls += 1
+            return type("Response", (), {"text": '{"ok": true}'})()
+
+    client = LLMClient(cache=LLMCache([MemoryCache()]))
+    client.backend.model = FakeModel()
+
+    assert asyncio.run(client.generate_json_async("same prompt")) == {"ok": True}
+    assert asyncio.run(client.generate_json_async("same prompt")) == {"ok": True}
+    assert FakeModel.calls == 1
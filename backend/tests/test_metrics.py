@@ -0,0 +1,21 @@
+from app import metrics
+from conftest import IDEA
+
+def test_histogram_renders_prometheus_buckets():
+    hist = metrics.Histogram("demo_seconds", "Demo.", ["stage"], buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    lines = hist.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 2' in lines
+    assert 'demo_seconds_count{stage="a"} 2' in lines
+
+def test_metrics_endpoint_reports_stage_timings_and_llm_calls(api_client):
+    calls_before = metrics.LLM_CALLS.value(stage="extract", model="mock")
+    assert api_client.post("/api/startups/metrics-co/analyze", json={"input_text": IDEA}).status_code == 200
+
+    response = api_client.get("/metrics")
+    assert response.status_code == 200
+    assert 'founder_agent_stage_duration_seconds_count{stage="extract"}' in response.text
+    assert 'founder_agent_requests_total{endpoint="analyze",outcome="ok"}' in response.text
+    assert metrics.LLM_CALLS.value(stage="extract", model="mock") == calls_before + 1
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.models import AnalysisResponse
+from app.services.llm_client import MockLLMClient, llm_client
+from app.services.mock_llm import LatencyModel
+from conftest import IDEA
+
+def test_mock_mode_is_selected_from_env():
+    assert isinstance(llm_client, MockLLMClient)
+
+def test_mock_module_imports_on_its_own():
+    # mock_llm must not depend on llm_client, or importing it first is a cycle
+    code = "import app.services.mock_llm; import app.services.llm_client"
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_mock_responses_are_deterministic():
+    client = MockLLMClient()
+    prompt = 'Analyze this distribution strategy: "cold email to CTOs"\n'
+    first = asyncio.run(client.generate_json_async(prompt))
+    assert first == asyncio.run(client.generate_json_async(prompt))
+    assert first["primary_channel_type"] == "cold_outreach"
+
+def test_latency_model_distributions_are_non_negative():
+    for dist in ("constant", "uniform", "normal", "lognormal", "exponential"):
+        model = LatencyModel(mean_ms=5, jitter_ms=10, distribution=dist, seed=1)
+        assert all(model.sample_seconds() >= 0 for _ in range(50))
+
+def test_analyze_pipeline_runs_end_to_end_offline(api_client):
+    first = api_client.post("/api/startups/acme/analyze", json={"input_text": IDEA})
+    assert first.status_code == 200
+    body = AnalysisResponse(**first.json())
+    assert body.snapshot.version == 1
+    assert body.drift == []
+
+    second = api_client.post("/api/startups/acme/analyze", json={"input_text": IDEA + " Next we will run a pilot."})
+    assert second.status_code == 200
+    assert second.json()["snapshot"]["version"] == 2
+
+def test_streaming_analyze_emits_partial_results_then_complete(api_client):
+    import json
+
+    api_client.post("/api/startups/streamco/analyze", json={"input_text": IDEA})
+    with api_client.stream("POST", "/api/startups/streamco/analyze/stream",
+                           json={"input_text": IDEA.replace("HR managers", "recruiters")}) as response:
+        assert response.status_code == 200
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    names = [e["event"] for e in events]
+    assert names[0] == "snapshot"
+    assert names[-1] == "complete"
+    assert names.count("dimension_review") == 3
+    assert "drift" in names
+    assert "experiments" in names
+    assert events[-1]["data"]["snapshot"]["version"] == 2
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from app.services.pipeline import run_stages
+
+def test_run_stages_respects_dependencies_and_runs_independent_stages_concurrently():
+    order = []
+
+    def stage(name, delay, value):
+        async def fn(deps):
+            order.append(f"start:{name}")
+            await asyncio.sleep(delay)
+            order.append(f"end:{name}")
+            return value + sum(deps.values())
+        return fn
+
+    results = asyncio.run(run_stages({
+        "a": ((), stage("a", 0, 1)),
+        "b": (("a",), stage("b", 0.02, 10)),
+        "c": (("a",), stage("c", 0.01, 100)),
+        "d": (("b", "c"), stage("d", 0, 1000)),
+    }))
+
+    assert results == {"a": 1, "b": 11, "c": 101, "d": 1112}
+    # b and c both start before either finishes; d waits for both
+    assert order.index("start:c") < order.index("end:b")
+    assert order.index("start:d") > max(order.index("end:b"), order.index("end:c"))
+
+def test_run_stages_rejects_unknown_dependency():
+    async def noop(deps):
+        return None
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_stages({"a": (("missing",), noop)}))
+
+def test_stage_timer_reports_to_observers():
+    from app.services.pipeline import STAGE_OBSERVERS, stage_timer
+
+    seen = []
+    STAGE_OBSERVERS.append(lambda name, seconds: seen.append((name, seconds)))
+    try:
+        with stage_timer("db_write"):
+            pass
+    finally:
+        STAGE_OBSERVERS.pop()
+
+    assert [name for name, _ in seen] == ["db_write"]
+    assert seen[0][1] >= 0
+
+def test_plan_mode_replaces_extraction_and_validators_with_one_call(monkeypatch):
+    from app.services import prevalidation
+    from app.services.llm_client import llm_client
+    from app.services.pipeline import run_analysis
+    from conftest import IDEA
+
+    # Compare the LLM paths: local rules would answer some chain validators without a call
+    monkeypatch.setattr(prevalidation, "PREVALIDATION_ENABLED", False)
+    calls = llm_client.calls
+    chain = asyncio.run(run_analysis("plan-a", IDEA, None, mode="chain"))
+    chain_calls, calls = llm_client.calls - calls, llm_client.calls
+    plan = asyncio.run(run_analysis("plan-a", IDEA, None, mode="plan"))
+    plan_calls = llm_client.calls - calls
+
+    # extract + user + channel + hypothesis collapse into one call; experiments are unchanged
+    assert plan_calls == chain_calls - 3
+    assert plan.snapshot.target_user == chain.snapshot.target_user
+    assert plan.snapshot.primary_channel_type == chain.snapshot.primary_channel_type
+    assert [r.dimension for r in plan.dimension_reviews] == [r.dimension for r in chain.dimension_reviews]
+
+def test_plan_mode_flags_vanity_metrics():
+    import random
+    from app.services.analysis_plan import _parse_plan
+    from app.services.mock_llm import mock_plan
+    from conftest import IDEA
+
+    data = mock_plan(f'Input Text:\n    "{IDEA}"', random.Random(0))
+    data["snapshot"]["hypothesis"] = "Creators will love it"
+    data["hypothesis"] = {"hypothesis": "We expect more Instagram followers", "metric": "Instagram followers",
+                          "timeframe": "2 months", "issues": []}
+    _, _, _, hypothesis = _parse_plan(data, "vanity", IDEA, 0)
+    assert "vanity metric" in hypothesis["issues"][0]
+
+def test_injected_client_serves_every_stage():
+    from app.services.llm_client import MockLLMClient, llm_client
+    from app.services.pipeline import run_analysis
+    from conftest import IDEA
+
+    injected = MockLLMClient()
+    calls = llm_client.calls
+    result = asyncio.run(run_analysis("injected", IDEA, None, mode="chain", client=injected))
+
+    assert result.snapshot.version == 1
+    assert injected.calls > 0
+    assert llm_client.calls == calls
+
+def test_plan_mode_falls_back_to_chain_on_schema_failure(monkeypatch):
+    from app import metrics
+    from app.services import mock_llm
+    from app.services.pipeline import run_analysis
+    from conftest import IDEA
+
+    # Wrong shape: the channel verdict is not an object
+    routes = [(marker, (lambda prompt, rng: {"snapshot": {}, "user_validation": {}, "channel": "x", "hypothesis": {}})
+               if marker == "single analysis plan" else fn) for marker, fn in mock_llm.MOCK_ROUTES]
+    monkeypatch.setattr(mock_llm, "MOCK_ROUTES", routes)
+    fallbacks = metrics.PLAN_FALLBACKS.value()
+
+    result = asyncio.run(run_analysis("plan-b", IDEA, None, mode="plan"))
+    assert metrics.PLAN_FALLBACKS.value() == fallbacks + 1
+    assert result.snapshot.target_user
+    assert len(result.dimension_reviews) == 3
@@ -0,0 +1,49 @@
+from conftest import IDEA
+
+VARIANTS = [
+    IDEA,
+    IDEA.replace("cold email", "Discord community"),
+    IDEA.replace("HR managers", "solo recruiters"),
+]
+
+def _submit_all(api_client, startup_id):
+    for text in VARIANTS:
+        assert api_client.post(f"/api/startups/{startup_id}/analyze", json={"input_text": text}).status_code == 200
+
+def test_snapshot_list_is_projected_and_keyset_paginated(api_client):
+    _submit_all(api_client, "reader")
+
+    first = api_client.get("/api/startups/reader/snapshots", params={"fields": "target_user", "limit": 2}).json()
+    assert [item["version"] for item in first["items"]] == [3, 2]
+    assert set(first["items"][0]) == {"startup_id", "version", "timestamp", "target_user"}
+    assert first["next_cursor"] == 2
+
+    second = api_client.get("/api/startups/reader/snapshots", params={"limit": 2, "before": first["next_cursor"]}).json()
+    assert [item["version"] for item in second["items"]] == [1]
+    assert second["next_cursor"] is None
+    assert "hypothesis" in second["items"][0]
+
+def test_snapshot_reads_reject_unknown_fields_and_missing_rows(api_client):
+    _submit_all(api_client, "reader")
+    assert api_client.get("/api/startups/reader/snapshots", params={"fields": "secret"}).status_code == 400
+    assert api_client.get("/api/startups/nobody/snapshots").status_code == 404
+    assert api_client.get("/api/startups/reader/snapshots/9").status_code == 404
+
+    snapshot = api_client.get("/api/startups/reader/snapshots/2").json()
+    assert snapshot["version"] == 2
+    assert "Discord" in snapshot["primary_channel_description"]
+
+def test_drift_timeline_is_read_from_saved_records(api_client):
+    responses = [
+        api_client.post("/api/startups/timeline/analyze", json={"input_text": text}).json()
+        for text in VARIANTS
+    ]
+
+    timeline = api_client.get("/api/startups/timeline/drift").json()
+    assert [entry["version"] for entry in timeline["items"]] == [2, 3]
+    for entry, response in zip(timeline["items"], responses[1:]):
+        assert entry["drift"] == response["drift"]
+
+    page = api_client.get("/api/startups/timeline/drift", params={"limit": 1}).json()
+    assert [entry["version"] for entry in page["items"]] == [2]
+    assert page["next_cursor"] == 2
@@ -0,0 +1,42 @@
+import json
+
+from app import metrics
+from app.services.llm_client import llm_client
+from conftest import IDEA
+
+def test_identical_resubmission_returns_stored_report(api_client):
+    first = api_client.post("/api/startups/repeat/analyze", json={"input_text": IDEA}).json()
+    calls = llm_client.calls
+    reused = metrics.ANALYSIS_REUSED.value(endpoint="analyze")
+
+    # Whitespace/case-only changes normalize to the same input
+    again = api_client.post("/api/startups/repeat/analyze", json={"input_text": "  " + IDEA.upper() + "\n"}).json()
+    assert again == first
+    assert llm_client.calls == calls
+    assert metrics.ANALYSIS_REUSED.value(endpoint="analyze") == reused + 1
+    assert [s["version"] for s in api_client.get("/api/startups/repeat/snapshots").json()["items"]] == [1]
+
+    # Different text runs the pipeline and writes the next version
+    changed = api_client.post("/api/startups/repeat/analyze", json={"input_text": IDEA.replace("cold email", "Discord")}).json()
+    assert changed["snapshot"]["version"] == 2
+    assert llm_client.calls > calls
+
+def test_stream_serves_stored_report_as_complete_event(api_client):
+    first = api_client.post("/api/startups/repeat-stream/analyze", json={"input_text": IDEA}).json()
+    with api_client.stream("POST", "/api/startups/repeat-stream/analyze/stream", json={"input_text": IDEA}) as response:
+        events = [json.loads(line) for line in response.iter_lines() if line]
+    assert [e["event"] for e in events] == ["complete"]
+    assert events[0]["data"] == first
+
+def test_past_reports_are_listed_newest_first(api_client):
+    texts = [IDEA, IDEA.replace("cold email", "Discord"), IDEA.replace("HR managers", "recruiters")]
+    responses = [api_client.post("/api/startups/history/analyze", json={"input_text": t}).json() for t in texts]
+
+    page = api_client.get("/api/startups/history/reports", params={"limit": 2}).json()
+    assert page["items"] == responses[::-1][:2]
+    assert page["next_cursor"] == 2
+    rest = api_client.get("/api/startups/history/reports", params={"before": 2}).json()
+    assert rest["items"] == responses[:1] and rest["next_cursor"] is None
+
+    assert api_client.get("/api/startups/history/reports/2").json() == responses[1]
+    assert api_client.get("/api/startups/history/reports/7").status_code == 404
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from app import metrics
+from app.services.llm_client import MockLLMClient, llm_client
+from app.services.mock_llm import MockProviderError
+from app.services.resilience import CircuitBreaker, CircuitOpenError, LLMUnavailableError, ResiliencePolicy, RetryPolicy
+
+PROMPT = "Evaluate the concreteness of this target user definition: \"HR managers at Series B tech companies\"\n"
+
+class ScriptedClient(MockLLMClient):
+    """
+    Plays back `script` one entry per provider call: an exception to raise,
+    a string to return verbatim, a float to sleep before answering, or None for a normal answer.
+    """
+
+    def __init__(self, script, **kwargs):
+        super().__init__(**kwargs)
+        self.script = list(script)
+
+    async def _generate_async(self, prompt, generation_config=None):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else None
+        if isinstance(step, BaseException):
+            raise step
+        if isinstance(step, str):
+            return step
+        if isinstance(step, float):
+            await asyncio.sleep(step)
+        return self.respond(prompt)
+
+def _policy(**kwargs):
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001))
+    return ResiliencePolicy(**kwargs)
+
+def test_transient_errors_and_invalid_json_are_retried():
+    client = ScriptedClient([MockProviderError("overloaded"), "not json"], resilience=_policy())
+    retries = metrics.LLM_RETRIES.value(stage="other", model="mock")
+
+    result = asyncio.run(client.generate_json_async(PROMPT))
+    assert result["is_valid"] is True
+    assert client.calls == 3
+    assert metrics.LLM_RETRIES.value(stage="other", model="mock") == retries + 2
+
+def test_non_transient_errors_are_not_retried_and_exhaustion_is_unavailable():
+    client = ScriptedClient([ValueError("bad request")], resilience=_policy())
+    with pytest.raises(ValueError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    assert client.calls == 1
+
+    client = ScriptedClient([MockProviderError("down")] * 3, resilience=_policy())
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    assert client.calls == 3
+
+def test_deadline_turns_a_hung_call_into_a_retry():
+    client = ScriptedClient([5.0], resilience=_policy(timeout=0.05))
+    start = time.perf_counter()
+    assert asyncio.run(client.generate_json_async(PROMPT))["is_valid"] is True
+    assert time.perf_counter() - start < 1.0
+    assert client.calls == 2
+
+def test_circuit_breaker_fails_fast_then_recovers_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = ScriptedClient([MockProviderError("down")] * 2, resilience=_policy(breaker=breaker))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    assert client.calls == 2 and breaker.state == "open"
+
+    # Open: rejected without touching the provider
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    assert client.calls == 2
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert asyncio.run(client.generate_json_async(PROMPT))["is_valid"] is True
+    assert breaker.state == "closed"
+
+def test_non_transient_error_during_trial_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    client = ScriptedClient([MockProviderError("down"), ValueError("bad request")], resilience=_policy(breaker=breaker))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    time.sleep(0.15)
+    # The trial fails without recording anything; the next call must still get through
+    with pytest.raises(ValueError):
+        asyncio.run(client.generate_json_async(PROMPT))
+    assert asyncio.run(client.generate_json_async(PROMPT))["is_valid"] is True
+    assert breaker.state == "closed"
+
+def test_hedged_request_keeps_the_first_response():
+    client = ScriptedClient([2.0, None], resilience=_policy(hedge=True, hedge_delay=0.02))
+    hedges = metrics.LLM_HEDGES.value(stage="other", model="mock")
+
+    start = time.perf_counter()
+    assert asyncio.run(client.generate_json_async(PROMPT))["is_valid"] is True
+    assert time.perf_counter() - start < 1.0
+    assert client.calls == 2
+    assert metrics.LLM_HEDGES.value(stage="other", model="mock") == hedges + 1
+
+def test_unavailable_provider_maps_to_503(api_client, monkeypatch):
+    from conftest import IDEA
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(llm_client, "resilience", ResiliencePolicy(breaker=breaker))
+
+    response = api_client.post("/api/startups/down/analyze", json={"input_text": IDEA})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
@@ -0,0 +1,64 @@
+import time
+
+from app.crud import save_snapshot
+from app.models import StartupSnapshot
+from app.services.similarity import SimilarityIndex, drift_score, similarity
+from conftest import IDEA
+
+def _snapshot(startup_id, version, problem, target_user, solution):
+    return StartupSnapshot(startup_id=startup_id, version=version, problem=problem, target_user=target_user, solution=solution)
+
+def test_rewording_scores_closer_than_a_pivot():
+    old = "HR managers at Series B tech companies"
+    assert similarity(old, old) > 0.99
+    assert drift_score(old, "HR managers at Series B software companies") < drift_score(old, "Dentists in rural clinics")
+    assert drift_score(old, None) is None
+
+def test_index_finds_near_duplicates_and_follows_new_versions(session_factory):
+    db = session_factory()
+    try:
+        save_snapshot(db, _snapshot("a", 1, "Interview scheduling wastes hours", "HR managers at tech companies", "A scheduling tool"))
+        save_snapshot(db, _snapshot("b", 1, "Scheduling interviews wastes hours", "HR managers at tech startups", "An interview scheduling tool"))
+        save_snapshot(db, _snapshot("c", 1, "Dog owners cannot find walkers", "Busy pet owners", "A dog walking marketplace"))
+        index = SimilarityIndex()
+        assert index.sync(db) == 3
+
+        assert [s.startup_id for s in index.similar("a")][:2] == ["b", "c"]
+        assert index.similar("a")[0].score > 0.5 > index.similar("a")[1].score
+        assert index.similar("missing") is None
+
+        # c pivots into a's space: picked up incrementally, only the new row is read
+        save_snapshot(db, _snapshot("c", 2, "Interview scheduling wastes hours", "HR managers at tech companies", "A scheduling tool"))
+        assert index.sync(db) == 1
+        top = index.similar("a", limit=1)[0]
+        assert (top.startup_id, top.version) == ("c", 2) and top.score > 0.99
+        assert set(top.field_scores) == {"problem", "target_user", "solution"}
+        assert len(index) == 3
+    finally:
+        db.close()
+
+def test_query_over_thousands_of_startups_is_fast():
+    index = SimilarityIndex()
+
+    class Row:
+        def __init__(self, i):
+            self.startup_id, self.version = f"s{i}", 1
+            self.problem = f"Problem {i % 97} for customers in segment {i % 13}"
+            self.target_user, self.solution = f"Users of kind {i % 31}", f"Tool number {i % 53}"
+
+    index._add(Row(i) for i in range(5000))
+    start = time.perf_counter()
+    items = index.similar("s0", limit=10)
+    assert time.perf_counter() - start < 0.5
+    assert len(items) == 10
+
+def test_similar_endpoint_and_drift_scores(api_client):
+    api_client.post("/api/startups/one/analyze", json={"input_text": IDEA})
+    api_client.post("/api/startups/two/analyze", json={"input_text": IDEA.replace("Series B", "Series C")})
+    changed = api_client.post("/api/startups/one/analyze", json={"input_text": IDEA.replace("cold email", "Discord community")}).json()
+    assert all(item["score"] is not None for item in changed["drift"])
+
+    similar = api_client.get("/api/startups/one/similar").json()["items"]
+    assert similar[0]["startup_id"] == "two" and similar[0]["score"] > 0.8
+    assert api_client.get("/api/startups/one/similar", params={"fields": "hypothesis"}).status_code == 400
+    assert api_client.get("/api/startups/nobody/similar").status_code == 404
@@ -0,0 +1,80 @@
+import pytest
+
+from app import snapshot_storage
+from app.cli import main as cli_main
+from app.crud import get_latest_snapshot, get_snapshot, list_snapshots, save_snapshot
+from app.models import Snapshot, StartupSnapshot
+from app.snapshot_storage import migrate_storage
+from conftest import IDEA
+
+def _history(versions=7):
+    # Mostly unchanged fields, one or two edited per version
+    return [
+        StartupSnapshot(
+            startup_id="long", version=v, problem="Hiring managers waste hours scheduling interviews. " * 20,
+            target_user="HR managers" if v < 4 else "Recruiters at agencies", solution=f"Scheduling tool, iteration {v}",
+            hypothesis="20 teams sign up within 4 weeks", top_risks=["churn"] + (["pricing"] if v % 2 else []),
+        )
+        for v in range(1, versions + 1)
+    ]
+
+def _storage(db):
+    return [row.storage for row in db.query(Snapshot).filter(Snapshot.startup_id == "long").order_by(Snapshot.version)]
+
+@pytest.fixture
+def delta_storage(monkeypatch):
+    monkeypatch.setattr(snapshot_storage, "SNAPSHOT_STORAGE", "delta")
+    monkeypatch.setattr(snapshot_storage, "SNAPSHOT_KEYFRAME_EVERY", 3)
+
+def test_delta_history_rebuilds_every_version(session_factory, delta_storage):
+    db = session_factory()
+    try:
+        history = _history()
+        for draft in history:
+            save_snapshot(db, draft.copy())
+
+        # Keyframes at 1, 4 and 7 (the latest is always full), deltas in between
+        assert _storage(db) == [None, "delta", "delta", None, "delta", "delta", None]
+        assert get_latest_snapshot(db, "long").problem == history[-1].problem
+        for draft in history:
+            rebuilt = get_snapshot(db, "long", draft.version)
+            assert rebuilt.dict(exclude={"timestamp"}) == draft.dict(exclude={"timestamp"})
+
+        items, _ = list_snapshots(db, "long", ["target_user", "top_risks"], limit=10)
+        assert [(i["version"], i["target_user"], i["top_risks"]) for i in items] == [
+            (d.version, d.target_user, d.top_risks) for d in reversed(history)
+        ]
+    finally:
+        db.close()
+
+def test_migration_round_trips_and_shrinks_history(session_factory):
+    db = session_factory()
+    try:
+        history = _history()
+        for draft in history:
+            save_snapshot(db, draft.copy())
+        assert _storage(db) == [None] * 7
+
+        stats = migrate_storage(db, "delta", keyframe_every=10)
+        assert stats["delta_rows"] == 5 and stats["bytes_after"] < stats["bytes_before"] / 2
+        assert _storage(db) == [None] + ["delta"] * 5 + [None]
+        assert get_snapshot(db, "long", 2).target_user == "HR managers"
+
+        migrate_storage(db, "full")
+        assert _storage(db) == [None] * 7
+        assert db.query(Snapshot).filter(Snapshot.version == 3).one().solution == "Scheduling tool, iteration 3"
+    finally:
+        db.close()
+
+def test_reports_are_served_from_delta_rows(api_client, delta_storage):
+    texts = [IDEA, IDEA.replace("cold email", "Discord"), IDEA.replace("HR managers", "recruiters"), IDEA.replace("20 teams", "50 teams")]
+    responses = [api_client.post("/api/startups/delta/analyze", json={"input_text": t}).json() for t in texts]
+
+    page = api_client.get("/api/startups/delta/reports", params={"limit": 10}).json()
+    assert page["items"] == responses[::-1]
+    assert api_client.get("/api/startups/delta/snapshots/2").json() == responses[1]["snapshot"]
+
+def test_cli_migrate_snapshots():
+    # Runs against the app's own (in-memory, see conftest) database
+    assert cli_main(["migrate-snapshots", "--to", "delta"]) == 0
+    assert cli_main(["migrate-snapshots", "--to", "full"]) == 0
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from app.services import token_budget
+from app.services.token_budget import chunk_text, compact, count_tokens, merge_partials
+from conftest import IDEA
+
+def test_chunks_stay_within_budget_and_overlap():
+    text = " ".join(f"Sentence number {i} talks about the product." for i in range(200))
+    chunks = chunk_text(text, chunk_tokens=100, overlap_tokens=20)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 100 for c in chunks)
+    # Each chunk opens with the end of the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split(".")[0] in previous[-100:]
+    assert "Sentence number 199" in chunks[-1]
+
+def test_short_text_is_one_chunk_and_long_sentences_are_split():
+    assert chunk_text(IDEA, chunk_tokens=1000) == [IDEA]
+    chunks = chunk_text("word " * 500, chunk_tokens=50, overlap_tokens=0)
+    assert len(chunks) >= 10 and all(count_tokens(c) <= 50 for c in chunks)
+
+def test_merge_keeps_first_value_and_unions_lists():
+    merged = merge_partials([
+        {"problem": "scheduling", "target_user": None, "top_risks": ["churn"]},
+        {"problem": "other", "target_user": "HR managers", "top_risks": ["churn", "pricing"]},
+    ])
+    assert merged == {"problem": "scheduling", "target_user": "HR managers", "top_risks": ["churn", "pricing"]}
+
+def test_compact_clips_only_fields_over_the_stage_budget(monkeypatch):
+    monkeypatch.setenv("LLM_TOKEN_BUDGET_USER", "10")
+    assert compact("HR managers", "user") == "HR managers"
+    clipped = compact("HR managers " * 20, "user")
+    assert clipped.endswith(token_budget.TRUNCATION_MARKER) and count_tokens(clipped) <= 10
+    assert compact(None, "user") is None
+
+def test_long_input_is_extracted_in_chunks_and_merged(monkeypatch):
+    from app.services.llm_client import MockLLMClient
+    from app.services.snapshot_extractor import extract_snapshot
+
+    monkeypatch.setenv("LLM_TOKEN_BUDGET_EXTRACT", "40")
+    client = MockLLMClient()
+    snapshot = asyncio.run(extract_snapshot("long", IDEA + "\n\n" + IDEA, 0, client))
+
+    assert client.calls > 1
+    assert snapshot.target_user and snapshot.version == 1
+
+def test_oversize_input_is_rejected_or_truncated(api_client, monkeypatch):
+    monkeypatch.setattr(token_budget, "MAX_INPUT_TOKENS", 50)
+    response = api_client.post("/api/startups/big/analyze", json={"input_text": IDEA * 3})
+    assert response.status_code == 422
+
+    monkeypatch.setattr(token_budget, "INPUT_OVERFLOW", "truncate")
+    response = api_client.post("/api/startups/big/analyze", json={"input_text": IDEA * 3})
+    assert response.status_code == 200
+
+def test_analyze_reports_token_usage(api_client):
+    response = api_client.post("/api/startups/usage/analyze", json={"input_text": IDEA})
+    assert int(response.headers["X-LLM-Calls"]) > 0
+    assert int(response.headers["X-LLM-Prompt-Tokens"]) > int(response.headers["X-LLM-Response-Tokens"]) > 0
+
+    # A reused stored report made no calls, and says so
+    reused = api_client.post("/api/startups/usage/analyze", json={"input_text": IDEA})
+    assert [reused.headers[h] for h in ("X-LLM-Calls", "X-LLM-Cache-Hits", "X-LLM-Prompt-Tokens", "X-LLM-Response-Tokens")] == ["0"] * 4
+
+    with api_client.stream("POST", "/api/startups/usage-stream/analyze/stream", json={"input_text": IDEA}) as streamed:
+        events = [json.loads(line) for line in streamed.iter_lines() if line]
+    assert [e["event"] for e in events][-2:] == ["usage", "complete"]
+    assert events[-2]["data"]["llm_calls"] > 0
+
+def test_batch_items_carry_token_usage(api_client):
+    items = [{"startup_id": "usage-batch", "input_text": IDEA}]
+    with api_client.stream("POST", "/api/startups/analyze-batch", json={"items": items}) as response:
+        result = json.loads(next(line for line in response.iter_lines() if line))
+    assert result["usage"]["llm_calls"] > 0 and result["usage"]["prompt_tokens"] > 0
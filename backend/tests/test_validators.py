@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from app.services.user_validator import validate_target_user
 from app.services.channel_enforcer import enforce_channel
@@ -9,11 +10,78 @@ from app.services.channel_enforcer import enforce_channel
 # I will add basic structure tests.
 
 def test_user_validator_short_input():
-    result = validate_target_user("bad")
+    result = asyncio.run(validate_target_user("bad"))
     assert result["is_valid"] is False
     assert "too short" in result["reason"]
 
 def test_channel_enforcer_empty():
-    result = enforce_channel("")
+    result = asyncio.run(enforce_channel(""))
     assert result["primary_channel_type"] is None
     assert "No distribution channel" in result["issues"][0]
+
+def test_prevalidation_answers_clear_target_users_locally():
+    from app.services.llm_client import MockLLMClient
+    client = MockLLMClient()
+    for vague in ["everyone", "Students", "all small businesses"]:
+        result = asyncio.run(validate_target_user(vague, client=client))
+        assert result["is_valid"] is False and result["improved_target_user"]
+    specific = "HR managers at Series B tech companies who schedule 20+ interviews a week"
+    assert asyncio.run(validate_target_user(specific, client=client))["is_valid"] is True
+    assert client.calls == 0
+
+    # Neither clearly vague nor clearly specific (no behavior clause): the LLM decides
+    for unclear in ["Freelance illustrators", "Engineering managers at large companies in Europe",
+                    "HR managers at a marketing agency in Berlin"]:
+        asyncio.run(validate_target_user(unclear, client=client))
+    assert client.calls == 3
+
+def test_prevalidation_classifies_single_channel_descriptions():
+    from app.services.llm_client import MockLLMClient
+    client = MockLLMClient()
+    result = asyncio.run(enforce_channel("We will reach them by cold email on LinkedIn.", client=client))
+    assert result["primary_channel_type"] == "cold_outreach" and result["issues"] == []
+    result = asyncio.run(enforce_channel("We will go viral on social media.", client=client))
+    assert result["primary_channel_type"] is None and "go viral" in result["issues"][0]
+    assert client.calls == 0
+
+    # Mixed types, a concrete audience next to a vague word, or a bare platform: the LLM decides
+    for unclear in ["Paid ads plus a Discord community.", "Email marketing to our 5,000 newsletter subscribers",
+                    "Content marketing and SEO blog posts", "We post on LinkedIn weekly"]:
+        asyncio.run(enforce_channel(unclear, client=client))
+    assert client.calls == 4
+
+def test_prevalidation_structures_hypotheses_and_flags_vanity_metrics():
+    from app.services.hypothesis_enforcer import enforce_hypothesis
+    from app.services.llm_client import MockLLMClient
+    client = MockLLMClient()
+    snapshot = {
+        "target_user": "HR managers at Series B tech companies", "solution": "We build an interview scheduling tool.",
+        "primary_channel_type": "cold_outreach", "hypothesis": "We believe 20 teams will sign up within 4 weeks.",
+        "metric": "teams signed up", "timeframe": "4 weeks",
+    }
+    result = asyncio.run(enforce_hypothesis(snapshot, client=client))
+    assert result["hypothesis"] == ("For HR managers at Series B tech companies, if we offer an interview scheduling tool "
+                                    "through cold outreach, then within 4 weeks we expect 20 teams will sign up.")
+    assert result["issues"] == []
+
+    structured = "For recruiters, if we offer a scheduling tool through Discord, then within 2 months we expect 500 followers"
+    result = asyncio.run(enforce_hypothesis({**snapshot, "hypothesis": structured, "metric": "Discord followers", "timeframe": "2 months"}, client=client))
+    assert result["hypothesis"] == structured + "." and "vanity metric" in result["issues"][0]
+    assert client.calls == 0
+
+    # No number to test against: only the LLM can make it measurable
+    asyncio.run(enforce_hypothesis({**snapshot, "hypothesis": "Teams will love it"}, client=client))
+    assert client.calls == 1
+
+def test_prevalidation_benchmark_runs_on_a_jsonl_corpus(tmp_path):
+    import json
+    from benchmarks.bench_prevalidation import main
+    corpus = tmp_path / "snapshots.jsonl"
+    corpus.write_text("\n".join(json.dumps(s) for s in [
+        {"target_user": "everyone", "primary_channel_description": "cold email", "hypothesis": "It works"},
+        {"target_user": "Freelance illustrators", "primary_channel_description": "", "hypothesis": ""},
+    ]))
+    output = tmp_path / "report.json"
+    assert main(["--jsonl", str(corpus), "--output", str(output)]) == 0
+    report = json.loads(output.read_text())["stages"]
+    assert report["user"]["local"] == 1 and report["channel"]["kinds"] == {"cold_outreach": 1, "no_channel": 1}
@@ -60,9 +60,56 @@ export interface AnalysisResponse {
     status: "BLOCKED" | "OK";
 }
 
+// Estimated LLM usage of one analysis request
+export interface TokenUsage {
+    llm_calls: number;
+    cache_hits: number;
+    prompt_tokens: number;
+    response_tokens: number;
+}
+
 export const analyzeStartup = async (startupId: string, inputText: string): Promise<AnalysisResponse> => {
     const response = await apiClient.post<AnalysisResponse>(`/startups/${startupId}/analyze`, {
         input_text: inputText,
     });
     return response.data;
 };
+
+export type AnalysisEvent =
+    | { event: "snapshot"; data: StartupSnapshot }
+    | { event: "dimension_review"; data: DimensionReview }
+    | { event: "drift"; data: DriftItem }
+    | { event: "experiments"; data: Experiment[] }
+    | { event: "usage"; data: TokenUsage }
+    | { event: "complete"; data: AnalysisResponse }
+    | { event: "error"; data: { detail: string; status_code?: number } };
+
+export const analyzeStartupStream = async (
+    startupId: string,
+    inputText: string,
+    onEvent: (event: AnalysisEvent) => void,
+): Promise<void> => {
+    const response = await fetch(`${API_URL}/startups/${startupId}/analyze/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ input_text: inputText }),
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Analyze stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
+        for (const line of lines) {
+            if (line.trim()) onEvent(JSON.parse(line) as AnalysisEvent);
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer) as AnalysisEvent);
+};